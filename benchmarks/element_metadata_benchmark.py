@@ -0,0 +1,115 @@
+"""
+Micro-benchmark for reading element metadata (the opening tag summary returned after clicks and text entries).
+
+Opens a synthetic page in headless Chromium, reads the opening tag of every element with the current batched
+`get_element_outer_html` (one evaluate) and with the previous implementation (a tag name evaluate plus one
+`get_attribute` per attribute of interest), counts the calls each makes and checks that both return the same tags.
+
+Run from the repository root:
+    python -m benchmarks.element_metadata_benchmark [--elements 200] [--repeat 5]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Any
+
+from playwright.async_api import async_playwright
+from playwright.async_api import ElementHandle
+
+from core.utils.dom_helper import OPENING_TAG_ATTRIBUTES
+from core.utils.dom_helper import get_element_outer_html
+
+
+class CountingElement:
+    """Wraps an ElementHandle and counts the calls that cross to the browser."""
+
+    def __init__(self, element: ElementHandle):
+        self.element = element
+        self.calls = 0
+
+    async def evaluate(self, expression: str, arg: Any = None) -> Any:
+        self.calls += 1
+        return await self.element.evaluate(expression, arg)
+
+    async def get_attribute(self, name: str) -> str | None:
+        self.calls += 1
+        return await self.element.get_attribute(name)
+
+
+async def legacy_get_element_outer_html(element: ElementHandle) -> str:
+    """The attribute by attribute reader as it was before, kept here as the reference implementation."""
+    tag_name: str = await element.evaluate("element => element.tagName.toLowerCase()")
+    opening_tag: str = f'<{tag_name}'
+    for attr in OPENING_TAG_ATTRIBUTES:
+        value: str = await element.get_attribute(attr) # type: ignore
+        if value:
+            opening_tag += f' {attr}="{value}"'
+    return opening_tag + '>'
+
+
+def build_page(element_count: int) -> str:
+    """Builds a form-like page whose elements carry a varying subset of the attributes of interest."""
+    elements = []
+    for index in range(element_count):
+        kind = index % 4
+        if kind == 0:
+            elements.append(f'<input id="field-{index}" name="field{index}" type="text" placeholder="Field {index}" aria-label="Field {index}">')
+        elif kind == 1:
+            elements.append(f'<button id="button-{index}" type="submit" data-testid="submit-{index}" aria-haspopup="menu">Go {index}</button>')
+        elif kind == 2:
+            elements.append(f'<a href="/item/{index}" role="link" aria-describedby="hint-{index}">Item {index}</a>')
+        else:
+            elements.append(f'<select name="choice{index}"><option value="{index}" selected>Option {index}</option></select>')
+    return "<html><body>" + "\n".join(elements) + "</body></html>"
+
+
+async def time_reader(reader, elements: list[ElementHandle], repeat: int) -> tuple[list[float], list[str], int]:
+    """Returns the per element timings in seconds, the tags of the last round and the calls made per element."""
+    timings = []
+    tags: list[str] = []
+    calls = 0
+    for _ in range(repeat):
+        tags = []
+        calls = 0
+        start = time.perf_counter()
+        for element in elements:
+            counting_element = CountingElement(element)
+            tags.append(await reader(counting_element))
+            calls += counting_element.calls
+        timings.append((time.perf_counter() - start) / len(elements))
+    return timings, tags, calls // len(elements)
+
+
+async def run(element_count: int, repeat: int):
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.set_content(build_page(element_count))
+        elements = await page.query_selector_all("body *")
+        print(f"{len(elements)} elements, {len(OPENING_TAG_ATTRIBUTES)} attributes of interest")
+
+        new_timings, new_tags, new_calls = await time_reader(lambda element: get_element_outer_html(element, page), elements, repeat)
+        old_timings, old_tags, old_calls = await time_reader(legacy_get_element_outer_html, elements, repeat)
+        await browser.close()
+
+    new_ms = statistics.median(new_timings) * 1000
+    old_ms = statistics.median(old_timings) * 1000
+    status = "identical" if new_tags == old_tags else "MISMATCH"
+    print(f"batched {new_ms:7.3f} ms ({new_calls} calls) | per attribute {old_ms:7.3f} ms ({old_calls} calls) | "
+          f"{old_ms / new_ms:5.2f}x | {status}")
+    if status == "MISMATCH":
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark element metadata reads")
+    parser.add_argument("--elements", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.elements, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Micro-benchmark for the accessibility tree pruning pass.
+
+Builds synthetic 50k node accessibility trees (wide, balanced and deeply nested), runs the current
+iterative `__prune_tree` and the previous recursive implementation on identical copies and checks
+that both produce the same tree.
+
+Run from the repository root:
+    python -m benchmarks.prune_tree_benchmark [--nodes 50000] [--repeat 5]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+from core.utils.get_detailed_accessibility_tree import __prune_tree as prune_tree
+from core.utils.get_detailed_accessibility_tree import __should_prune_node as should_prune_node
+
+ROLES = ["generic", "generic", "text", "button", "link", "textbox", "separator", "list", "listitem", "checkbox"]
+
+
+def legacy_prune_tree(node: dict[str, Any], only_input_fields: bool) -> dict[str, Any] | None:
+    """The recursive pruning pass as it was before, kept here as the reference implementation."""
+    if "marked_for_deletion_by_mm" in node:
+        return None
+
+    if 'children' in node:
+        i = 0
+        while i < len(node['children']):
+            child = node['children'][i]
+            if 'marked_for_unravel_children' in child:
+                if 'children' in child:
+                    node['children'] = node['children'][:i] + child['children'] + node['children'][i+1:]
+                    i += len(child['children']) - 1
+                else:
+                    node['children'].pop(i)
+                    i -= 1
+            else:
+                pruned_child = legacy_prune_tree(child, only_input_fields)
+                if pruned_child is None:
+                    node['children'].pop(i)
+                    i -= 1
+                else:
+                    node['children'][i] = pruned_child
+            i += 1
+
+        if not node['children']:
+            del node['children']
+
+    return None if should_prune_node(node, only_input_fields) else node
+
+
+def make_node(rng: random.Random, index: int) -> dict[str, Any]:
+    role = rng.choice(ROLES)
+    node: dict[str, Any] = {"role": role, "name": f"node {index}" if rng.random() < 0.6 else ""}
+    if role in ("button", "link", "checkbox"):
+        node["mmid"] = index
+        node["is_clickable"] = True
+    if role == "textbox":
+        node["mmid"] = index
+        node["tag"] = "input"
+    roll = rng.random()
+    if roll < 0.05:
+        node["marked_for_deletion_by_mm"] = True
+    elif roll < 0.10:
+        node["marked_for_unravel_children"] = True
+    return node
+
+
+def build_tree(shape: str, total_nodes: int, seed: int = 7) -> dict[str, Any]:
+    """
+    Builds a synthetic accessibility tree with `total_nodes` nodes below a WebArea root.
+
+    Args:
+        shape (str): "wide" (every node below the root), "balanced" (fan-out of 8) or "deep" (nesting depth of ~total_nodes / 4).
+        total_nodes (int): Number of nodes to generate.
+        seed (int): Seed of the random generator, so every run benchmarks the same tree.
+    """
+    rng = random.Random(seed)
+    root: dict[str, Any] = {"role": "WebArea", "name": "Synthetic page", "children": []}
+    if shape == "wide":
+        root["children"] = [make_node(rng, index) for index in range(1, total_nodes + 1)]
+    elif shape == "balanced":
+        queue = [root]
+        created = 0
+        while created < total_nodes:
+            parent = queue.pop(0)
+            parent.setdefault("children", [])
+            for _ in range(min(8, total_nodes - created)):
+                created += 1
+                child = make_node(rng, created)
+                parent["children"].append(child)
+                queue.append(child)
+    elif shape == "deep":
+        # A spine of nested wrappers with a few leaves hanging off every level, like a deeply nested SPA
+        parent = root
+        created = 0
+        while created < total_nodes:
+            level = {"role": "generic", "name": "", "children": []}
+            created += 1
+            for _ in range(min(3, total_nodes - created)):
+                created += 1
+                level["children"].append(make_node(rng, created))
+            parent["children"].append(level)
+            parent = level
+    else:
+        raise ValueError(f"Unknown tree shape: {shape}")
+    return root
+
+
+def copy_tree(tree: dict[str, Any]) -> dict[str, Any]:
+    """Copies the nodes and children lists of `tree` without recursion, `copy.deepcopy` cannot handle the deep shape."""
+    root = dict(tree)
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if 'children' in node:
+            node['children'] = [dict(child) for child in node['children']]
+            stack.extend(node['children'])
+    return root
+
+
+def time_prune(prune: Callable[[dict[str, Any], bool], dict[str, Any] | None], tree: dict[str, Any], only_input_fields: bool, repeat: int):
+    """Returns (timings in seconds, last result) of pruning fresh copies of `tree`, or (None, error) when it fails."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        tree_copy = copy_tree(tree)
+        start = time.perf_counter()
+        try:
+            result = prune(tree_copy, only_input_fields)
+        except RecursionError as e:
+            return None, e
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark accessibility tree pruning")
+    parser.add_argument("--nodes", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Python recursion limit: {sys.getrecursionlimit()}")
+    for shape in ("wide", "balanced", "deep"):
+        tree = build_tree(shape, args.nodes)
+        for only_input_fields in (False, True):
+            label = f"{shape:<8} only_input_fields={only_input_fields!s:<5}"
+            new_timings, new_result = time_prune(prune_tree, tree, only_input_fields, args.repeat)
+            old_timings, old_result = time_prune(legacy_prune_tree, tree, only_input_fields, args.repeat)
+
+            new_ms = statistics.median(new_timings) * 1000
+            if old_timings is None:
+                print(f"{label} iterative {new_ms:9.2f} ms | recursive failed ({type(old_result).__name__})")
+                continue
+
+            old_ms = statistics.median(old_timings) * 1000
+            status = "identical" if new_result == old_result else "MISMATCH"
+            print(f"{label} iterative {new_ms:9.2f} ms | recursive {old_ms:9.2f} ms | {old_ms / new_ms:5.2f}x | {status}")
+            if status == "MISMATCH":
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,24 @@ from pydantic_ai import Agent
 # from ae.core.skills.enter_text_and_click import enter_text_and_click
 from core.skills.enter_text_using_selector import bulk_enter_text
 from core.skills.enter_text_using_selector import entertext
+from core.skills.fetch_url import fetch_url_text
+from core.skills.get_dom_tables import get_dom_tables_func
 from core.skills.get_dom_with_content_type import get_dom_field_func, get_dom_texts_func
 from core.skills.get_url import geturl
 from core.skills.open_url import openurl
 from core.skills.pdf_text_extractor import extract_text_from_pdf
 from core.skills.google_search import google_search
 from core.skills.press_key_combination import press_key_combination
+from core.skills.read_urls import read_urls
+from core.skills.scroll_and_collect import SCROLL_COLLECT_MAX_ITEMS
+from core.skills.scroll_and_collect import SCROLL_COLLECT_TIME_BUDGET
+from core.skills.scroll_and_collect import scroll_and_collect
 from core.skills.click_using_selector import click
+from core.skills.get_dom_tables import DOM_TABLE_FORMAT
+from core.skills.get_dom_tables import DOM_TABLE_MAX_ROWS
+from core.utils.dom_budget import DOM_TOKEN_BUDGET
+from core.utils.dom_main_content import DOM_TEXT_CONTENT
+from core.utils.dom_viewport import DOM_SCOPE
 
 
 from core.utils.openai_client import get_client
@@ -81,7 +92,7 @@ BA_SYS_PROMPT = """
     <output_generation>
         1. Once the task is completed or cannot be completed, return a short summary of the actions you performed to accomplish the task, and what worked and what did not. Your reply will not contain any other information.
         2. Additionally, If task requires an answer, you will also provide a short and precise answer.
-        3. Ensure that user questions are answered from the DOM extracts and not from memory or assumptions. To answer a question about textual information on the page, prefer to use text_only DOM type. To answer a question about interactive elements, use 'fields' DOM type.
+        3. Ensure that user questions are answered from the DOM extracts and not from memory or assumptions. To answer a question about textual information on the page, prefer to use text_only DOM type, and get_dom_tables for tabular data. To answer a question about interactive elements, use 'fields' DOM type.
         4. Do not provide any mmid values in your response.
         5. Do not repeat the same action multiple times if it fails. Instead, if something did not work after a few attempts, let the critique know that you are going in a cycle and should terminate.
     </output_generation>
@@ -146,17 +157,31 @@ BA_SYS_PROMPT = """
 
 
         4. 
-        get_dom_text() -> str
+        get_dom_text(token_budget: int, scope: str = "page", page_token: str = None, content: str = "full") -> str
         <description>
             Returns textual dom content of the current page
             Call this function when you have to get text from the web page
+            The output is limited to token_budget tokens (the default is usually enough). When the page is larger, the output
+            ends with a note on what was left out; call the tool again with a larger token_budget if you need that part.
+            On long pages and feeds use scope="viewport" to get only the visible screen. The output then ends with the
+            page_token of the next screen; pass it to read the page screen by screen.
+            To read an article, blog post or documentation page use content="main": it returns only the
+            primary content with its headings (as # lines), without navigation, sidebars, footers and cookie banners.
+            Use content="full" when you need text from those parts of the page.
         </description>
 
         5. 
-        get_dom_fields() -> str
+        get_dom_fields(token_budget: int, all_fields: bool = False, scope: str = "page", page_token: str = None) -> str
         <description>
             Returns field dom content of the current page
             Call this function when you want to get field or html elements of the webpage.
+            On pages with many fields only the fields most relevant to the current step are returned, with their parent elements.
+            If the field you need is missing, call it again with all_fields=True.
+            scope and page_token work like in get_dom_text, to get the fields of one screen at a time.
+            The output is limited to token_budget tokens like get_dom_text. Large pages may have long texts trimmed, repeated
+            list items collapsed or trailing elements dropped; the final note says which, call again with a larger token_budget if needed.
+            Each element is on its own line as [mmid] tag role "name" attribute=value, children are indented below their parent.
+            Use the number in brackets as the mmid selector, e.g. a line starting with [114] is selected with [mmid='114'].
         </description>
 
          
@@ -219,6 +244,45 @@ BA_SYS_PROMPT = """
             - wait_before_execution: Optional wait time in seconds before executing the click event logic (default is 0.0).
         </parameters>
 
+        11.
+        get_dom_tables(output_format: str = "csv", max_rows: int = 50, table_index: int = None, token_budget: int) -> str
+        <description>
+            Returns the data tables of the current page (HTML tables and grids) as CSV, or as JSON rows with output_format="json".
+            Use it instead of get_dom_text to read prices, schedules, comparisons, results or any other tabular data.
+            Each table starts with a line "## Table N: caption (rows x columns)" followed by its header row when it has one.
+            Tables longer than max_rows end with a note; call again with table_index=N and a larger max_rows to get all rows of table N.
+        </description>
+
+        12.
+        scroll_and_collect_tool(item_selector: str = None, max_items: int = 100, time_budget: float = 30) -> str
+        <description>
+            Scrolls through an infinite or lazily loaded list (feeds, search results, product listings, comments) and returns
+            its items, each once, one per line with its first link. Use it instead of repeated PageDown + get_dom_text when
+            you need many items of a list. It stops at max_items unique items, after time_budget seconds or when scrolling
+            brings no new items; the last line tells which. The items are detected automatically, pass item_selector
+            (a CSS selector matching one item, e.g. "li.result") if the wrong elements are collected.
+        </description>
+
+        13.
+        fetch_url_text_tool(url: str, token_budget: int) -> str
+        <description>
+            Reads the text of the page at a URL without navigating the browser, much faster than open_url_tool followed by
+            get_dom_text. Use it when a step only needs to read a page (documentation, articles, wikis) and not to interact
+            with it. The browser stays on its current page, so use open_url_tool instead when you need to click or type on
+            the page afterwards. Pages that need JavaScript are opened in the browser automatically; the first line of the
+            output tells which happened.
+        </description>
+
+        14.
+        read_urls_tool(urls: list[str], content: str = "full", token_budget: int) -> str
+        <description>
+            Reads the text of several URLs at once, e.g. the result links of google_search_tool, in background tabs that
+            load in parallel. Use it instead of opening and reading the pages one by one when a step needs to compare or
+            gather information from several pages. The browser stays on its current page. Returns one section per URL,
+            "## N. url, Title: title" followed by its text, or the reason the URL could not be read. At most 10 URLs
+            per call; the token_budget is shared between them. Use content="main" to skip navigation and sidebars.
+        </description>
+
 
         
     """
@@ -263,13 +327,45 @@ async def enter_text_tool(entry) -> str:
     return await entertext(entry=entry)
 
 @BA_agent.tool_plain
-async def get_dom_text() -> str:
+async def get_dom_text(token_budget: int = DOM_TOKEN_BUDGET, scope: str = DOM_SCOPE, page_token: str | None = None,
+                       content: str = DOM_TEXT_CONTENT) -> str:
+
+    return await get_dom_texts_func(token_budget=token_budget, scope=scope, page_token=page_token, content=content)
+
+@BA_agent.tool_plain
+async def get_dom_tables(output_format: str = DOM_TABLE_FORMAT, max_rows: int = DOM_TABLE_MAX_ROWS, table_index: int | None = None,
+                         token_budget: int = DOM_TOKEN_BUDGET) -> str:
+    """
+    Returns the data tables of the current page as CSV or JSON rows.
+    """
+    return await get_dom_tables_func(output_format=output_format, max_rows=max_rows, table_index=table_index, token_budget=token_budget)
+
+@BA_agent.tool_plain
+async def fetch_url_text_tool(url: str, token_budget: int = DOM_TOKEN_BUDGET) -> str:
+    """
+    Reads the text of the page at the URL over HTTP, falling back to the browser for pages that need JavaScript.
+    """
+    return await fetch_url_text(url=url, token_budget=token_budget)
+
+@BA_agent.tool_plain
+async def read_urls_tool(urls: list[str], content: str = DOM_TEXT_CONTENT, token_budget: int = DOM_TOKEN_BUDGET) -> str:
+    """
+    Reads the text of several URLs in parallel background tabs, without navigating the current page.
+    """
+    return await read_urls(urls=urls, content=content, token_budget=token_budget)
 
-    return await get_dom_texts_func()
+@BA_agent.tool_plain
+async def scroll_and_collect_tool(item_selector: str | None = None, max_items: int = SCROLL_COLLECT_MAX_ITEMS,
+                                  time_budget: float = SCROLL_COLLECT_TIME_BUDGET) -> str:
+    """
+    Scrolls through a lazily loaded list of the current page and returns its unique items.
+    """
+    return await scroll_and_collect(item_selector=item_selector, max_items=max_items, time_budget=time_budget)
 
 @BA_agent.tool
-async def get_dom_fields(ctx: RunContext[current_step_class]) -> str:
-    return await get_dom_field_func(ctx.deps.current_step)
+async def get_dom_fields(ctx: RunContext[current_step_class], token_budget: int = DOM_TOKEN_BUDGET, all_fields: bool = False,
+                         scope: str = DOM_SCOPE, page_token: str | None = None) -> str:
+    return await get_dom_field_func(ctx.deps.current_step, token_budget=token_budget, all_fields=all_fields, scope=scope, page_token=page_token)
 
 @BA_agent.tool_plain
 async def get_url_tool() -> str:
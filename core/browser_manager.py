@@ -2,6 +2,8 @@ import asyncio
 import os
 import tempfile
 import time
+import weakref
+from contextvars import ContextVar
 from dotenv import load_dotenv
 
 from playwright.async_api import async_playwright as playwright
@@ -11,12 +13,18 @@ from playwright.async_api import Playwright
 
 from core.utils.notification import NotificationManager
 from core.utils.ui_manager import UIManager
+from core.utils.dom_frames import get_frame_for_selector
+from core.utils.dom_helper import RESOLVE_ELEMENT_JS
 from core.utils.dom_mutation_observer import dom_mutation_change_detected
 from core.utils.dom_mutation_observer import handle_navigation_for_mutation_observer
 from core.utils.js_helper import beautify_plan_message
 from core.utils.js_helper import escape_js_message
 from core.utils.logger import logger
 from core.utils.message_type import MessageType
+from core.utils.screenshots import Screenshot
+from core.utils.screenshots import get_screenshot_options
+from core.utils.screenshots import persist_screenshot
+from core.utils.screenshots import should_persist
 import logfire
 
 load_dotenv()
@@ -24,6 +32,18 @@ load_dotenv()
 # Enusres that playwright does not wait for font loading when taking screenshots. Reference: https://github.com/microsoft/playwright/issues/28995
 os.environ["PW_TEST_SCREENSHOT_NO_FONTS_READY"] = "1"
 
+# Chromium flags of every browser the agent launches
+BROWSER_LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-session-crashed-bubble",  # disable the restore session bubble
+    "--disable-infobars",  # disable informational popups,
+]
+
+# The browser context of the task running in the current asyncio task, set when the task got its own context from the
+# BrowserContextPool. PlaywrightManager resolves pages in it instead of the process wide context, so that concurrent
+# tasks each see their own current page.
+task_browser_context: ContextVar[BrowserContext | None] = ContextVar("task_browser_context", default=None)
+
 class PlaywrightManager:
     """
     A singleton class to manage Playwright instances and browsers.
@@ -44,6 +64,8 @@ class PlaywrightManager:
     video_dir = os.path.join(os.getcwd(), "videos")
     _record_video = True
     _browser = None
+    # Pages opened for work in the background (parallel reads), never returned as the current page
+    _background_pages: weakref.WeakSet = weakref.WeakSet()
 
 
     def __new__(cls, *args, **kwargs):
@@ -137,7 +159,8 @@ class PlaywrightManager:
         await self.set_navigation_handler()
 
 
-    async def start_playwright(self):
+    @classmethod
+    async def start_playwright(cls):
         """
         Starts the Playwright instance if it hasn't been started yet. This method is idempotent.
         """
@@ -218,10 +241,7 @@ class PlaywrightManager:
                     user_dir,
                     bypass_csp=True,
                     channel="chromium", headless=self.isheadless,
-                    args=["--disable-blink-features=AutomationControlled",
-                        "--disable-session-crashed-bubble",  # disable the restore session bubble
-                        "--disable-infobars",  # disable informational popups,
-                        ],
+                    args=BROWSER_LAUNCH_ARGS,
                     no_viewport=True,
                     **record_video_options,
                 )
@@ -247,9 +267,7 @@ class PlaywrightManager:
                         new_user_dir,
                         channel="chromium",
                         headless=self.isheadless,
-                        args=["--disable-blink-features=AutomationControlled",
-                            "--disable-session-crashed-bubble",
-                            "--disable-infobars"],
+                        args=BROWSER_LAUNCH_ARGS,
                         no_viewport=True,
                         **record_video_options,
                     )
@@ -263,8 +281,12 @@ class PlaywrightManager:
 
     async def get_browser_context(self):
             """
-            Returns the existing browser context, or creates a new one if it doesn't exist.
+            Returns the browser context of the current task when it has one, else the existing browser context, or
+            creates a new one if it doesn't exist.
             """
+            context = task_browser_context.get()
+            if context is not None:
+                return context
             await self.ensure_browser_context()
             return self._browser_context
 
@@ -292,8 +314,8 @@ class PlaywrightManager:
         """
         try:
             browser: BrowserContext = await self.get_browser_context() # type: ignore
-            # Filter out closed pages
-            pages: list[Page] = [page for page in browser.pages if not page.is_closed()]
+            # Filter out closed pages and pages working in the background
+            pages: list[Page] = [page for page in browser.pages if not page.is_closed() and page not in self._background_pages]
             page: Page | None = pages[-1] if pages else None
             logger.debug(f"Current page: {page.url if page else None}")
             if page is not None:
@@ -302,6 +324,9 @@ class PlaywrightManager:
                 page:Page = await browser.new_page() # type: ignore
                 return page
         except Exception:
+                if task_browser_context.get() is not None:
+                    # The task's own context is closed, the task is over
+                    raise
                 logger.warn("Browser context was closed. Creating a new one.")
                 PlaywrightManager._browser_context = None
                 _browser:BrowserContext= await self.get_browser_context() # type: ignore
@@ -309,6 +334,43 @@ class PlaywrightManager:
                 return page
 
 
+    async def new_background_page(self, current_page: Page | None = None) -> Page:
+        """
+        Opens a page in the browser context for work that must not disturb the user facing page. Background pages are
+        never returned by get_current_page, and the user facing page is brought back to the front after the page opens.
+
+        Args:
+            current_page (Page | None): The user facing page to bring back to the front. Callers opening several
+                background pages at once take it before opening any: a page still opening is not yet known to be in the
+                background and get_current_page could return it. Defaults to get_current_page().
+
+        Returns:
+            Page: The new page. Close it with close_background_page when done.
+        """
+        browser_context: BrowserContext = await self.get_browser_context() # type: ignore
+        if current_page is None:
+            current_page = await self.get_current_page()
+        page: Page = await browser_context.new_page()
+        PlaywrightManager._background_pages.add(page)
+        try:
+            await current_page.bring_to_front()
+        except Exception as e:
+            logger.debug(f"Could not bring the current page back to the front: {e}")
+        return page
+
+
+    async def close_background_page(self, page: Page):
+        """
+        Closes a page opened with new_background_page.
+
+        Args:
+            page (Page): The background page to close.
+        """
+        PlaywrightManager._background_pages.discard(page)
+        if not page.is_closed():
+            await page.close()
+
+
     async def close_all_tabs(self, keep_first_tab: bool = True):
             """
             Closes all tabs in the browser context, except for the first tab if `keep_first_tab` is set to True.
@@ -424,18 +486,20 @@ class PlaywrightManager:
     async def highlight_element(self, selector: str, add_highlight: bool):
         try:
             page: Page = await self.get_current_page()
+            frame = get_frame_for_selector(page, selector)
             if add_highlight:
                 # Add the 'tawebagent-ui-automation-highlight' class to the element. This class is used to apply the fading border.
-                await page.eval_on_selector(selector, '''e => {
+                await frame.evaluate('''(selector) => {
+                            const e = (''' + RESOLVE_ELEMENT_JS + ''')(selector);
                             let originalBorderStyle = e.style.border;
                             e.classList.add('tawebagent-ui-automation-highlight');
                             e.addEventListener('animationend', () => {
                                 e.classList.remove('tawebagent-ui-automation-highlight')
-                            });}''')
+                            });}''', selector)
                 logger.debug(f"Applied pulsating border to element with selector {selector} to indicate text entry operation")
             else:
                 # Remove the 'tawebagent-ui-automation-highlight' class from the element.
-                await page.eval_on_selector(selector, "e => e.classList.remove('tawebagent-ui-automation-highlight')")
+                await frame.evaluate("(selector) => (" + RESOLVE_ELEMENT_JS + ")(selector).classList.remove('tawebagent-ui-automation-highlight')", selector)
                 logger.debug(f"Removed pulsating border from element with selector {selector} after text entry operation")
         except Exception:
             # This is not significant enough to fail the operation
@@ -515,30 +579,59 @@ class PlaywrightManager:
     async def take_screenshots(self, name: str, page: Page|None, full_page: bool = True, 
                          include_timestamp: bool = True, load_state: str = 'domcontentloaded', 
                          take_snapshot_timeout: int = 15*1000):
-        if not self._take_screenshots or not self._screenshots_dir:
-            return
-            
+        """
+        Takes the before and after screenshots of an action when the artifact policy saves them, see
+        AGENTIC_BROWSER_SCREENSHOT_ARTIFACTS. Nothing consumes them otherwise, so they are not taken at all.
+
+        Returns:
+            str | None: The path of the saved screenshot, None when it was not taken.
+        """
+        if not should_persist("action"):
+            return None
+        screenshot = await self.capture_screenshot(name, page, full_page=full_page, include_timestamp=include_timestamp,
+                                                   load_state=load_state, take_snapshot_timeout=take_snapshot_timeout, artifact_kind="action")
+        return screenshot.path if screenshot else None
+
+
+    async def capture_screenshot(self, name: str, page: Page|None, full_page: bool = True,
+                                 include_timestamp: bool = True, load_state: str = 'domcontentloaded',
+                                 take_snapshot_timeout: int = 15*1000, artifact_kind: str = "analysis") -> Screenshot | None:
+        """
+        Captures a screenshot into memory in the configured format, quality and scale, and saves it to the screenshots
+        directory only when the artifact policy asks for screenshots of this kind.
+
+        Args:
+            name (str): The name of the screenshot, used for its file name.
+            page (Page | None): The page to capture, the current page when None.
+            full_page (bool): Capture the whole page instead of the viewport.
+            artifact_kind (str): "analysis" or "action", see should_persist.
+
+        Returns:
+            Screenshot | None: The encoded screenshot, None if it could not be taken.
+        """
+        if not self._take_screenshots:
+            return None
+
         if page is None:
             page = await self.get_current_page()
 
         screenshot_name = name
         if include_timestamp:
             screenshot_name = f"{int(time.time_ns())}_{screenshot_name}"
-        screenshot_name += ".png"
-        
-        # Use os.path.join to create proper path
-        screenshot_path = os.path.join(self._screenshots_dir, screenshot_name)
-        
+
+        options = get_screenshot_options()
         try:
             await page.wait_for_load_state(state=load_state, timeout=take_snapshot_timeout)
-            await page.screenshot(path=screenshot_path, full_page=full_page, 
-                                timeout=take_snapshot_timeout, caret="initial", scale="device")
-            logger.debug(f"Screenshot saved to: {screenshot_path}")
-            return screenshot_path
+            data = await page.screenshot(full_page=full_page, timeout=take_snapshot_timeout, caret="initial", **options)
         except Exception as e:
-            logger.error(f"Failed to take screenshot and save to \"{screenshot_path}\". Error: {e}")
+            logger.error(f"Failed to take screenshot \"{screenshot_name}\". Error: {e}")
             return None
 
+        screenshot = Screenshot(name=screenshot_name, data=data, mime_type=f"image/{options['type']}")
+        if self._screenshots_dir and should_persist(artifact_kind):
+            await persist_screenshot(screenshot, self._screenshots_dir)
+        return screenshot
+
 
     def log_user_message(self, message: str):
         """
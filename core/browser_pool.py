@@ -0,0 +1,252 @@
+import asyncio
+import os
+import time
+
+from playwright.async_api import Browser
+from playwright.async_api import BrowserContext
+from playwright.async_api import Page
+
+from core.browser_manager import BROWSER_LAUNCH_ARGS
+from core.browser_manager import PlaywrightManager
+from core.utils.logger import logger
+
+# Browser contexts open at the same time, one per running API task. Further tasks wait for a context to be released.
+# 0 disables the pool: API tasks then share the single browser context of PlaywrightManager.
+BROWSER_CONTEXT_POOL_SIZE = int(os.getenv("AGENTIC_BROWSER_CONTEXT_POOL_SIZE", "4"))
+
+# Contexts kept ready (page open on the homepage) for the next tasks, created at API server startup and refilled in the
+# background after each lease. Ready contexts count against AGENTIC_BROWSER_CONTEXT_POOL_SIZE, no more contexts than
+# that are ever open: they are only refilled while fewer tasks run.
+BROWSER_CONTEXT_POOL_WARM = int(os.getenv("AGENTIC_BROWSER_CONTEXT_POOL_WARM", "2"))
+
+
+class BrowserContextPool:
+    """
+    Hands out isolated browser contexts (own cookies, storage, pages) on one shared browser process, so that concurrent
+    tasks neither share a current page nor pay for launching a browser each.
+
+    A task acquires a context, makes it its task_browser_context and releases it when done; released contexts are
+    closed, a context never carries the state of one task over to the next. Up to warm_size unused contexts are kept
+    ready with a page already on the homepage, so that a task can start without waiting for a context and a first
+    navigation; they are refilled in the background after each lease, as long as contexts in use and ready stay within
+    size.
+    """
+
+    def __init__(self, size: int = BROWSER_CONTEXT_POOL_SIZE, warm_size: int = BROWSER_CONTEXT_POOL_WARM, headless: bool = True):
+        self.size = size
+        self.warm_size = min(max(warm_size, 0), max(size, 0))
+        self.headless = headless
+        self._browser: Browser | None = None
+        self._launch_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max(size, 1))
+        self._contexts: set[BrowserContext] = set()
+        # Ready contexts with the video directory they record to, oldest first
+        self._warm: list[tuple[str | None, BrowserContext]] = []
+        self._refill_task: asyncio.Task | None = None
+        # The video directory of the last refill, for the refill after a release
+        self._refill_video_dir: str | None = None
+        self._stats = {"hits": 0, "misses": 0, "refills": 0, "refill_errors": 0, "acquire_seconds": 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def get_browser(self) -> Browser:
+        """
+        Returns the shared browser, launching it on first use or after it disconnected. A remote browser is connected
+        over CDP when STEEL_DEV_API_KEY is set, with a fallback to a local one.
+        """
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+
+            await PlaywrightManager.start_playwright()
+            playwright = PlaywrightManager._playwright
+            steel_api_key = os.environ.get('STEEL_DEV_API_KEY')
+            self._browser = None
+            if steel_api_key:
+                try:
+                    logger.info("Connecting the browser context pool to Steel Dev over CDP...")
+                    self._browser = await playwright.chromium.connect_over_cdp(f'wss://connect.steel.dev?apiKey={steel_api_key}')
+                except Exception as cdp_error:
+                    logger.warning(f"CDP connection failed, falling back to local browser: {cdp_error}")
+            if self._browser is None:
+                self._browser = await playwright.chromium.launch(channel="chromium", headless=self.headless, args=BROWSER_LAUNCH_ARGS)
+            logger.info(f"Browser context pool started its browser, up to {self.size} contexts")
+            return self._browser
+
+    async def acquire(self, record_video_dir: str | None = None) -> BrowserContext:
+        """
+        Returns a browser context for a task, a ready one when available, else a new one. Waits while all contexts
+        of the pool are in use.
+
+        Args:
+            record_video_dir (str | None): Directory to record the videos of the context's pages to, None to not record.
+
+        Returns:
+            BrowserContext: The context. Give it back with release.
+        """
+        start_time = time.monotonic()
+        await self._slots.acquire()
+        try:
+            context = self._take_warm_context(record_video_dir)
+            if context is None:
+                self._stats["misses"] += 1
+                # Ready contexts recording elsewhere give up their place to the new one
+                while self._warm and len(self._contexts) + len(self._warm) >= self.size:
+                    asyncio.ensure_future(self._close_context(self._warm.pop(0)[1]))
+                context = await self._new_context(record_video_dir)
+            else:
+                self._stats["hits"] += 1
+        except Exception:
+            self._slots.release()
+            raise
+        self._contexts.add(context)
+        self._stats["acquire_seconds"] += time.monotonic() - start_time
+        logger.info(f"Browser context acquired, {len(self._contexts)} of {self.size} in use, {len(self._warm)} ready")
+        self.refill(record_video_dir)
+        return context
+
+    def _take_warm_context(self, record_video_dir: str | None) -> BrowserContext | None:
+        """Removes and returns a ready context recording to the same video directory, dropping the unusable ones."""
+        for index, (warm_video_dir, context) in enumerate(self._warm):
+            if warm_video_dir != record_video_dir:
+                continue
+            del self._warm[index]
+            if self._browser is not None and self._browser.is_connected() and context.pages:
+                return context
+            asyncio.ensure_future(self._close_context(context))
+            return self._take_warm_context(record_video_dir)
+        return None
+
+    async def _new_context(self, record_video_dir: str | None) -> BrowserContext:
+        browser = await self.get_browser()
+        video_options = {}
+        if record_video_dir:
+            os.makedirs(record_video_dir, exist_ok=True)
+            video_options = {"record_video_dir": record_video_dir, "record_video_size": {"width": 640, "height": 480}}
+        return await browser.new_context(bypass_csp=True, no_viewport=True, **video_options)
+
+    async def _new_warm_context(self, record_video_dir: str | None) -> BrowserContext:
+        """Creates a context with a page already on the homepage, like a freshly initialized browser."""
+        context = await self._new_context(record_video_dir)
+        page: Page = await context.new_page()
+        try:
+            await page.goto(PlaywrightManager._homepage)
+        except Exception as e:
+            # A blank page is still a ready context, the task navigates anyway
+            logger.debug(f"Warm browser context could not open the homepage: {e}")
+        return context
+
+    async def warm_up(self, record_video_dir: str | None = None):
+        """
+        Launches the browser and creates the ready contexts, for the server to call at startup.
+
+        Args:
+            record_video_dir (str | None): The video directory the tasks will record to, ready contexts only serve
+            tasks recording to the same directory.
+        """
+        if not self.enabled:
+            return
+        start_time = time.monotonic()
+        await self.get_browser()
+        self.refill(record_video_dir)
+        if self._refill_task is not None:
+            await self._refill_task
+        logger.info(f"Browser context pool warmed up with {len(self._warm)} ready contexts in {time.monotonic() - start_time:.2f} seconds")
+
+    def refill(self, record_video_dir: str | None = None):
+        """
+        Starts creating ready contexts in the background until warm_size are ready or the pool is full, unless already
+        refilling.
+        """
+        self._refill_video_dir = record_video_dir
+        if not self._has_room_for_warm_context() or (self._refill_task is not None and not self._refill_task.done()):
+            return
+        self._refill_task = asyncio.create_task(self._refill(record_video_dir))
+
+    def _has_room_for_warm_context(self) -> bool:
+        return len(self._warm) < self.warm_size and len(self._contexts) + len(self._warm) < self.size
+
+    async def _refill(self, record_video_dir: str | None):
+        while self._has_room_for_warm_context():
+            try:
+                context = await self._new_warm_context(record_video_dir)
+            except Exception as e:
+                self._stats["refill_errors"] += 1
+                logger.warning(f"Could not create a ready browser context: {e}")
+                return
+            if not self._has_room_for_warm_context():
+                # Tasks took the remaining places while the context was created
+                await self._close_context(context)
+                return
+            self._warm.append((record_video_dir, context))
+            self._stats["refills"] += 1
+
+    def get_stats(self) -> dict[str, int | float]:
+        """
+        Returns the pool's counters: 'hits' (tasks that got a ready context), 'misses' (tasks that waited for a new
+        one), 'hit_rate', the ready contexts created by 'refills' and their 'refill_errors', the contexts 'in_use' and
+        'ready', the pool 'size' and 'warm_size', and the 'avg_acquire_ms' a task waited for its context.
+        """
+        acquired = self._stats["hits"] + self._stats["misses"]
+        return {
+            "size": self.size,
+            "warm_size": self.warm_size,
+            "in_use": len(self._contexts),
+            "ready": len(self._warm),
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "hit_rate": round(self._stats["hits"] / acquired, 3) if acquired else 0.0,
+            "refills": self._stats["refills"],
+            "refill_errors": self._stats["refill_errors"],
+            "avg_acquire_ms": round(self._stats["acquire_seconds"] * 1000 / acquired, 1) if acquired else 0.0,
+        }
+
+    async def release(self, context: BrowserContext):
+        """
+        Closes a context returned by acquire (which also saves its videos) and frees its place in the pool.
+
+        Args:
+            context (BrowserContext): The context to release.
+        """
+        if context not in self._contexts:
+            return
+        self._contexts.discard(context)
+        try:
+            await self._close_context(context)
+        finally:
+            self._slots.release()
+        logger.info(f"Browser context released, {len(self._contexts)} of {self.size} in use")
+        # The freed place can hold a ready context again
+        self.refill(self._refill_video_dir)
+
+    async def _close_context(self, context: BrowserContext):
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled browser context: {e}")
+
+    async def close(self):
+        """
+        Closes every context of the pool, the ready ones included, and its browser.
+        """
+        for context in list(self._contexts):
+            await self.release(context)
+        # After the releases, which start refills
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            self._refill_task = None
+        for _, context in self._warm:
+            await self._close_context(context)
+        self._warm = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing the browser of the context pool: {e}")
+            self._browser = None
+
+
+# The pool shared by all API tasks of the process
+browser_context_pool = BrowserContextPool()
@@ -1,13 +1,17 @@
 import os
 import asyncio
-import tiktoken
 import logfire
 from typing import Optional
+from urllib.parse import urlparse
 from pydantic_ai.result import Usage
 from core.agents.browser_agent import BA_agent, BA_SYS_PROMPT, current_step_class
 from core.agents.planner_agent import PA_agent, PA_SYS_PROMPT
 from core.agents.critique_agent import CA_agent, CA_SYS_PROMPT
 from core.browser_manager import PlaywrightManager 
+from core.browser_manager import task_browser_context
+from core.browser_pool import browser_context_pool
+from core.skills.fetch_url import close_http_client
+from core.utils.resource_blocking import apply_resource_blocking
 from core.utils.ss_analysis import ImageAnalyzer
 from core.utils.openai_client import get_client
 from pydantic_ai.messages import ModelRequest, ModelResponse, ToolReturnPart
@@ -17,9 +21,6 @@ from core.utils.openai_msg_parser import AgentConversationHandler, ConversationS
 from core.utils.custom_exceptions import CustomException, PlannerError, BrowserNavigationError, SSAnalysisError, CritiqueError
 
 
-tokenizer = tiktoken.encoding_for_model("gpt-4o")
-
-
 def ensure_tool_response_sequence(messages):
     """Ensures that every tool call has a corresponding tool response"""
     tool_calls = {}
@@ -110,7 +111,7 @@ def filter_tool_interactions_for_critique(tool_interactions_str: str) -> str:
             continue
             
         # Check if this is a DOM-related tool call
-        if "Tool Call: get_dom_text" in interaction or "Tool Call: get_dom_fields" in interaction:
+        if any(f"Tool Call: {tool}" in interaction for tool in ("get_dom_text", "get_dom_fields", "get_dom_tables", "scroll_and_collect_tool", "fetch_url_text_tool", "read_urls_tool")):
             # Split the interaction into lines
             lines = interaction.split('\n')
             # Keep only the essential lines
@@ -136,7 +137,7 @@ def filter_dom_messages(messages):
     """
     Filter message history to replace all DOM responses with placeholder text.
     """
-    DOM_TOOLS = {'get_dom_text', 'get_dom_fields'}
+    DOM_TOOLS = {'get_dom_text', 'get_dom_fields', 'get_dom_tables', 'scroll_and_collect_tool', 'fetch_url_text_tool', 'read_urls_tool'}
     filtered_messages = []
     
     for msg in messages:
@@ -173,6 +174,11 @@ class Orchestrator:
     def __init__(self, input_mode: str = "GUI_ONLY") -> None:
         self.client = get_client()
         self.browser_manager = None
+        # API tasks run on their own context from the browser context pool, the others on the shared context
+        self.uses_browser_pool = input_mode == "API" and browser_context_pool.enabled
+        self.browser_context = None
+        # Blocked and allowed request counters of the task's browser context, when a blocking profile is set
+        self.resource_blocking_stats = None
         self.shutdown_event = asyncio.Event()
         self.input_mode = input_mode
         self.conversation_handler = AgentConversationHandler()
@@ -192,6 +198,8 @@ class Orchestrator:
         self.iteration_counter = 0
         self.session_id = None
         self.current_url = None
+        # SS analysis responses of this task, concurrent API tasks each keep their own
+        self.ss_analysis_history = []
         self.ss_enabled = os.getenv('AGENTIC_BROWSER_SS_ENABLED', 'false').lower() == 'true'
 
 
@@ -222,14 +230,23 @@ class Orchestrator:
             self.browser_manager = await self.initialize_browser_manager()
             logger.info("Browser initialized for task")
             
-            # Navigate to initial URL if provided
-            if self.current_url:
+            # Navigate to initial URL if provided, a ready context from the pool may already show it
+            if self.current_url and not await self.is_on_url(self.current_url):
                 try:
                     await self.browser_manager.navigate_to_url(self.current_url)
                 except Exception as e:
                     logger.error(f"Failed to navigate to initial URL: {str(e)}")
                     raise
 
+    async def is_on_url(self, url: str) -> bool:
+        """Whether the current page already shows the URL, ignoring the protocol, a www. prefix and a trailing slash"""
+        page = await self.browser_manager.get_current_page()
+        def normalize(address: str) -> str:
+            address = address if address.startswith(('http://', 'https://')) else "https://" + address
+            parsed = urlparse(address)
+            return parsed.netloc.removeprefix("www.") + parsed.path.rstrip("/") + (f"?{parsed.query}" if parsed.query else "")
+        return normalize(page.url) == normalize(url)
+
     async def navigate_to_url(self, url: str):
         """Handle URL navigation"""
         if self.browser_manager:
@@ -255,7 +272,7 @@ class Orchestrator:
                 'browser': [],
                 'critique': []
             }
-            ImageAnalyzer.clear_history()
+            self.ss_analysis_history = []
         self.iteration_counter = 0  
     
     async def initialize_browser_manager(self):
@@ -265,7 +282,16 @@ class Orchestrator:
         else:
             browser_manager = PlaywrightManager(gui_input_mode="GUI_ONLY")
         self.browser_manager = browser_manager
-        await self.browser_manager.async_initialize()
+        if self.uses_browser_pool:
+            # Concurrent API tasks each get an isolated context on the shared browser
+            record_video_dir = browser_manager.get_video_dir() if browser_manager.get_video_recording() else None
+            self.browser_context = await browser_context_pool.acquire(record_video_dir)
+            task_browser_context.set(self.browser_context)
+        else:
+            await self.browser_manager.async_initialize()
+        if self.input_mode == "API":
+            # The headless agent reads DOM and text, the blocking profile spares it the downloads it does not need
+            self.resource_blocking_stats = await apply_resource_blocking(await self.browser_manager.get_browser_context())
         logger.info(f"Browser manager initialized : {browser_manager}")
         return browser_manager
     
@@ -282,6 +308,9 @@ class Orchestrator:
     async def run(self, command, start_url: Optional[str] = None):
         if not self.browser_manager:
             self.browser_manager = await self.initialize_browser_manager()
+        if self.browser_context is not None:
+            # Skills find the task's pages through the context variable, make sure this task sees it
+            task_browser_context.set(self.browser_context)
 
         if start_url and start_url != self.current_url:
             await self.navigate_to_url(start_url)
@@ -384,10 +413,10 @@ class Orchestrator:
                     if self.ss_enabled:
                         try:
                             logfire.info("Taking Pre_Action_SS")
-                            pre_action_ss = await self.browser_manager.take_screenshots(
+                            pre_action_ss = await self.browser_manager.capture_screenshot(
                                 "Pre_Action_SS", page=None, full_page=False
                             )
-                            logfire.info(f"SS Saved to Path: {pre_action_ss}")
+                            logfire.info(f"Pre_Action_SS taken, saved to: {pre_action_ss.path if pre_action_ss else None}")
                         except Exception as e:
                             error_msg = f"Failed to take Pre_Action_SS: {str(e)}"
                             logfire.error(error_msg, exc_info=True)
@@ -482,10 +511,10 @@ class Orchestrator:
                     if self.ss_enabled:
                         try:
                             logfire.info("Taking Post_Action_SS")
-                            post_action_ss = await self.browser_manager.take_screenshots(
+                            post_action_ss = await self.browser_manager.capture_screenshot(
                                 "Post_Action_SS", page=None, full_page=False
                             )
-                            logfire.info(f"Post_Action_SS Saved to Path: {post_action_ss}")
+                            logfire.info(f"Post_Action_SS taken, saved to: {post_action_ss.path if post_action_ss else None}")
                         except Exception as e:
                             error_msg = f"Failed to take Post_Action_SS: {str(e)}"
                             logfire.error(error_msg, exc_info=True)
@@ -503,7 +532,8 @@ class Orchestrator:
                             ss_analysis_response = ImageAnalyzer(
                                 pre_action_ss, 
                                 post_action_ss, 
-                                c_step
+                                c_step,
+                                history=self.ss_analysis_history
                             ).analyze_images()
                             self.conversation_handler.add_ss_analysis_message(ss_analysis_response)
                             
@@ -654,15 +684,34 @@ class Orchestrator:
         await self.shutdown_event.wait()
 
     async def shutdown(self):
-        if self.browser_manager:
-            await self.browser_manager.stop_playwright()
+        if self.uses_browser_pool:
+            # Other tasks share the browser and the HTTP client, only this task's context is closed
+            await self.release_browser_context()
+        else:
+            if self.browser_manager:
+                await self.browser_manager.stop_playwright()
+            await close_http_client()
+
+    async def release_browser_context(self):
+        """Gives the task's context back to the pool, the browser and the other tasks' contexts keep running"""
+        browser_context, self.browser_context = self.browser_context, None
+        if browser_context is not None:
+            await browser_context_pool.release(browser_context)
 
     async def cleanup(self):
         """Modified cleanup to handle session persistence"""
         if self.input_mode != "GUI_ONLY" and not self.session_id:
             # Full cleanup only if not in a persistent session
-            if self.browser_manager:
-                await self.browser_manager.stop_playwright()
+            if self.resource_blocking_stats is not None:
+                logfire.info(f"Task network requests, {self.resource_blocking_stats.summary()}")
+                self.resource_blocking_stats = None
+            if self.uses_browser_pool:
+                # Other tasks share the browser and the HTTP client, only this task's context is closed
+                await self.release_browser_context()
+            else:
+                if self.browser_manager:
+                    await self.browser_manager.stop_playwright()
+                await close_http_client()
             self.shutdown_event.set()
         else:
             # Partial cleanup for GUI mode or persistent sessions
@@ -15,7 +15,11 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from asyncio.subprocess import Process
 
+from core.browser_manager import PlaywrightManager
+from core.browser_pool import browser_context_pool
 from core.orchestrator import Orchestrator
+from core.skills.fetch_url import close_http_client
+from core.utils.dom_snapshot_cache import get_snapshot_cache_stats
 
 class CommandQueryModel(BaseModel):
     command: str = Field(..., description="The command related to web navigation to execute.")
@@ -66,6 +70,24 @@ def get_app() -> FastAPI:
 
 app = get_app()
 
+@app.on_event("startup")
+async def start_browser_pool():
+    """Launch the shared browser and open the ready contexts before the first task arrives"""
+    # Same browser settings as the task orchestrators, so that their contexts can be handed out as they are
+    browser_manager = PlaywrightManager(gui_input_mode=False, take_screenshots=True, headless=True)
+    record_video_dir = browser_manager.get_video_dir() if browser_manager.get_video_recording() else None
+    try:
+        await browser_context_pool.warm_up(record_video_dir)
+    except Exception as e:
+        # Tasks still get contexts created on demand
+        logger.error(f"Failed to warm up the browser context pool: {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown_browser_pool():
+    """Close the browser shared by the tasks and the pooled HTTP client"""
+    await browser_context_pool.close()
+    await close_http_client()
+
 async def stream_subprocess_output(process: Process, all_stdout: list, all_stderr: list):
     """Stream output from subprocess with real-time terminal logging."""
     
@@ -104,6 +126,7 @@ async def execute_task(request: Request, query_model: CommandQueryModel) -> Stre
             detail=f"Task with ID {task_id} is already in progress."
         )
     
+    orchestrator = None
     try:
         # Create task-specific orchestrator with headless browser
         orchestrator = Orchestrator(input_mode="API")
@@ -128,6 +151,9 @@ async def execute_task(request: Request, query_model: CommandQueryModel) -> Stre
         )
 
     except Exception as e:
+        if task_id not in active_tasks and orchestrator is not None:
+            # Give back the browser context of a task that failed before it was registered
+            await orchestrator.cleanup()
         await cleanup_task(task_id)
         logger.error(f"Failed to initialize task {task_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Task initialization failed")
@@ -137,6 +163,16 @@ async def execute_task(request: Request, query_model: CommandQueryModel) -> Stre
         media_type="text/event-stream"
     )
 
+@app.get("/browser_pool_stats")
+async def browser_pool_stats() -> dict:
+    """Hit and miss counters and occupancy of the browser context pool"""
+    return browser_context_pool.get_stats()
+
+@app.get("/dom_cache_stats")
+async def dom_cache_stats() -> dict:
+    """Hit and miss counters of the in-memory DOM snapshot cache"""
+    return get_snapshot_cache_stats()
+
 async def stream_notifications(task_id: str) -> AsyncGenerator[str, None]:
     """Stream notifications to the client."""
     notification_queue = active_tasks[task_id]["notification_queue"]
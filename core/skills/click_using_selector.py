@@ -7,12 +7,71 @@ from playwright.async_api import ElementHandle
 from playwright.async_api import Page
 
 from core.browser_manager import PlaywrightManager
-from core.utils.dom_helper import get_element_outer_html
+from core.utils.cdp_accessibility_tree import materialize_mmid_selector
+from core.utils.dom_frames import get_frame_for_selector
+from core.utils.dom_helper import OPENING_TAG_ATTRIBUTES
+from core.utils.dom_helper import READ_ELEMENT_JS
+from core.utils.dom_helper import RESOLVE_ELEMENT_JS
+from core.utils.dom_helper import format_opening_tag
+from core.utils.dom_helper import get_element_metadata
+from core.utils.dom_helper import query_selector
 from core.utils.dom_mutation_observer import subscribe  # type: ignore
 from core.utils.dom_mutation_observer import unsubscribe  # type: ignore
 from core.utils.logger import logger
 from core.utils.ui_messagetype import MessageType
 
+# In-page click shared by the fused and the JavaScript click. Options are selected in their <select>, links are kept
+# in the same tab, and a menu opened by the click (aria-expanded turning true) is reported.
+CLICK_ELEMENT_JS = """(element, selector) => {
+    if (element.tagName.toLowerCase() === "option") {
+        let value = element.text;
+        let parent = element.closest("select") || element.parentElement;
+
+        parent.value = element.value; // Directly set the value if possible
+        // Trigger the events a user selection fires
+        parent.dispatchEvent(new Event('input', { bubbles: true }));
+        parent.dispatchEvent(new Event('change', { bubbles: true }));
+
+        console.log("Select menu option", value, "selected");
+        return "Select menu option: "+ value+ " selected";
+    }
+    console.log("About to click selector", selector);
+    // If the element is a link, make it open in the same tab
+    if (element.tagName.toLowerCase() === "a") {
+        element.target = "_self";
+    }
+    let ariaExpandedBeforeClick = element.getAttribute('aria-expanded');
+    element.click();
+    let ariaExpandedAfterClick = element.getAttribute('aria-expanded');
+    if (ariaExpandedBeforeClick === 'false' && ariaExpandedAfterClick === 'true') {
+        return "Executed JavaScript Click on element with selector: "+selector +". Very important: As a consequence a menu has appeared where you may need to make further selction. Very important: Get all_fields DOM to complete the action.";
+    }
+    return "Executed JavaScript Click on element with selector: "+selector;
+}"""
+
+# Resolves, scrolls into view, summarizes and clicks the element in a single evaluate. Returns null when the element
+# is not there (yet), so that the caller can fall back to waiting for it with Playwright.
+FUSED_CLICK_JS = """(params) => {
+    const resolveElement = __RESOLVE_ELEMENT__;
+    const readElement = __READ_ELEMENT__;
+    const clickElement = __CLICK_ELEMENT__;
+    const element = resolveElement(params.selector);
+    if (!element) return null;
+
+    const rect = element.getBoundingClientRect();
+    if (rect.bottom < 0 || rect.right < 0 || rect.top > window.innerHeight || rect.left > window.innerWidth) {
+        element.scrollIntoView({ block: 'center', inline: 'nearest' });
+    }
+    // Hidden elements are clicked anyway, like in the Playwright path, the flag is only logged
+    const visible = element.getClientRects().length > 0 && window.getComputedStyle(element).visibility !== 'hidden';
+    // Read before the click, which may change the element or navigate away
+    const metadata = readElement(element, params.attributes);
+    metadata.visible = visible;
+    metadata.option_value = metadata.tag_name === 'option' ? element.value : null;
+    metadata.message = clickElement(element, params.selector);
+    return metadata;
+}""".replace("__RESOLVE_ELEMENT__", RESOLVE_ELEMENT_JS).replace("__READ_ELEMENT__", READ_ELEMENT_JS).replace("__CLICK_ELEMENT__", CLICK_ELEMENT_JS)
+
 
 async def click(selector: Annotated[str, "The properly formed query selector string to identify the element for the click action (e.g. [mmid='114']). When \"mmid\" attribute is present, use it for the query selector."],
                 wait_before_execution: Annotated[float, "Optional wait time in seconds before executing the click event logic.", float] = 0.0) -> Annotated[str, "A message indicating success or failure of the click."]:
@@ -40,6 +99,7 @@ async def click(selector: Annotated[str, "The properly formed query selector str
 
     await browser_manager.take_screenshots(f"{function_name}_start", page)
 
+    await materialize_mmid_selector(page, selector)
     await browser_manager.highlight_element(selector, True)
 
     dom_changes_detected=None
@@ -77,14 +137,21 @@ async def do_click(page: Page, selector: str, wait_before_execution: float) -> d
     if wait_before_execution > 0:
         await asyncio.sleep(wait_before_execution)
 
+    result = await perform_fused_click(page, selector)
+    if result is not None:
+        return result
+
     # Wait for the selector to be present and ensure it's attached and visible. If timeout, try javascript click
     try:
         logger.info(f"Executing ClickElement with \"{selector}\" as the selector. Waiting for the element to be attached and visible.")
 
-        element = await asyncio.wait_for(
-            page.wait_for_selector(selector, state="attached", timeout=2000),
-            timeout=2000
-        )
+        # mmid selectors resolve instantly through the in-page index, wait for the selector only if it is not there yet
+        element = await query_selector(page, selector)
+        if element is None:
+            element = await asyncio.wait_for(
+                get_frame_for_selector(page, selector).wait_for_selector(selector, state="attached", timeout=2000),
+                timeout=2000
+            )
         if element is None:
             raise ValueError(f"Element with selector: \"{selector}\" not found")
 
@@ -103,12 +170,13 @@ async def do_click(page: Page, selector: str, wait_before_execution: float) -> d
             # If the element is not visible, try to click it anyway
             pass
 
-        element_tag_name = await element.evaluate("element => element.tagName.toLowerCase()")
-        element_outer_html = await get_element_outer_html(element, page, element_tag_name)
+        element_metadata = await get_element_metadata(element)
+        element_tag_name = element_metadata["tag_name"]
+        element_outer_html = format_opening_tag(element_tag_name, element_metadata["attributes"])
 
 
         if element_tag_name == "option":
-            element_value = await element.get_attribute("value") # get the text that is in the value of the option
+            element_value = element_metadata["attributes"]["value"] # get the text that is in the value of the option
             parent_element = await element.evaluate_handle("element => element.parentNode")
             # await parent_element.evaluate(f"element => element.select_option(value=\"{element_value}\")")
             await parent_element.select_option(value=element_value) # type: ignore
@@ -130,6 +198,41 @@ async def do_click(page: Page, selector: str, wait_before_execution: float) -> d
         return {"summary_message": msg, "detailed_message": f"{msg}. Error: {e}"}
 
 
+async def perform_fused_click(page: Page, selector: str) -> dict[str, str] | None:
+    """
+    Clicks the element in a single round trip: it is resolved, scrolled into view, summarized and clicked by one
+    evaluate in its frame.
+
+    Parameters:
+    - page: The Playwright page instance.
+    - selector: The query selector string of the element.
+
+    Returns:
+    dict[str,str] | None - The outcome with 'summary_message' and 'detailed_message', None when the element is not
+    found or the selector is not a CSS selector, for the caller to fall back to the Playwright path.
+    """
+    try:
+        result = await get_frame_for_selector(page, selector).evaluate(FUSED_CLICK_JS, {"selector": selector, "attributes": OPENING_TAG_ATTRIBUTES})
+    except Exception as e:
+        if "Execution context was destroyed" in str(e):
+            # The click navigated away before the result came back, clicking again would act on the new page
+            msg = f"Executed JavaScript Click on element with selector: {selector}"
+            return {"summary_message": msg, "detailed_message": f"{msg}. The page navigated as a result of the click."}
+        logger.debug(f"Fused click on \"{selector}\" not possible, falling back to Playwright. Error: {e}")
+        return None
+    if result is None:
+        logger.info(f"Element with selector: \"{selector}\" not found yet, falling back to waiting for it with Playwright.")
+        return None
+
+    logger.info(f"Executed fused click on element with selector: \"{selector}\" (visible: {result['visible']})")
+    element_outer_html = format_opening_tag(result["tag_name"], result["attributes"])
+    if result["tag_name"] == "option":
+        msg = f'Select menu option "{result["option_value"]}" selected'
+        return {"summary_message": msg, "detailed_message": f"{msg}. The select element's outer HTML is: {element_outer_html}."}
+    msg = result["message"]
+    return {"summary_message": msg, "detailed_message": f"{msg} The clicked element's outer HTML is: {element_outer_html}."}
+
+
 async def is_element_present(page: Page, selector: str) -> bool:
     """
     Checks if an element is present on the page.
@@ -141,7 +244,7 @@ async def is_element_present(page: Page, selector: str) -> bool:
     Returns:
     - True if the element is present, False otherwise.
     """
-    element = await page.query_selector(selector)
+    element = await query_selector(page, selector)
     return element is not None
 
 
@@ -172,43 +275,19 @@ async def perform_javascript_click(page: Page, selector: str):
     - None
     """
     js_code = """(selector) => {
-        let element = document.querySelector(selector);
+        const resolveElement = __RESOLVE_ELEMENT__;
+        const clickElement = __CLICK_ELEMENT__;
+        let element = resolveElement(selector);
 
         if (!element) {
             console.log(`perform_javascript_click: Element with selector ${selector} not found`);
             return `perform_javascript_click: Element with selector ${selector} not found`;
         }
-
-        if (element.tagName.toLowerCase() === "option") {
-            let value = element.text;
-            let parent = element.parentElement;
-
-            parent.value = element.value; // Directly set the value if possible
-            // Trigger change event if necessary
-            let event = new Event('change', { bubbles: true });
-            parent.dispatchEvent(event);
-
-            console.log("Select menu option", value, "selected");
-            return "Select menu option: "+ value+ " selected";
-        }
-        else {
-            console.log("About to click selector", selector);
-            // If the element is a link, make it open in the same tab
-            if (element.tagName.toLowerCase() === "a") {
-                element.target = "_self";
-            }
-            let ariaExpandedBeforeClick = element.getAttribute('aria-expanded');
-            element.click();
-            let ariaExpandedAfterClick = element.getAttribute('aria-expanded');
-            if (ariaExpandedBeforeClick === 'false' && ariaExpandedAfterClick === 'true') {
-                return "Executed JavaScript Click on element with selector: "+selector +". Very important: As a consequence a menu has appeared where you may need to make further selction. Very important: Get all_fields DOM to complete the action.";
-            }
-            return "Executed JavaScript Click on element with selector: "+selector;
-        }
-    }"""
+        return clickElement(element, selector);
+    }""".replace("__RESOLVE_ELEMENT__", RESOLVE_ELEMENT_JS).replace("__CLICK_ELEMENT__", CLICK_ELEMENT_JS)
     try:
         logger.info(f"Executing JavaScript click on element with selector: {selector}")
-        result:str = await page.evaluate(js_code, selector)
+        result:str = await get_frame_for_selector(page, selector).evaluate(js_code, selector)
         logger.debug(f"Executed JavaScript Click on element with selector: {selector}")
         return result
     except Exception as e:
@@ -5,6 +5,7 @@ from core.browser_manager import PlaywrightManager
 from core.skills.click_using_selector import do_click
 from core.skills.enter_text_using_selector import do_entertext
 from core.skills.press_key_combination import do_press_key_combination
+from core.utils.cdp_accessibility_tree import materialize_mmid_selector
 from core.utils.logger import logger
 from core.utils.ui_messagetype import MessageType
 
@@ -44,6 +45,8 @@ async def enter_text_and_click(
         logger.error("No active page found")
         raise ValueError('No active page found. OpenURL command opens a new page.')
 
+    await materialize_mmid_selector(page, text_selector)
+    await materialize_mmid_selector(page, click_selector)
     await browser_manager.highlight_element(text_selector, True)
 
     function_name = inspect.currentframe().f_code.co_name # type: ignore
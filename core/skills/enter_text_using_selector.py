@@ -9,7 +9,11 @@ from playwright.async_api import Page
 
 from core.browser_manager import PlaywrightManager
 from core.skills.press_key_combination import press_key_combination
+from core.utils.cdp_accessibility_tree import materialize_mmid_selector
+from core.utils.dom_frames import get_frame_for_selector
+from core.utils.dom_helper import RESOLVE_ELEMENT_JS
 from core.utils.dom_helper import get_element_outer_html
+from core.utils.dom_helper import query_selector
 from core.utils.dom_mutation_observer import subscribe
 from core.utils.dom_mutation_observer import unsubscribe
 from core.utils.logger import logger
@@ -62,18 +66,19 @@ async def custom_fill_element(page: Page, selector: str, text_to_enter: str):
     """
     selector = f"{selector}"  # Ensures the selector is treated as a string
     try:
-        result = await page.evaluate(
+        result = await get_frame_for_selector(page, selector).evaluate(
             """(inputParams) => {
             const selector = inputParams.selector;
             let text_to_enter = inputParams.text_to_enter;
             text_to_enter = text_to_enter.trim();
-            const element = document.querySelector(selector);
+            const resolveElement = __RESOLVE_ELEMENT__;
+            const element = resolveElement(selector);
             if (!element) {
                 throw new Error(`Element not found: ${selector}`);
             }
             element.value = text_to_enter;
             return `Value set for ${selector}`;
-        }""",
+        }""".replace("__RESOLVE_ELEMENT__", RESOLVE_ELEMENT_JS),
             {"selector": selector, "text_to_enter": text_to_enter},
         )
         logger.debug(f"custom_fill_element result: {result}")
@@ -125,6 +130,7 @@ async def entertext(entry: Annotated[EnterTextEntry, "An object containing 'quer
 
     await browser_manager.take_screenshots(f"{function_name}_start", page)
 
+    await materialize_mmid_selector(page, query_selector)
     await browser_manager.highlight_element(query_selector, True)
 
     dom_changes_detected=None
@@ -134,17 +140,18 @@ async def entertext(entry: Annotated[EnterTextEntry, "An object containing 'quer
 
     subscribe(detect_dom_changes)
 
-    await page.evaluate(
+    await get_frame_for_selector(page, query_selector).evaluate(
         """
         (selector) => {
-            const element = document.querySelector(selector);
+            const resolveElement = __RESOLVE_ELEMENT__;
+            const element = resolveElement(selector);
             if (element) {
                 element.value = '';
             } else {
                 console.error('Element not found:', selector);
             }
         }
-        """,
+        """.replace("__RESOLVE_ELEMENT__", RESOLVE_ELEMENT_JS),
         query_selector,
     )
 
@@ -190,7 +197,10 @@ async def do_entertext(page: Page, selector: str, text_to_enter: str, use_keyboa
 
         logger.debug(f"Looking for selector {selector} to enter text: {text_to_enter}")
 
-        elem = await page.query_selector(selector)
+        elem = await query_selector(page, selector)
+        if elem is None:
+            # The in-page lookup uses document.querySelector, Playwright's also pierces open shadow roots
+            elem = await page.query_selector(selector)
 
         if elem is None:
             error = f"Error: Selector {selector} not found. Unable to continue."
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import time
+from typing import Annotated
+
+import httpx
+
+from core.skills.get_dom_with_content_type import get_dom_texts_func
+from core.skills.open_url import ensure_protocol
+from core.skills.open_url import openurl
+from core.utils.dom_budget import DOM_TOKEN_BUDGET
+from core.utils.dom_budget import fit_text_to_budget
+from core.utils.html_text import html_to_text
+from core.utils.logger import logger
+import logfire
+
+# Seconds to wait for the server before falling back to the browser
+FAST_FETCH_TIMEOUT = float(os.getenv("AGENTIC_BROWSER_FAST_FETCH_TIMEOUT", "10"))
+
+# Larger documents are cut off, their beginning is usually what a read step needs
+FAST_FETCH_MAX_BYTES = 5 * 1024 * 1024
+
+# Sent so that servers return the page they would return to the browser
+FAST_FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the HTTP client shared by all fetches, created on first use. Its connection pool keeps connections to the
+    hosts of previous fetches open, so consecutive pages of the same site skip the TCP and TLS handshakes.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers=FAST_FETCH_HEADERS,
+            follow_redirects=True,
+            timeout=FAST_FETCH_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def fetch_url_text(
+    url: Annotated[str, "The URL to read. Value must include the protocol (http:// or https://)."],
+    token_budget: Annotated[int, "Maximum number of tokens to return, 0 for no limit"] = DOM_TOKEN_BUDGET,
+) -> Annotated[str, "The text content of the page at the URL"]:
+    """
+    Reads the text of a page without navigating the browser: the page is downloaded over HTTP and its HTML converted to
+    text in a worker thread. Pages that need JavaScript to show their content (little static text, a <noscript>
+    message asking for JavaScript), non HTML responses and failed requests fall back to opening the URL in the browser
+    and reading its text there.
+
+    Parameters
+    ----------
+    url : str
+        The URL to read.
+    token_budget : int
+        Maximum number of tokens to return. Longer texts are reduced to fit and a note says what was left out.
+
+    Returns
+    -------
+    str
+        The title and text of the page, with a first line telling whether the browser was used.
+    """
+    url = ensure_protocol(url)
+    logger.info(f"Executing Fetch URL Text Command for {url}")
+    logfire.info("Executing Fetch URL Text Command")
+    start_time = time.time()
+
+    fallback_reason = None
+    try:
+        async with get_http_client().stream("GET", url) as response:
+            content_type = response.headers.get("content-type", "")
+            if response.status_code >= 400:
+                fallback_reason = f"the server answered {response.status_code}"
+            elif "html" not in content_type and not content_type.startswith("text/"):
+                fallback_reason = f"the response is not a web page ({content_type or 'no content type'})"
+            else:
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= FAST_FETCH_MAX_BYTES:
+                        break
+                final_url = str(response.url)
+                html = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        fallback_reason = f"the request failed ({type(e).__name__})"
+
+    if fallback_reason is None:
+        page_text = await asyncio.to_thread(html_to_text, html)
+        fallback_reason = page_text.needs_javascript()
+
+    if fallback_reason is not None:
+        logger.info(f"Reading {url} in the browser because {fallback_reason}")
+        open_result = await openurl(url)
+        text_content = await get_dom_texts_func(token_budget=token_budget)
+        return f"Read in the browser because {fallback_reason}. {open_result}\n{text_content}"
+
+    text_content = page_text.text
+    if page_text.alt_texts:
+        text_content += "\nOther Alt Texts in the page: " + " ".join(page_text.alt_texts)
+    elapsed_time = time.time() - start_time
+    logger.info(f"Fetched {final_url} without the browser in {elapsed_time:.2f} seconds, {len(text_content)} characters")
+    header = f"Fetched without the browser (the browser is still on its previous page): {final_url}, Title: {page_text.title}"
+    return f"{header}\n{fit_text_to_budget(text_content, token_budget, 'fetch_url_text_tool')}"
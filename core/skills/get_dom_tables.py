@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+import os
+import time
+from typing import Annotated
+from typing import Any
+
+from playwright.async_api import Page
+
+from core.browser_manager import PlaywrightManager
+from core.utils.dom_budget import DOM_TOKEN_BUDGET
+from core.utils.dom_budget import fit_text_to_budget
+from core.utils.dom_helper import DEEP_ELEMENTS_JS
+from core.utils.dom_helper import wait_for_non_loading_dom_state
+from core.utils.dom_snapshot_cache import get_or_create_snapshot
+from core.utils.logger import logger
+import logfire
+
+# "csv" (default) or "json" (one array per row)
+DOM_TABLE_FORMAT = os.getenv("AGENTIC_BROWSER_DOM_TABLE_FORMAT", "csv").lower()
+
+# Rows returned per table, the agent can ask for more rows of a single table
+DOM_TABLE_MAX_ROWS = int(os.getenv("AGENTIC_BROWSER_DOM_TABLE_MAX_ROWS", "50"))
+
+# Lists every visible data table of the page (<table> and ARIA table/grid/treegrid, open shadow roots included) as a
+# grid of cell texts, in a single evaluate. Row and column spans are expanded so every row has one value per column.
+# Layout tables (role presentation, tables holding other tables) and tables with less than two rows are skipped.
+TABLES_JS = """
+(params) => {
+    const deepElements = __DEEP_ELEMENTS__;
+    const tableSelector = 'table, [role=table], [role=grid], [role=treegrid]';
+    const cellSelector = '[role=cell], [role=gridcell], [role=columnheader], [role=rowheader]';
+    const normalize = (text) => (text || '').replace(/\\s+/g, ' ').trim();
+
+    const isHtmlTable = (element) => element.tagName === 'TABLE' && !element.getAttribute('role');
+    const getRows = (table) => {
+        if (isHtmlTable(table)) return Array.from(table.rows);
+        return Array.from(table.querySelectorAll('[role=row]')).filter(row => row.closest(tableSelector) === table);
+    };
+    const getCells = (table, row) => {
+        if (isHtmlTable(table)) return Array.from(row.cells);
+        return Array.from(row.querySelectorAll(cellSelector)).filter(cell => cell.closest('[role=row]') === row);
+    };
+    const isHeaderCell = (cell) => cell.tagName === 'TH' || cell.getAttribute('role') === 'columnheader';
+    const getCaption = (table) => {
+        const labelledBy = table.getAttribute('aria-labelledby');
+        return normalize((table.caption && table.caption.innerText) || table.getAttribute('aria-label')
+            || (labelledBy && labelledBy.split(/\\s+/).map(id => document.getElementById(id)).filter(Boolean).map(e => e.innerText).join(' ')));
+    };
+
+    const tables = [];
+    for (const table of deepElements(document)) {
+        if (!table.matches(tableSelector) || ['presentation', 'none'].includes(table.getAttribute('role'))) continue;
+        if (table.querySelector('table') || !table.getClientRects().length) continue;
+        const rows = getRows(table).filter(row => row.getClientRects().length);
+        if (rows.length < 2) continue;
+
+        // Expand row and column spans into a rectangular grid
+        const grid = [];
+        const headerRows = [];
+        rows.forEach((row, rowIndex) => {
+            grid[rowIndex] = grid[rowIndex] || [];
+            const cells = getCells(table, row);
+            let column = 0;
+            for (const cell of cells) {
+                while (grid[rowIndex][column] !== undefined) column++;
+                const text = normalize(cell.innerText);
+                const colSpan = Math.max(1, Math.min(parseInt(cell.getAttribute('colspan') || cell.getAttribute('aria-colspan')) || 1, 100));
+                const rowSpan = Math.max(1, Math.min(parseInt(cell.getAttribute('rowspan') || cell.getAttribute('aria-rowspan')) || 1, rows.length - rowIndex));
+                for (let r = 0; r < rowSpan; r++) {
+                    grid[rowIndex + r] = grid[rowIndex + r] || [];
+                    for (let c = 0; c < colSpan; c++) grid[rowIndex + r][column + c] = text;
+                }
+                column += colSpan;
+            }
+            const inHead = row.parentElement && row.parentElement.tagName === 'THEAD';
+            if (cells.length && (inHead || cells.every(isHeaderCell)) && headerRows.length === rowIndex) headerRows.push(rowIndex);
+        });
+        const width = grid.reduce((max, row) => Math.max(max, row.length), 0);
+        const rectangular = grid.map(row => Array.from({length: width}, (_, c) => row[c] === undefined ? '' : row[c]));
+
+        // Multi-row headers are joined per column, e.g. "Price / Monthly"
+        const header = headerRows.length
+            ? rectangular[0].map((_, c) => headerRows.map(r => rectangular[r][c]).filter((text, i, texts) => text && texts.indexOf(text) === i).join(' / '))
+            : null;
+        const body = rectangular.slice(headerRows.length).filter(row => row.some(text => text));
+        tables.push({caption: getCaption(table), header: header, rows: body.slice(0, params.max_rows), total_rows: body.length, columns: width});
+    }
+    return tables;
+}
+""".replace("__DEEP_ELEMENTS__", DEEP_ELEMENTS_JS)
+
+
+async def get_dom_tables_func(
+    output_format: Annotated[str, "'csv' or 'json' (one array per row)"] = DOM_TABLE_FORMAT,
+    max_rows: Annotated[int, "Maximum number of rows returned per table"] = DOM_TABLE_MAX_ROWS,
+    table_index: Annotated[int | None, "Return only the table with this number, as numbered in a previous call"] = None,
+    token_budget: Annotated[int, "Maximum number of tokens to return, 0 for no limit"] = DOM_TOKEN_BUDGET,
+) -> Annotated[str, "The data tables of the page"]:
+    """
+    Retrieves the data tables (HTML tables and ARIA grids) of the active page as CSV or JSON rows, with their header
+    row when there is one.
+
+    Parameters
+    ----------
+    output_format : str
+        'csv' for comma separated values, 'json' for a JSON object per table with its header and rows.
+    max_rows : int
+        Maximum number of rows returned per table. Longer tables end with a note telling how many rows were left out.
+    table_index : int | None
+        The number of a single table to return, as numbered in a previous call.
+    token_budget : int
+        Maximum number of tokens to return. Longer outputs are reduced to fit and a note says what was left out.
+
+    Returns
+    -------
+    str
+        The tables of the page, or a message saying there are none.
+
+    Raises
+    ------
+    ValueError
+        If no active page is found or the output format is not known.
+    """
+    logger.info("Executing Get DOM Tables Command")
+    logfire.info("Executing Get DOM Tables Command")
+
+    start_time = time.time()
+    if output_format not in ("csv", "json"):
+        raise ValueError(f"Unknown table output format '{output_format}', use 'csv' or 'json'.")
+
+    browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
+    page = await browser_manager.get_current_page()
+    if page is None:
+        raise ValueError('No active page found. OpenURL command opens a new page.')
+
+    await wait_for_non_loading_dom_state(page, 2000)
+
+    async def read_tables() -> str:
+        tables = await get_page_tables(page, max_rows)
+        return fit_text_to_budget(format_tables(tables, output_format, table_index), token_budget, "get_dom_tables")
+
+    tables_text = await get_or_create_snapshot(page, ("tables", output_format, max_rows, table_index, token_budget), read_tables)
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Get DOM Tables Command executed in {elapsed_time:.2f} seconds")
+    return tables_text
+
+
+async def get_page_tables(page: Page, max_rows: int = DOM_TABLE_MAX_ROWS) -> list[dict[str, Any]]:
+    """
+    Returns the data tables of the page, each as a dict with its 'caption', 'header' (None when the table has no header
+    row), up to `max_rows` 'rows', 'total_rows' and 'columns'.
+    """
+    return await page.evaluate(TABLES_JS, {"max_rows": max(max_rows, 0)})
+
+
+def format_tables(tables: list[dict[str, Any]], output_format: str, table_index: int | None = None) -> str:
+    """
+    Formats the tables returned by get_page_tables for the agent, each under a title line with its number and size.
+
+    Args:
+        tables (list[dict[str, Any]]): The tables of the page.
+        output_format (str): 'csv' or 'json'.
+        table_index (int | None): When given, only the table with this number (starting at 1) is formatted.
+
+    Returns:
+        str: The formatted tables.
+    """
+    if not tables:
+        return "No data tables found on the page. Use get_dom_text to read the page content."
+
+    numbered_tables = list(enumerate(tables, start=1))
+    if table_index is not None:
+        if not 1 <= table_index <= len(tables):
+            return f"There is no table {table_index}, the page has {len(tables)} data tables."
+        numbered_tables = [numbered_tables[table_index - 1]]
+
+    sections = []
+    for number, table in numbered_tables:
+        title = f"## Table {number}" + (f": {table['caption']}" if table["caption"] else "")
+        title += f" ({table['total_rows']} rows x {table['columns']} columns)"
+        if output_format == "json":
+            body = json.dumps({"header": table["header"], "rows": table["rows"]}, ensure_ascii=False, separators=(",", ":"))
+        else:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            if table["header"]:
+                writer.writerow(table["header"])
+            writer.writerows(table["rows"])
+            body = buffer.getvalue().rstrip("\n")
+        section = f"{title}\n{body}"
+        left_out = table["total_rows"] - len(table["rows"])
+        if left_out > 0:
+            section += (f"\n# {left_out} more rows not shown. Call get_dom_tables with table_index={number} and"
+                        f" max_rows={table['total_rows']} for all rows of this table.")
+        sections.append(section)
+    return "\n\n".join(sections)
@@ -1,27 +1,47 @@
 import os
 import time
 from typing import Annotated
-from typing import Any
 
 from playwright.async_api import Page
 
 from core.browser_manager import PlaywrightManager
+from core.utils.dom_budget import DOM_TOKEN_BUDGET
+from core.utils.dom_budget import fit_text_to_budget
 from core.utils.dom_helper import wait_for_non_loading_dom_state
+from core.utils.dom_main_content import DOM_TEXT_CONTENT
+from core.utils.dom_main_content import get_main_content_text
+from core.utils.dom_serializer import DOM_OUTPUT_FORMAT
+from core.utils.dom_snapshot_cache import get_or_create_snapshot
+from core.utils.dom_viewport import DOM_SCOPE
+from core.utils.dom_viewport import get_text_in_band
+from core.utils.dom_viewport import get_viewport_band
 from core.utils.get_detailed_accessibility_tree import do_get_accessibility_info
 from core.utils.logger import logger
 from core.utils.ui_messagetype import MessageType
 import logfire
 from config import SOURCE_LOG_FOLDER_PATH
 
-async def get_dom_texts_func() -> Annotated[str | None, "The text content of the DOM"]:
+async def get_dom_texts_func(
+    token_budget: Annotated[int, "Maximum number of tokens to return, 0 for no limit"] = DOM_TOKEN_BUDGET,
+    scope: Annotated[str, "'page' for the whole page or 'viewport' for one screenful"] = DOM_SCOPE,
+    page_token: Annotated[str | None, "The screen to return, from a previous viewport scoped call"] = None,
+    content: Annotated[str, "'full' for all the text of the page or 'main' for its main content only"] = DOM_TEXT_CONTENT,
+) -> Annotated[str | None, "The text content of the DOM"]:
     """
     Retrieves the text content of the active page's DOM.
 
     Parameters
     ----------
-    current_step : str
-        The current step in the workflow being executed. This helps track and log the context 
-        of the DOM extraction operation.
+    token_budget : int
+        Maximum number of tokens to return. Longer texts are reduced to fit and a note says what was left out.
+    scope : str
+        'page' for the text of the whole page, 'viewport' for the text of one screen (plus a margin).
+    page_token : str | None
+        The screen to return in viewport scope, as given by the previous call. Implies viewport scope.
+    content : str
+        'full' for all the text of the page, 'main' for its main content (article, documentation body) without
+        navigation, sidebars, footers and banners. Falls back to the full text when no main content is found.
+        Only applies to page scope.
 
     Returns
     -------
@@ -46,11 +66,29 @@ async def get_dom_texts_func() -> Annotated[str | None, "The text content of the
 
     await wait_for_non_loading_dom_state(page, 2000)
     
-    # Get filtered text content including alt text from images
-    text_content = await get_filtered_text_content(page)
-    file_path = os.path.join(SOURCE_LOG_FOLDER_PATH, 'text_only_dom.txt')
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(text_content)
+    viewport_band = await get_viewport_band(page, page_token) if scope == "viewport" or page_token else None
+
+    async def read_text() -> str:
+        content_note = None
+        if viewport_band is not None:
+            text_content = await get_text_in_band(page, viewport_band)
+        elif content == "main" and (main_content := await get_main_content_text(page)) is not None:
+            text_content, content_note = main_content
+        else:
+            # Get filtered text content including alt text from images
+            text_content = await get_filtered_text_content(page)
+        file_path = os.path.join(SOURCE_LOG_FOLDER_PATH, 'text_only_dom.txt')
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(text_content)
+
+        text_content = fit_text_to_budget(text_content, token_budget)
+        if content_note:
+            text_content = f"{text_content}\n{content_note}"
+        if viewport_band is not None:
+            text_content = f"{text_content}\n{viewport_band.describe('get_dom_text')}"
+        return text_content
+
+    text_content = await get_or_create_snapshot(page, ("text", token_budget, viewport_band, content), read_text)
 
     elapsed_time = time.time() - start_time
     logger.info(f"Get DOM Text Command executed in {elapsed_time:.2f} seconds")
@@ -61,9 +99,15 @@ async def get_dom_texts_func() -> Annotated[str | None, "The text content of the
 
 async def get_dom_field_func(
     current_step: Annotated[str, "The current step in the workflow being executed"],
-) -> Annotated[dict[str, Any] | None, "The interactive fields data from the DOM"]:
+    output_format: Annotated[str, "'compact' (one line per element) or 'repr'"] = DOM_OUTPUT_FORMAT,
+    token_budget: Annotated[int, "Maximum number of tokens to return, 0 for no limit"] = DOM_TOKEN_BUDGET,
+    all_fields: Annotated[bool, "Return every field instead of the ones most relevant to the current step"] = False,
+    scope: Annotated[str, "'page' for the whole page or 'viewport' for one screenful"] = DOM_SCOPE,
+    page_token: Annotated[str | None, "The screen to return, from a previous viewport scoped call"] = None,
+) -> Annotated[str | None, "The interactive fields data from the DOM"]:
     """
-    Retrieves all interactive fields from the active page's DOM.
+    Retrieves the interactive fields from the active page's DOM. Unless all_fields is set, pages with many fields
+    are reduced to the fields most relevant to the current step.
     """
     logger.info("Executing Get DOM Fields Command")
     logfire.info("Executing Get DOM Fields Command")
@@ -78,8 +122,15 @@ async def get_dom_field_func(
 
     await wait_for_non_loading_dom_state(page, 2000)
     
+    viewport_band = await get_viewport_band(page, page_token) if scope == "viewport" or page_token else None
+
+    relevance_query = None if all_fields else current_step
+
     # Get all interactive elements, including clickable ones
-    raw_data = await do_get_accessibility_info(page, only_input_fields=True)
+    raw_data = await get_or_create_snapshot(
+        page, ("fields", output_format, token_budget, relevance_query, viewport_band),
+        lambda: do_get_accessibility_info(page, only_input_fields=True, output_format=output_format, token_budget=token_budget,
+                                          relevance_query=relevance_query, viewport_band=viewport_band))
 
     elapsed_time = time.time() - start_time
     logger.info(f"Get DOM Fields Command executed in {elapsed_time:.2f} seconds")
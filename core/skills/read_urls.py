@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+from typing import Annotated
+from typing import Any
+
+from playwright.async_api import Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from core.browser_manager import PlaywrightManager
+from core.skills.get_dom_with_content_type import get_filtered_text_content
+from core.skills.open_url import ensure_protocol
+from core.utils.dom_budget import DOM_TOKEN_BUDGET
+from core.utils.dom_budget import fit_text_to_budget
+from core.utils.dom_helper import wait_for_non_loading_dom_state
+from core.utils.dom_main_content import DOM_TEXT_CONTENT
+from core.utils.dom_main_content import get_main_content_text
+from core.utils.logger import logger
+import logfire
+
+# Number of background pages loading at the same time
+READ_URLS_CONCURRENCY = int(os.getenv("AGENTIC_BROWSER_READ_URLS_CONCURRENCY", "4"))
+
+# Seconds allowed per URL, from opening its page to reading its text
+READ_URLS_TIMEOUT = float(os.getenv("AGENTIC_BROWSER_READ_URLS_TIMEOUT", "20"))
+
+# URLs read per call, more would leave each page too small a share of the token budget
+READ_URLS_MAX_URLS = 10
+
+
+async def read_urls(
+    urls: Annotated[list[str], "The URLs to read, e.g. the result links of a search. Values must include the protocol."],
+    content: Annotated[str, "'full' for all the text of each page or 'main' for its main content only"] = DOM_TEXT_CONTENT,
+    timeout: Annotated[float, "Seconds allowed per URL"] = READ_URLS_TIMEOUT,
+    token_budget: Annotated[int, "Maximum number of tokens to return for all URLs together, 0 for no limit"] = DOM_TOKEN_BUDGET,
+) -> Annotated[str, "The text content of each URL"]:
+    """
+    Reads the text of several URLs at once: each URL is opened in a background page of the browser, a few at a time,
+    and its text read there. The user facing page is not navigated. URLs that fail to load in time are reported with
+    their error instead of their text.
+
+    Parameters
+    ----------
+    urls : list[str]
+        The URLs to read, at most READ_URLS_MAX_URLS per call.
+    content : str
+        'full' for all the text of each page, 'main' for its main content (article, documentation body) without
+        navigation, sidebars and footers. Pages without a detectable main content return their full text.
+    timeout : float
+        Seconds allowed per URL. Slower pages are reported as timed out.
+    token_budget : int
+        Maximum number of tokens to return, shared equally between the URLs.
+
+    Returns
+    -------
+    str
+        One section per URL with its title and text, or the reason it could not be read.
+    """
+    logger.info(f"Executing Read URLs Command for {len(urls)} URLs")
+    logfire.info("Executing Read URLs Command")
+    start_time = time.time()
+
+    # Keep the order of the URLs, drop repeated ones
+    urls = list(dict.fromkeys(ensure_protocol(url.strip()) for url in urls if url and url.strip()))
+    if not urls:
+        return "No URLs given."
+    skipped_urls = urls[READ_URLS_MAX_URLS:]
+    urls = urls[:READ_URLS_MAX_URLS]
+
+    browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
+    # Taken before any background page opens, the readers' pages appear in the context while they open
+    current_page = await browser_manager.get_current_page()
+    semaphore = asyncio.Semaphore(max(READ_URLS_CONCURRENCY, 1))
+
+    async def read_with_limit(url: str) -> dict[str, Any]:
+        async with semaphore:
+            return await read_url_in_background(browser_manager, url, content, timeout, current_page)
+
+    results = await asyncio.gather(*(read_with_limit(url) for url in urls))
+
+    url_budget = token_budget // len(urls) if token_budget > 0 else 0
+    sections = []
+    for number, (url, result) in enumerate(zip(urls, results), start=1):
+        if result["error"]:
+            sections.append(f"## {number}. {url}\nCould not be read: {result['error']}")
+        else:
+            title = f"## {number}. {result['url']}" + (f", Title: {result['title']}" if result["title"] else "")
+            sections.append(f"{title}\n{fit_text_to_budget(result['text'], url_budget, 'read_urls_tool')}")
+    if skipped_urls:
+        sections.append(f"# {len(skipped_urls)} more URLs not read, at most {READ_URLS_MAX_URLS} URLs are read per call: "
+                        + " ".join(skipped_urls))
+
+    elapsed_time = time.time() - start_time
+    read_count = sum(1 for result in results if not result["error"])
+    logger.info(f"Read URLs Command read {read_count} of {len(urls)} URLs in {elapsed_time:.2f} seconds")
+    return "\n\n".join(sections)
+
+
+async def read_url_in_background(browser_manager: PlaywrightManager, url: str, content: str, timeout: float,
+                                 current_page: Page | None = None) -> dict[str, Any]:
+    """
+    Opens the URL in a background page, reads its text and closes the page.
+
+    Args:
+        browser_manager (PlaywrightManager): The browser manager whose context the page is opened in.
+        url (str): The URL to read.
+        content (str): 'full' or 'main', see read_urls.
+        timeout (float): Seconds allowed for loading and reading the page.
+        current_page (Page | None): The user facing page, see PlaywrightManager.new_background_page.
+
+    Returns:
+        dict[str, Any]: The final 'url', 'title' and 'text' of the page, and the 'error' that stopped the read if any.
+    """
+    result: dict[str, Any] = {"url": url, "title": "", "text": "", "error": None}
+    page = await browser_manager.new_background_page(current_page)
+    try:
+        async def load_and_read():
+            await page.goto(url, timeout=timeout * 1000, wait_until="domcontentloaded")
+            await wait_for_non_loading_dom_state(page, 2000)
+            result["url"] = page.url
+            result["title"] = await page.title()
+            main_content = await get_main_content_text(page) if content == "main" else None
+            result["text"] = main_content[0] if main_content else await get_filtered_text_content(page)
+
+        await asyncio.wait_for(load_and_read(), timeout)
+    except (asyncio.TimeoutError, PlaywrightTimeoutError):
+        logger.warn(f"Reading {url} timed out after {timeout:g} seconds")
+        result["error"] = f"timed out after {timeout:g} seconds"
+    except Exception as e:
+        logger.warn(f"Reading {url} failed: {e}")
+        result["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+    finally:
+        try:
+            await browser_manager.close_background_page(page)
+        except Exception as e:
+            logger.debug(f"Could not close the background page of {url}: {e}")
+    return result
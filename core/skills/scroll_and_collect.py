@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Annotated
+from typing import Any
+
+from playwright.async_api import Page
+
+from core.browser_manager import PlaywrightManager
+from core.utils.dom_budget import DOM_TOKEN_BUDGET
+from core.utils.dom_budget import fit_text_to_budget
+from core.utils.dom_helper import wait_for_non_loading_dom_state
+from core.utils.logger import logger
+import logfire
+
+# Defaults of the stop conditions, whichever is reached first ends the collection
+SCROLL_COLLECT_MAX_ITEMS = int(os.getenv("AGENTIC_BROWSER_SCROLL_COLLECT_MAX_ITEMS", "100"))
+SCROLL_COLLECT_TIME_BUDGET = float(os.getenv("AGENTIC_BROWSER_SCROLL_COLLECT_TIME_BUDGET", "30"))
+SCROLL_COLLECT_MAX_IDLE_SCROLLS = 3
+
+# Seconds to wait after each scroll for lazily loaded content to appear
+SCROLL_COLLECT_PAUSE = 1.5
+
+# Characters kept per item, items are meant to be skimmed and compared, not read in full
+SCROLL_COLLECT_ITEM_LENGTH = 500
+
+# Finds the repeated items of the page when the agent gives no selector: ARIA articles, <article> elements, or else the
+# largest group of visible siblings that share a tag and classes and carry some text. Returns a selector matching them.
+DETECT_ITEMS_JS = """
+() => {
+    for (const selector of ['[role=article]', 'article', '[role=feed] > *', '[role=listitem]']) {
+        if (document.querySelectorAll(selector).length >= 3) return selector;
+    }
+    const signature = (element) => element.tagName.toLowerCase()
+        + Array.from(element.classList).filter(name => /^[a-zA-Z_-][\\w-]*$/.test(name)).slice(0, 3).map(name => '.' + CSS.escape(name)).join('');
+    let best = null;
+    let bestScore = 0;
+    for (const parent of document.body ? document.body.querySelectorAll('*') : []) {
+        if (parent.children.length < 3) continue;
+        const groups = new Map();
+        for (const child of parent.children) {
+            const key = signature(child);
+            groups.set(key, (groups.get(key) || 0) + 1);
+        }
+        for (const [key, count] of groups) {
+            if (count < 3 || (key.indexOf('.') === -1 && ['div', 'span', 'a', 'p', 'br', 'script', 'style'].includes(key))) continue;
+            const items = Array.from(parent.children).filter(child => signature(child) === key);
+            const textLength = items.reduce((sum, item) => sum + (item.textContent || '').trim().length, 0);
+            // Many items with some text each, rather than a few large blocks or many empty ones
+            const score = count * Math.min(textLength / count, 200);
+            if (score > bestScore && items.some(item => item.getClientRects().length)) {
+                best = key;
+                bestScore = score;
+            }
+        }
+    }
+    return best;
+}
+"""
+
+# Reads the items matching the selector that were not seen in a previous round and scrolls the last of them into view,
+# which also scrolls the feed's own scroll container. Seen items are remembered in the page by their text, so items
+# that are kept in the DOM only cross the page boundary once.
+COLLECT_ITEMS_JS = """
+(params) => {
+    if (!window.__agentCollectSeen || params.reset) window.__agentCollectSeen = new Set();
+    const seen = window.__agentCollectSeen;
+    const normalize = (text) => (text || '').replace(/\\s+/g, ' ').trim();
+
+    const items = [];
+    const elements = Array.from(document.querySelectorAll(params.selector)).filter(element => element.getClientRects().length);
+    for (const element of elements) {
+        const text = normalize(element.innerText);
+        if (!text || seen.has(text)) continue;
+        seen.add(text);
+        const link = element.matches('a[href]') ? element : element.querySelector('a[href]');
+        items.push({text: text.slice(0, params.item_length), href: link ? link.href : null});
+    }
+
+    const height = (document.scrollingElement || document.documentElement).scrollHeight;
+    if (elements.length) {
+        elements[elements.length - 1].scrollIntoView({block: 'start'});
+    }
+    // Also move the window itself, the last item may already be at the top of the screen
+    window.scrollBy(0, window.innerHeight * 0.9);
+    return {items: items, height: height};
+}
+"""
+
+
+async def scroll_and_collect(
+    item_selector: Annotated[str | None, "CSS selector of one item of the list, detected automatically when not given"] = None,
+    max_items: Annotated[int, "Stop once this many unique items are collected"] = SCROLL_COLLECT_MAX_ITEMS,
+    time_budget: Annotated[float, "Stop after this many seconds"] = SCROLL_COLLECT_TIME_BUDGET,
+    max_idle_scrolls: Annotated[int, "Stop after this many scrolls in a row that bring no new item"] = SCROLL_COLLECT_MAX_IDLE_SCROLLS,
+    token_budget: Annotated[int, "Maximum number of tokens to return, 0 for no limit"] = DOM_TOKEN_BUDGET,
+) -> Annotated[str, "The unique items collected while scrolling"]:
+    """
+    Scrolls through a lazily loaded list or feed of the active page and collects its items, deduplicated by content,
+    until max_items unique items are collected, the time budget is spent or scrolling brings no new items.
+
+    Parameters
+    ----------
+    item_selector : str | None
+        CSS selector matching each item of the list, e.g. 'li.result'. Detected from the page's repeated elements when not given.
+    max_items : int
+        Number of unique items after which the collection stops.
+    time_budget : float
+        Seconds after which the collection stops.
+    max_idle_scrolls : int
+        Number of scrolls in a row without new items after which the end of the list is assumed.
+    token_budget : int
+        Maximum number of tokens to return. Longer outputs are reduced to fit and a note says what was left out.
+
+    Returns
+    -------
+    str
+        The collected items, one per line, and a note telling why the collection stopped.
+
+    Raises
+    ------
+    ValueError
+        If no active page is found.
+    """
+    logger.info(f"Executing Scroll And Collect Command with selector {item_selector}")
+    logfire.info("Executing Scroll And Collect Command")
+
+    browser_manager = PlaywrightManager(browser_type='chromium', headless=False)
+    page = await browser_manager.get_current_page()
+    if page is None:
+        raise ValueError('No active page found. OpenURL command opens a new page.')
+
+    await wait_for_non_loading_dom_state(page, 2000)
+
+    selector = item_selector or await page.evaluate(DETECT_ITEMS_JS)
+    if not selector:
+        return "No repeated items found on the page. Pass the item_selector of one item of the list."
+
+    items, scrolls, stop_reason = await collect_items(page, selector, max_items, time_budget, max_idle_scrolls)
+    if not items:
+        return f"No items match the selector '{selector}'."
+
+    lines = [f"{number}. {item['text']}" + (f" ({item['href']})" if item["href"] else "") for number, item in enumerate(items, start=1)]
+    lines.append(f"# Collected {len(items)} unique items matching '{selector}' in {scrolls} scrolls, stopped because {stop_reason}.")
+    return fit_text_to_budget("\n".join(lines), token_budget, "scroll_and_collect")
+
+
+async def collect_items(page: Page, selector: str, max_items: int, time_budget: float,
+                        max_idle_scrolls: int) -> tuple[list[dict[str, Any]], int, str]:
+    """
+    Runs the scroll and collect loop: one evaluate per round reads the new items and scrolls, then the loop waits for
+    the page to load more content.
+
+    Args:
+        page (Page): The page to scroll.
+        selector (str): CSS selector of the items.
+        max_items (int): Number of unique items after which to stop.
+        time_budget (float): Seconds after which to stop.
+        max_idle_scrolls (int): Number of scrolls in a row without new items after which to stop.
+
+    Returns:
+        tuple[list[dict[str, Any]], int, str]: The unique items ('text' and 'href'), the number of scrolls and why the loop stopped.
+    """
+    deadline = time.monotonic() + time_budget
+    items: list[dict[str, Any]] = []
+    # Content hashes of the collected items, the in-page record is lost if the page navigates or reloads
+    seen_hashes: set[bytes] = set()
+    idle_scrolls = 0
+    scrolls = 0
+
+    while True:
+        result = await page.evaluate(COLLECT_ITEMS_JS, {"selector": selector, "item_length": SCROLL_COLLECT_ITEM_LENGTH,
+                                                        "reset": scrolls == 0})
+        new_items = 0
+        for item in result["items"]:
+            content_hash = hashlib.blake2b(item["text"].encode("utf-8"), digest_size=16).digest()
+            if content_hash in seen_hashes:
+                continue
+            seen_hashes.add(content_hash)
+            items.append(item)
+            new_items += 1
+        idle_scrolls = 0 if new_items else idle_scrolls + 1
+        logger.debug(f"Scroll {scrolls}: {new_items} new items, {len(items)} in total")
+
+        if len(items) >= max_items:
+            return items[:max_items], scrolls, f"{max_items} items were collected"
+        if idle_scrolls >= max_idle_scrolls:
+            return items, scrolls, "no new items appeared while scrolling (end of the list)"
+        if time.monotonic() >= deadline:
+            return items, scrolls, f"the time budget of {time_budget:g} seconds was spent"
+
+        scrolls += 1
+        # Lazily loaded content grows the document, wait for that or for the pause to pass
+        try:
+            await page.wait_for_function("(height) => (document.scrollingElement || document.documentElement).scrollHeight > height",
+                                         arg=result["height"], timeout=SCROLL_COLLECT_PAUSE * 1000)
+            await asyncio.sleep(0.2)
+        except Exception:
+            pass
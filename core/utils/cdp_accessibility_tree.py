@@ -0,0 +1,563 @@
+import asyncio
+import re
+import weakref
+from typing import Any
+
+from playwright.async_api import CDPSession
+from playwright.async_api import Page
+
+from core.utils.logger import logger
+
+
+# Roles Playwright treats as controls when deciding which accessibility nodes are interesting.
+CONTROL_ROLES = {
+    "button", "checkbox", "ColorWell", "combobox", "DisclosureTriangle", "listbox", "menu", "menubar", "menuitem",
+    "menuitemcheckbox", "menuitemradio", "radio", "scrollbar", "searchbox", "slider", "spinbutton", "switch", "tab",
+    "textbox", "tree", "treeitem",
+}
+PRESENTATIONAL_LEAF_ROLES = {"doc-cover", "graphics-symbol", "img", "Meter", "scrollbar", "slider", "separator", "progressbar"}
+TEXT_ONLY_ROLES = {"LineBreak", "text", "InlineTextBox", "StaticText"}
+
+USER_STRING_PROPERTIES = ["description", "keyshortcuts", "roledescription", "valuetext"]
+BOOLEAN_PROPERTIES = ["disabled", "expanded", "focused", "modal", "multiline", "multiselectable", "readonly", "required", "selected"]
+NUMERICAL_PROPERTIES = ["level", "valuemax", "valuemin"]
+TOKEN_PROPERTIES = ["autocomplete", "haspopup", "invalid", "orientation"]
+
+# Text of these elements is never rendered, so it is skipped when approximating innerText.
+NON_RENDERED_TAGS = {"script", "style", "noscript", "template", "head"}
+
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+DOCUMENT_FRAGMENT_NODE = 11
+
+# Computed styles requested from DOMSnapshot.captureSnapshot, in this order in each layout node's style list.
+SNAPSHOT_COMPUTED_STYLES = ["cursor"]
+
+mmid_selector = re.compile(r"""^\s*\[\s*mmid\s*=\s*['"]?(\d+)['"]?\s*\]\s*$""")
+
+_cdp_sessions: "weakref.WeakKeyDictionary[Page, CDPSession]" = weakref.WeakKeyDictionary()
+# Pages whose last accessibility extraction used backendNodeIds as mmids.
+_cdp_extracted_pages: "weakref.WeakSet[Page]" = weakref.WeakSet()
+
+
+async def get_cdp_session(page: Page) -> CDPSession:
+    """
+    Returns a CDP session attached to the page, creating it on first use.
+    """
+    session = _cdp_sessions.get(page)
+    if session is None:
+        session = await page.context.new_cdp_session(page)
+        _cdp_sessions[page] = session
+    return session
+
+
+class CDPDomIndex:
+    """
+    In-memory index of a pierced `DOM.getDocument` result keyed by backendNodeId.
+
+    It answers the same questions the in-page enrichment script answers (tag, attributes, clickability, select options,
+    inner text) without touching the page. Computed styles and JS-assigned handlers are not visible through the DOM domain,
+    so clickability relies on tags, attributes and SVG children only.
+
+    `describe_element` only goes through the accessor methods, so other DOM sources (see DOMSnapshotIndex) can reuse it.
+    """
+
+    def __init__(self, document: dict[str, Any]):
+        self.nodes: dict[int, dict[str, Any]] = {}
+        self.attributes: dict[int, dict[str, str]] = {}
+        self.has_svg_descendant: set[int] = set()
+
+        preorder: list[tuple[dict[str, Any], int | None]] = []
+        stack: list[tuple[dict[str, Any], int | None]] = [(document, None)]
+        while stack:
+            node, light_parent = stack.pop()
+            backend_node_id = node["backendNodeId"]
+            self.nodes[backend_node_id] = node
+            preorder.append((node, light_parent))
+            if node.get("nodeType") == ELEMENT_NODE:
+                flat_attributes = node.get("attributes", [])
+                self.attributes[backend_node_id] = dict(zip(flat_attributes[::2], flat_attributes[1::2]))
+            for child in reversed(node.get("children", [])):
+                stack.append((child, backend_node_id))
+            # Shadow roots and frame documents are indexed, but `querySelector('svg')` does not see into them.
+            for shadow_root in node.get("shadowRoots", []):
+                stack.append((shadow_root, None))
+            if node.get("contentDocument"):
+                stack.append((node["contentDocument"], None))
+
+        # Children are visited before their parents when walking the pre-order list backwards.
+        for node, light_parent in reversed(preorder):
+            if light_parent is None:
+                continue
+            if node.get("localName") == "svg" or node["backendNodeId"] in self.has_svg_descendant:
+                self.has_svg_descendant.add(light_parent)
+
+    def is_element(self, backend_node_id: int) -> bool:
+        return backend_node_id in self.attributes
+
+    def get_tag(self, backend_node_id: int) -> str:
+        return self.nodes[backend_node_id].get("localName", "").lower()
+
+    def get_attributes(self, backend_node_id: int) -> dict[str, str]:
+        return self.attributes[backend_node_id]
+
+    def has_svg(self, backend_node_id: int) -> bool:
+        return backend_node_id in self.has_svg_descendant
+
+    def responds_to_click(self, backend_node_id: int) -> bool:
+        """Whether the browser reports the element as clickable beyond its markup (click listeners, pointer cursor)."""
+        return False
+
+    def is_option_selected(self, backend_node_id: int) -> bool:
+        return "selected" in self.attributes[backend_node_id]
+
+    def get_text(self, backend_node_id: int) -> str:
+        """
+        Approximates `element.innerText` by joining the rendered text nodes below the element.
+        """
+        texts: list[str] = []
+        stack = [self.nodes[backend_node_id]]
+        while stack:
+            node = stack.pop()
+            if node.get("nodeType") == TEXT_NODE:
+                texts.append(node.get("nodeValue", ""))
+                continue
+            if node.get("localName") in NON_RENDERED_TAGS:
+                continue
+            children = node.get("shadowRoots", []) + node.get("children", [])
+            stack.extend(reversed(children))
+        return " ".join(" ".join(texts).split())
+
+    def describe_element(self, backend_node_id: int, should_fetch_inner_text: bool, input_params: dict[str, Any]) -> dict[str, Any] | None:
+        """
+        Python counterpart of the in-page enrichment script used by the injection engine.
+
+        Args:
+            backend_node_id (int): The backendNodeId used as mmid.
+            should_fetch_inner_text (bool): Whether to add the element text as 'description'.
+            input_params (dict[str, Any]): The attributes, tags and ids lists used by the in-page script.
+
+        Returns:
+            dict[str, Any] | None: The attributes to merge into the accessibility node, None if the element is ignored or missing.
+        """
+        if not self.is_element(backend_node_id):
+            logger.debug(f"No element found with backendNodeId: {backend_node_id}")
+            return None
+
+        attrs = self.get_attributes(backend_node_id)
+        tag = self.get_tag(backend_node_id)
+
+        if attrs.get("id", "") in input_params["ids_to_ignore"]:
+            return None
+
+        if tag in input_params["tags_to_ignore"] or tag == "option":
+            return None
+
+        attributes_to_values: dict[str, Any] = {"tag": tag}
+
+        class_name = attrs.get("class", "")
+        has_svg = self.has_svg(backend_node_id)
+        is_clickable = (
+            self.responds_to_click(backend_node_id) or
+            "onclick" in attrs or
+            attrs.get("role") in ("button", "link", "tab") or
+            "tabindex" in attrs or
+            "trigger" in class_name.lower() or
+            "clickable" in class_name.lower() or
+            has_svg or
+            tag in ("button", "a")
+        )
+        if is_clickable:
+            attributes_to_values["is_clickable"] = True
+            attributes_to_values["class"] = class_name
+            if has_svg:
+                attributes_to_values["has_svg"] = True
+                attributes_to_values["role"] = attributes_to_values.get("role") or "button"
+
+        if tag == "input":
+            attributes_to_values["tag_type"] = attrs.get("type", "text").lower() or "text"
+        elif tag == "select":
+            attributes_to_values["mmid"] = str(backend_node_id)
+            attributes_to_values["role"] = "combobox"
+            attributes_to_values["options"] = [
+                {
+                    "mmid": str(option_id),
+                    "text": self.get_text(option_id),
+                    "value": self.get_attributes(option_id).get("value", self.get_text(option_id)),
+                    "selected": self.is_option_selected(option_id),
+                }
+                for option_id in self.get_select_options(backend_node_id)
+            ]
+            return attributes_to_values
+
+        for attribute in input_params["attributes"]:
+            value = str(backend_node_id) if attribute == "mmid" else attrs.get(attribute)
+            if value:
+                attributes_to_values[attribute] = value
+
+        if not attributes_to_values.get("role") and attrs.get("role"):
+            attributes_to_values["role"] = attrs["role"]
+
+        if should_fetch_inner_text:
+            text = self.get_text(backend_node_id)
+            if text:
+                attributes_to_values["description"] = text
+
+        return attributes_to_values
+
+    def get_select_options(self, backend_node_id: int) -> list[int]:
+        options: list[int] = []
+        for child in self.nodes[backend_node_id].get("children", []):
+            if child.get("localName") == "option":
+                options.append(child["backendNodeId"])
+            elif child.get("localName") == "optgroup":
+                options.extend(grandchild["backendNodeId"] for grandchild in child.get("children", []) if grandchild.get("localName") == "option")
+        return options
+
+
+class DOMSnapshotIndex(CDPDomIndex):
+    """
+    In-memory index of a `DOMSnapshot.captureSnapshot` result keyed by backendNodeId.
+
+    The snapshot keeps the columnar layout CDP sends: one array per property, strings replaced by indexes into a shared
+    string table. The arrays are used as they are and only an element's attributes are decoded, when it is described.
+    On top of what the DOM domain offers, the snapshot tells which elements the browser considers clickable (including
+    click listeners added by scripts), their computed cursor and their layout box in document coordinates.
+    """
+
+    def __init__(self, snapshot: dict[str, Any]):
+        self.strings: list[str] = snapshot.get("strings", [])
+        self.documents: list[dict[str, Any]] = []
+        # backendNodeId -> (document number, node index)
+        self.locations: dict[int, tuple[int, int]] = {}
+        self.has_svg_descendant: set[int] = set()
+
+        for document_number, document in enumerate(snapshot.get("documents", [])):
+            nodes = document["nodes"]
+            parent_index = nodes.get("parentIndex", [])
+            node_type = nodes.get("nodeType", [])
+            node_name = [self.strings[name].lower() if name >= 0 else "" for name in nodes.get("nodeName", [])]
+            backend_node_ids = nodes.get("backendNodeId", [])
+
+            # Nodes are listed in document order, so the subtree of a node is the range up to its subtree end
+            subtree_end = list(range(1, len(parent_index) + 1))
+            for index in range(len(parent_index) - 1, -1, -1):
+                parent = parent_index[index]
+                if parent < 0:
+                    continue
+                subtree_end[parent] = max(subtree_end[parent], subtree_end[index])
+                # `querySelector('svg')` does not see into shadow roots
+                if node_type[index] != DOCUMENT_FRAGMENT_NODE and (node_name[index] == "svg" or backend_node_ids[index] in self.has_svg_descendant):
+                    self.has_svg_descendant.add(backend_node_ids[parent])
+
+            layout = document.get("layout", {})
+            self.documents.append({
+                "backend_node_id": backend_node_ids,
+                "node_type": node_type,
+                "node_name": node_name,
+                "node_value": nodes.get("nodeValue", []),
+                "attributes": nodes.get("attributes", []),
+                "subtree_end": subtree_end,
+                "clickable": set(nodes.get("isClickable", {}).get("index", [])),
+                "option_selected": set(nodes.get("optionSelected", {}).get("index", [])),
+                "layout_index": {node_index: layout_index for layout_index, node_index in enumerate(layout.get("nodeIndex", []))},
+                "bounds": layout.get("bounds", []),
+                "styles": layout.get("styles", []),
+            })
+            for index, backend_node_id in enumerate(backend_node_ids):
+                self.locations[backend_node_id] = (document_number, index)
+
+    def __string(self, string_index: int) -> str:
+        return self.strings[string_index] if string_index >= 0 else ""
+
+    def is_element(self, backend_node_id: int) -> bool:
+        location = self.locations.get(backend_node_id)
+        return location is not None and self.documents[location[0]]["node_type"][location[1]] == ELEMENT_NODE
+
+    def get_tag(self, backend_node_id: int) -> str:
+        document_number, index = self.locations[backend_node_id]
+        return self.documents[document_number]["node_name"][index]
+
+    def get_attributes(self, backend_node_id: int) -> dict[str, str]:
+        document_number, index = self.locations[backend_node_id]
+        flat_attributes = self.documents[document_number]["attributes"][index]
+        return {self.__string(name): self.__string(value) for name, value in zip(flat_attributes[::2], flat_attributes[1::2])}
+
+    def get_style(self, backend_node_id: int, style: str) -> str | None:
+        """The computed value of one of SNAPSHOT_COMPUTED_STYLES, None for elements that are not rendered."""
+        document_number, index = self.locations[backend_node_id]
+        document = self.documents[document_number]
+        layout_index = document["layout_index"].get(index)
+        if layout_index is None:
+            return None
+        return self.__string(document["styles"][layout_index][SNAPSHOT_COMPUTED_STYLES.index(style)])
+
+    def get_bounds(self, backend_node_id: int) -> list[float] | None:
+        """The layout box of the node as [x, y, width, height] in document coordinates, None for nodes that are not rendered."""
+        location = self.locations.get(backend_node_id)
+        if location is None:
+            return None
+        document = self.documents[location[0]]
+        layout_index = document["layout_index"].get(location[1])
+        return document["bounds"][layout_index] if layout_index is not None else None
+
+    def responds_to_click(self, backend_node_id: int) -> bool:
+        document_number, index = self.locations[backend_node_id]
+        return index in self.documents[document_number]["clickable"] or self.get_style(backend_node_id, "cursor") == "pointer"
+
+    def is_option_selected(self, backend_node_id: int) -> bool:
+        document_number, index = self.locations[backend_node_id]
+        return index in self.documents[document_number]["option_selected"]
+
+    def get_text(self, backend_node_id: int) -> str:
+        """
+        Approximates `element.innerText` by joining the text nodes below the element, skipping non rendered elements.
+        """
+        document_number, index = self.locations[backend_node_id]
+        document = self.documents[document_number]
+        node_type, node_name, subtree_end = document["node_type"], document["node_name"], document["subtree_end"]
+        texts: list[str] = []
+        current = index + 1
+        while current < subtree_end[index]:
+            if node_type[current] == TEXT_NODE:
+                texts.append(self.__string(document["node_value"][current]))
+            elif node_name[current] in NON_RENDERED_TAGS:
+                current = subtree_end[current]
+                continue
+            current += 1
+        return " ".join(" ".join(texts).split())
+
+    def get_select_options(self, backend_node_id: int) -> list[int]:
+        document_number, index = self.locations[backend_node_id]
+        document = self.documents[document_number]
+        return [document["backend_node_id"][current] for current in range(index + 1, document["subtree_end"][index])
+                if document["node_name"][current] == "option"]
+
+
+class _AXNode:
+    """
+    Thin wrapper over a CDP AXNode that mirrors how Playwright decides which nodes make it into `snapshot(interesting_only=True)`.
+    """
+
+    def __init__(self, payload: dict[str, Any]):
+        self.payload = payload
+        self.children: list["_AXNode"] = []
+        self.role: str = "Ignored" if payload.get("ignored") else payload.get("role", {}).get("value", "")
+        self.name: str = payload.get("name", {}).get("value", "") or ""
+        self.properties: dict[str, Any] = {prop["name"].lower(): prop.get("value", {}).get("value") for prop in payload.get("properties", [])}
+        self.focusable = bool(self.properties.get("focusable"))
+        self.hidden = bool(self.properties.get("hidden"))
+        self.editable = bool(self.properties.get("editable"))
+        self.richly_editable = self.properties.get("editable") == "richtext"
+
+    def is_control(self) -> bool:
+        return self.role in CONTROL_ROLES
+
+    def is_plain_text_field(self) -> bool:
+        if self.richly_editable:
+            return False
+        return self.editable or self.role in ("textbox", "ComboBox", "searchbox")
+
+    def has_focusable_child(self) -> bool:
+        stack = list(self.children)
+        while stack:
+            node = stack.pop()
+            if node.focusable:
+                return True
+            stack.extend(node.children)
+        return False
+
+    def is_leaf(self) -> bool:
+        if not self.children:
+            return True
+        if self.is_plain_text_field() or self.role in TEXT_ONLY_ROLES:
+            return True
+        if self.role in PRESENTATIONAL_LEAF_ROLES:
+            return True
+        if self.has_focusable_child():
+            return False
+        if self.focusable and self.name:
+            return True
+        if self.role == "heading" and self.name:
+            return True
+        return False
+
+    def is_interesting(self, inside_control: bool) -> bool:
+        if self.role == "Ignored" or self.hidden:
+            return False
+        if self.focusable or self.richly_editable:
+            return True
+        if self.is_control():
+            return True
+        if inside_control:
+            return False
+        return self.is_leaf() and bool(self.name)
+
+    def serialize(self, dom_index: CDPDomIndex) -> dict[str, Any]:
+        role = {"RootWebArea": "WebArea", "StaticText": "text"}.get(self.role, self.role)
+        properties = dict(self.properties)
+        if self.payload.get("description"):
+            properties["description"] = self.payload["description"].get("value")
+
+        node: dict[str, Any] = {"role": role, "name": self.name}
+        for prop in USER_STRING_PROPERTIES:
+            if prop in properties:
+                node[prop] = properties[prop]
+        for prop in BOOLEAN_PROPERTIES:
+            if prop == "focused" and role == "WebArea":
+                continue
+            if properties.get(prop):
+                node[prop] = properties[prop]
+        for prop in NUMERICAL_PROPERTIES:
+            if prop in properties:
+                node[prop] = properties[prop]
+        for prop in TOKEN_PROPERTIES:
+            value = properties.get(prop)
+            if value and value != "false":
+                node[prop] = value
+        if self.payload.get("value"):
+            node["value"] = self.payload["value"].get("value")
+        for prop in ("checked", "pressed"):
+            if prop in properties:
+                node[prop] = {"true": True, "false": False}.get(str(properties[prop]).lower(), "mixed")
+
+        # The backendNodeId plays the role of the injected aria-keyshortcuts: it is what reconciles the node with the DOM.
+        node.pop("keyshortcuts", None)
+        backend_node_id = self.payload.get("backendDOMNodeId")
+        if backend_node_id is not None and dom_index.is_element(backend_node_id):
+            node["keyshortcuts"] = str(backend_node_id)
+        return node
+
+
+def __build_interesting_tree(ax_nodes: list[dict[str, Any]], dom_index: CDPDomIndex) -> dict[str, Any] | None:
+    """
+    Builds the same nested structure as `page.accessibility.snapshot(interesting_only=True)` from a flat AX node list.
+    """
+    if not ax_nodes:
+        return None
+    nodes_by_id = {payload["nodeId"]: _AXNode(payload) for payload in ax_nodes}
+    root: _AXNode | None = None
+    for node in nodes_by_id.values():
+        node.children = [nodes_by_id[child_id] for child_id in node.payload.get("childIds", []) if child_id in nodes_by_id]
+        if "parentId" not in node.payload and root is None:
+            root = node
+    if root is None:
+        return None
+
+    interesting: set[int] = set()
+    stack: list[tuple[_AXNode, bool]] = [(root, False)]
+    while stack:
+        node, inside_control = stack.pop()
+        if node.is_interesting(inside_control):
+            interesting.add(id(node))
+        if node.is_leaf():
+            continue
+        for child in node.children:
+            stack.append((child, inside_control or node.is_control()))
+
+    def serialize_tree(node: _AXNode) -> list[dict[str, Any]]:
+        children: list[dict[str, Any]] = []
+        for child in node.children:
+            children.extend(serialize_tree(child))
+        if id(node) not in interesting:
+            return children
+        serialized = node.serialize(dom_index)
+        if children:
+            serialized["children"] = children
+        return [serialized]
+
+    serialized_root = serialize_tree(root)
+    return serialized_root[0] if serialized_root else None
+
+
+async def get_cdp_accessibility_snapshot(page: Page) -> tuple[dict[str, Any] | None, CDPDomIndex]:
+    """
+    Captures the accessibility tree through CDP without writing anything to the page.
+
+    `Accessibility.getFullAXTree` provides the tree and `DOM.getDocument` (pierced, full depth) provides every element
+    keyed by backendNodeId in a single message, replacing the per-node `DOM.describeNode` lookups. The backendNodeId of each
+    element is exposed as 'keyshortcuts' so the snapshot can be reconciled exactly like the injected one.
+
+    Args:
+        page (Page): The page to capture.
+
+    Returns:
+        tuple[dict[str, Any] | None, CDPDomIndex]: The interesting-only accessibility tree and the DOM index used to enrich it.
+    """
+    session = await get_cdp_session(page)
+    document = await session.send("DOM.getDocument", {"depth": -1, "pierce": True})
+    ax_tree = await session.send("Accessibility.getFullAXTree")
+
+    dom_index = CDPDomIndex(document["root"])
+    accessibility_tree = __build_interesting_tree(ax_tree.get("nodes", []), dom_index)
+    _cdp_extracted_pages.add(page)
+    logger.debug(f"Captured {len(ax_tree.get('nodes', []))} AX nodes and {len(dom_index.nodes)} DOM nodes over CDP")
+    return accessibility_tree, dom_index
+
+
+async def get_dom_snapshot_accessibility_snapshot(page: Page) -> tuple[dict[str, Any] | None, DOMSnapshotIndex]:
+    """
+    Captures the accessibility tree through CDP like get_cdp_accessibility_snapshot, with `DOMSnapshot.captureSnapshot`
+    as the DOM source: one message returns the names, attributes, clickability, computed styles and layout boxes of every
+    node of the document and its same-process frames, as flat arrays. Nothing is written to the page and enrichment,
+    including viewport scoping, needs no further round trip.
+
+    Args:
+        page (Page): The page to capture.
+
+    Returns:
+        tuple[dict[str, Any] | None, DOMSnapshotIndex]: The interesting-only accessibility tree and the snapshot index used to enrich it.
+    """
+    session = await get_cdp_session(page)
+    snapshot, ax_tree = await asyncio.gather(
+        session.send("DOMSnapshot.captureSnapshot", {"computedStyles": SNAPSHOT_COMPUTED_STYLES}),
+        session.send("Accessibility.getFullAXTree"),
+    )
+
+    dom_index = DOMSnapshotIndex(snapshot)
+    accessibility_tree = __build_interesting_tree(ax_tree.get("nodes", []), dom_index)
+    _cdp_extracted_pages.add(page)
+    logger.debug(f"Captured {len(ax_tree.get('nodes', []))} AX nodes and {len(dom_index.locations)} DOM nodes in "
+                 f"{len(dom_index.documents)} documents with DOMSnapshot")
+    return accessibility_tree, dom_index
+
+
+async def materialize_mmid_selector(page: Page, selector: str):
+    """
+    Makes an mmid selector produced by the CDP engine resolvable with regular query selectors.
+
+    The CDP engine never writes to the page during extraction; its mmids are backendNodeIds. Right before a skill acts on
+    one, the target element alone gets its 'mmid' attribute (and an entry in the in-page mmid index) so `[mmid='...']`
+    keeps working for Playwright and in-page scripts.
+    This is a no-op for selectors that are not plain mmid selectors or for pages extracted by the injection engine.
+
+    Args:
+        page (Page): The page the selector belongs to.
+        selector (str): The selector passed to the skill, e.g. [mmid='114'].
+    """
+    if page not in _cdp_extracted_pages:
+        return
+    match = mmid_selector.match(selector)
+    if not match:
+        return
+
+    mmid = match.group(1)
+    session = await get_cdp_session(page)
+    try:
+        resolved = await session.send("DOM.resolveNode", {"backendNodeId": int(mmid), "objectGroup": "agent-mmid"})
+        await session.send("Runtime.callFunctionOn", {
+            "objectId": resolved["object"]["objectId"],
+            "functionDeclaration": """function(mmid) {
+                this.setAttribute('mmid', mmid);
+                window.__agentMmidIndex = window.__agentMmidIndex || new Map();
+                window.__agentMmidIndex.set(mmid, new WeakRef(this));
+            }""",
+            "arguments": [{"value": mmid}],
+        })
+    except Exception as e:
+        logger.warning(f"Unable to resolve mmid {mmid} through CDP: {e}")
+    finally:
+        try:
+            await session.send("Runtime.releaseObjectGroup", {"objectGroup": "agent-mmid"})
+        except Exception:
+            pass
@@ -0,0 +1,199 @@
+import os
+from typing import Any
+
+from core.utils.dom_serializer import DOM_OUTPUT_FORMAT
+from core.utils.dom_serializer import serialize_dom_tree
+from core.utils.dom_tree_filter import copy_with_ancestors
+from core.utils.dom_tree_filter import document_order
+from core.utils.logger import logger
+from core.utils.token_utils import count_tokens
+from core.utils.token_utils import tokenizer
+
+# Maximum number of tokens a DOM tool may return, 0 disables the budget
+DOM_TOKEN_BUDGET = int(os.getenv("AGENTIC_BROWSER_DOM_TOKEN_BUDGET", "30000"))
+
+# Long texts are cut to these lengths, one after the other, until the output fits
+TEXT_TRIM_LENGTHS = [300, 100]
+TRIMMED_TEXT_KEYS = ["description", "text", "title", "aria-label", "placeholder"]
+
+# Runs of similar siblings (list items, table rows, select options) keep this many entries
+REPEATED_SIBLINGS_KEPT = 5
+
+# Tokens kept free for the elision note appended to the output
+ELISION_NOTE_RESERVE = 100
+
+
+def fit_tree_to_budget(tree: dict[str, Any] | None, token_budget: int = DOM_TOKEN_BUDGET, output_format: str = DOM_OUTPUT_FORMAT,
+                       tool_name: str = "get_dom_fields") -> str:
+    """
+    Serializes the tree and, when it exceeds the token budget, degrades it step by step until it fits:
+    long texts are trimmed, runs of similar siblings are collapsed and finally trailing elements are dropped.
+    A note describing what was elided is appended so the agent can ask for more.
+
+    Args:
+        tree (dict[str, Any] | None): The enriched and pruned accessibility tree. Its nodes may be modified.
+        token_budget (int): Maximum number of tokens of the output, 0 or less disables the budget.
+        output_format (str): The serialization format, see serialize_dom_tree.
+        tool_name (str): The tool to mention in the elision note.
+
+    Returns:
+        str: The serialized tree, within the budget.
+    """
+    serialized = serialize_dom_tree(tree, output_format)
+    if token_budget <= 0 or not tree:
+        return serialized
+
+    tokens = count_tokens(serialized)
+    if tokens <= token_budget:
+        return serialized
+
+    elisions: list[str] = []
+    target = max(token_budget - ELISION_NOTE_RESERVE, 0)
+
+    for max_length in TEXT_TRIM_LENGTHS:
+        trimmed = __trim_long_texts(tree, max_length)
+        if trimmed:
+            # A shorter trim supersedes the previous one in the note
+            elisions[:] = [f"trimmed {trimmed} long texts to {max_length} characters"]
+            serialized = serialize_dom_tree(tree, output_format)
+            tokens = count_tokens(serialized)
+            if tokens <= target:
+                return __with_elision_note(serialized, elisions, token_budget, tool_name)
+
+    collapsed = __collapse_repeated_siblings(tree)
+    if collapsed:
+        elisions.append(f"omitted {collapsed} repeated list items and options after the first {REPEATED_SIBLINGS_KEPT} of each run")
+        serialized = serialize_dom_tree(tree, output_format)
+        tokens = count_tokens(serialized)
+        if tokens <= target:
+            return __with_elision_note(serialized, elisions, token_budget, tool_name)
+
+    serialized, dropped, last_mmid = __drop_trailing_nodes(tree, output_format, target)
+    if dropped:
+        after = f" after mmid {last_mmid}" if last_mmid is not None else ""
+        elisions.append(f"dropped the last {dropped} elements of the page{after}")
+    return __with_elision_note(serialized, elisions, token_budget, tool_name)
+
+
+def fit_text_to_budget(text: str, token_budget: int = DOM_TOKEN_BUDGET, tool_name: str = "get_dom_text") -> str:
+    """
+    Fits page text into the token budget: repeated lines are collapsed first, then the end of the text is cut off.
+    A note describing what was elided is appended so the agent can ask for more.
+
+    Args:
+        text (str): The text content of the page.
+        token_budget (int): Maximum number of tokens of the output, 0 or less disables the budget.
+        tool_name (str): The tool to mention in the elision note.
+
+    Returns:
+        str: The text, within the budget.
+    """
+    if token_budget <= 0 or count_tokens(text) <= token_budget:
+        return text
+
+    elisions: list[str] = []
+    lines = []
+    repeated = 0
+    for line in text.splitlines():
+        if lines and line.strip() == lines[-1].strip():
+            repeated += 1
+            continue
+        lines.append(line)
+    if repeated:
+        elisions.append(f"collapsed {repeated} repeated or blank lines")
+        text = "\n".join(lines)
+
+    tokens = tokenizer.encode(text, disallowed_special=())
+    target = max(token_budget - ELISION_NOTE_RESERVE, 0)
+    if len(tokens) > target:
+        elisions.append(f"cut off the last {len(tokens) - target} of {len(tokens)} tokens")
+        text = tokenizer.decode(tokens[:target])
+    return __with_elision_note(text, elisions, token_budget, tool_name)
+
+
+def __with_elision_note(serialized: str, elisions: list[str], token_budget: int, tool_name: str) -> str:
+    note = (f"# Output reduced to fit the {token_budget} token budget: {'; '.join(elisions)}."
+            f" Call {tool_name} with a larger token_budget to see everything.")
+    logger.info(note)
+    return f"{serialized}\n{note}"
+
+
+def __walk(tree: dict[str, Any]):
+    """Yields every node of the tree in document order, without recursion."""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.get("children", ())))
+
+
+def __trim_long_texts(tree: dict[str, Any], max_length: int) -> int:
+    trimmed = 0
+    for node in __walk(tree):
+        for key in TRIMMED_TEXT_KEYS:
+            value = node.get(key)
+            if isinstance(value, str) and len(value) > max_length:
+                node[key] = value[:max_length] + "..."
+                trimmed += 1
+    return trimmed
+
+
+def __sibling_signature(node: dict[str, Any]) -> tuple:
+    return node.get("tag"), node.get("role"), "children" in node
+
+
+def __collapse_repeated_siblings(tree: dict[str, Any]) -> int:
+    collapsed = 0
+    for node in __walk(tree):
+        options = node.get("options")
+        if isinstance(options, list) and len(options) > REPEATED_SIBLINGS_KEPT:
+            collapsed += len(options) - REPEATED_SIBLINGS_KEPT
+            # Replaced rather than truncated in place, the options list may be shared with the enrichment cache
+            node["options"] = options[:REPEATED_SIBLINGS_KEPT] + [f"... {len(options) - REPEATED_SIBLINGS_KEPT} more options"]
+
+        children = node.get("children")
+        if not children or len(children) <= REPEATED_SIBLINGS_KEPT:
+            continue
+
+        kept_children = []
+        run_start = 0
+        for i in range(1, len(children) + 1):
+            if i < len(children) and __sibling_signature(children[i]) == __sibling_signature(children[run_start]):
+                continue
+            run = children[run_start:i]
+            kept_children.extend(run[:REPEATED_SIBLINGS_KEPT])
+            if len(run) > REPEATED_SIBLINGS_KEPT:
+                omitted = len(run) - REPEATED_SIBLINGS_KEPT
+                collapsed += omitted
+                kind = run[0].get("tag") or run[0].get("role") or "element"
+                kept_children.append({"role": "note", "name": f"{omitted} more similar {kind} elements omitted"})
+            run_start = i
+        node["children"] = kept_children
+    return collapsed
+
+
+def __drop_trailing_nodes(tree: dict[str, Any], output_format: str, target: int) -> tuple[str, int, Any]:
+    """
+    Keeps the longest prefix of the tree in document order that fits the target, found by binary search.
+    A prefix of the document order always contains the ancestors of its nodes, so it is a valid tree.
+
+    Returns:
+        tuple[str, int, Any]: The serialized prefix, the number of dropped nodes and the last mmid kept.
+    """
+    order = document_order(tree)
+
+    low, high = 1, len(order)
+    best = serialize_dom_tree(copy_with_ancestors(order, range(1)), output_format)
+    best_count = 1
+    while low <= high:
+        middle = (low + high) // 2
+        serialized = serialize_dom_tree(copy_with_ancestors(order, range(middle)), output_format)
+        if count_tokens(serialized) <= target:
+            best, best_count = serialized, middle
+            low = middle + 1
+        else:
+            high = middle - 1
+
+    last_mmid = next((node["mmid"] for node, _ in reversed(order[:best_count]) if "mmid" in node), None)
+    return best, len(order) - best_count, last_mmid
+
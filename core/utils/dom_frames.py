@@ -0,0 +1,68 @@
+import re
+import weakref
+
+from playwright.async_api import Frame
+from playwright.async_api import Page
+
+# mmids of elements inside child frames are qualified with the frame's number, e.g. [mmid='f2-57']
+frame_mmid_selector = re.compile(r"mmid\s*=\s*['\"]?f(\d+)-")
+
+
+def frame_mmid_prefix(frame_index: int) -> str:
+    """Returns the prefix of the mmids injected into the child frame with the given number."""
+    return f"f{frame_index}-"
+
+
+class FrameRegistry:
+    """
+    Numbers the child frames of a page. A frame keeps its number for as long as it is attached, so the frame-qualified
+    mmids handed to the agent keep pointing at the same frame between extractions.
+    """
+
+    def __init__(self):
+        self.frames: dict[int, Frame] = {}
+        self.indexes: dict[Frame, int] = {}
+        self.next_index = 1
+
+    def index_of(self, frame: Frame) -> int:
+        index = self.indexes.get(frame)
+        if index is None:
+            for detached_frame in [known_frame for known_frame in self.indexes if known_frame.is_detached()]:
+                del self.frames[self.indexes.pop(detached_frame)]
+            index = self.next_index
+            self.next_index += 1
+            self.indexes[frame] = index
+            self.frames[index] = frame
+        return index
+
+
+_frame_registries: "weakref.WeakKeyDictionary[Page, FrameRegistry]" = weakref.WeakKeyDictionary()
+
+
+def get_frame_registry(page: Page) -> FrameRegistry:
+    registry = _frame_registries.get(page)
+    if registry is None:
+        registry = FrameRegistry()
+        _frame_registries[page] = registry
+    return registry
+
+
+def get_frame_for_selector(page: Page, selector: str) -> Page | Frame:
+    """
+    Returns the frame a selector has to be evaluated in. Frame-qualified mmid selectors map to their child frame
+    from the registry, without a round trip to the browser; everything else belongs to the page's main frame.
+
+    Args:
+        page (Page): The page the selector was extracted from.
+        selector (str): The selector passed to a skill, e.g. [mmid='f2-57'].
+
+    Returns:
+        Page | Frame: The frame to evaluate the selector in, the page itself for the main frame.
+    """
+    match = frame_mmid_selector.search(selector)
+    if match:
+        registry = _frame_registries.get(page)
+        frame = registry.frames.get(int(match.group(1))) if registry else None
+        if frame is not None and not frame.is_detached():
+            return frame
+    return page
@@ -1,11 +1,63 @@
 import asyncio
+from typing import Any
 
 from playwright.async_api import ElementHandle
 from playwright.async_api import Page
 
+from core.utils.dom_frames import get_frame_for_selector
 from core.utils.logger import logger
 
 
+# In-page resolver shared by every script that looks elements up by selector. mmid selectors (e.g. [mmid='114']) are
+# answered from the index built during mmid injection (window.__agentMmidIndex, mmid -> WeakRef(element)) in constant
+# time; anything else, or a stale index entry, falls back to document.querySelector.
+RESOLVE_ELEMENT_JS = r"""(selector) => {
+    const match = /^\s*\[\s*mmid\s*=\s*['"]?([^'"\]\s]+)['"]?\s*\]\s*$/.exec(selector);
+    if (match && window.__agentMmidIndex) {
+        const ref = window.__agentMmidIndex.get(match[1]);
+        const element = ref && ref.deref();
+        if (element && element.isConnected && element.getAttribute('mmid') === match[1]) {
+            return element;
+        }
+    }
+    return document.querySelector(selector);
+}"""
+
+
+# In-page helper listing every element of a document or shadow root, including the elements inside open shadow roots
+# (each shadow tree follows its host). document.querySelectorAll('*') alone does not see into web components.
+DEEP_ELEMENTS_JS = r"""(root, onShadowRoot) => {
+    const elements = [];
+    const visit = (scope) => {
+        for (const element of scope.querySelectorAll('*')) {
+            elements.push(element);
+            if (element.shadowRoot) {
+                if (onShadowRoot) onShadowRoot(element.shadowRoot);
+                visit(element.shadowRoot);
+            }
+        }
+    };
+    visit(root);
+    return elements;
+}"""
+
+
+# Attributes shown in the opening tag summaries of the elements the agent acts on
+OPENING_TAG_ATTRIBUTES = ['id', 'name', 'aria-label', 'placeholder', 'href', 'src', 'aria-autocomplete', 'role', 'type',
+                          'data-testid', 'value', 'selected', 'aria-labelledby', 'aria-describedby', 'aria-haspopup']
+
+
+# In-page reader of an element's tag name and attributes, so that any number of attributes costs a single round trip.
+# Missing attributes are null, like ElementHandle.get_attribute returns None.
+READ_ELEMENT_JS = r"""(element, attributes) => {
+    const values = {};
+    for (const attribute of attributes) {
+        values[attribute] = element.getAttribute(attribute);
+    }
+    return { tag_name: element.tagName.toLowerCase(), attributes: values };
+}"""
+
+
 async def wait_for_non_loading_dom_state(page: Page, max_wait_millis: int):
     max_wait_seconds = max_wait_millis / 1000
     end_time = asyncio.get_event_loop().time() + max_wait_seconds
@@ -18,6 +70,31 @@ async def wait_for_non_loading_dom_state(page: Page, max_wait_millis: int):
         await asyncio.sleep(0.05)
 
 
+async def get_element_metadata(element: ElementHandle, attributes: list[str] = OPENING_TAG_ATTRIBUTES) -> dict[str, Any]:
+    """
+    Reads the tag name and the given attributes of an element in a single evaluate.
+
+    Args:
+        element (ElementHandle): The element to read.
+        attributes (list[str], optional): The attributes to read. Defaults to the attributes of the opening tag summary.
+
+    Returns:
+        dict[str, Any]: The lower case 'tag_name' and the 'attributes' as a dict, None for the attributes the element does not have.
+    """
+    return await element.evaluate(READ_ELEMENT_JS, attributes)
+
+
+def format_opening_tag(tag_name: str, attributes: dict[str, str | None]) -> str:
+    """
+    Formats the opening tag of an element from its attributes, leaving out the empty ones, e.g. <button id="submit" type="submit">.
+    """
+    opening_tag: str = f'<{tag_name}'
+    for attr, value in attributes.items():
+        if value:
+            opening_tag += f' {attr}="{value}"'
+    return opening_tag + '>'
+
+
 async def get_element_outer_html(element: ElementHandle, page: Page, element_tag_name: str|None = None) -> str:
     """
     Constructs the opening tag of an HTML element along with its attributes.
@@ -25,21 +102,34 @@ async def get_element_outer_html(element: ElementHandle, page: Page, element_tag
     Args:
         element (ElementHandle): The element to retrieve the opening tag for.
         page (Page): The page object associated with the element.
-        element_tag_name (str, optional): The tag name of the element. Defaults to None. If not passed, it will be retrieved from the element.
+        element_tag_name (str, optional): The tag name of the element. Defaults to None. If not passed, it is read along with the attributes.
 
     Returns:
         str: The opening tag of the HTML element, including a select set of attributes.
     """
-    tag_name: str = element_tag_name if element_tag_name else await page.evaluate("element => element.tagName.toLowerCase()", element)
+    metadata = await get_element_metadata(element)
+    return format_opening_tag(element_tag_name or metadata["tag_name"], metadata["attributes"])
 
-    attributes_of_interest: list[str] = ['id', 'name', 'aria-label', 'placeholder', 'href', 'src', 'aria-autocomplete', 'role', 'type',
-                                         'data-testid', 'value', 'selected', 'aria-labelledby', 'aria-describedby', 'aria-haspopup']
-    opening_tag: str = f'<{tag_name}'
 
-    for attr in attributes_of_interest:
-        value: str = await element.get_attribute(attr) # type: ignore
-        if value:
-            opening_tag += f' {attr}="{value}"'
-    opening_tag += '>'
+async def query_selector(page: Page, selector: str) -> ElementHandle | None:
+    """
+    Returns the element matching the selector, resolving mmid selectors through the in-page mmid index.
+    Frame-qualified mmids (e.g. [mmid='f2-57']) are resolved in their child frame.
 
-    return opening_tag
+    Args:
+        page (Page): The page to query.
+        selector (str): The query selector, typically [mmid='...'].
+
+    Returns:
+        ElementHandle | None: The element, or None if nothing matches.
+    """
+    frame = get_frame_for_selector(page, selector)
+    try:
+        handle = await frame.evaluate_handle(RESOLVE_ELEMENT_JS, selector)
+    except Exception:
+        # Not a CSS selector (e.g. a Playwright text= selector), let Playwright resolve it
+        return await frame.query_selector(selector)
+    element = handle.as_element()
+    if element is None:
+        await handle.dispose()
+    return element
@@ -0,0 +1,185 @@
+import os
+
+from playwright.async_api import Page
+
+from core.utils.logger import logger
+
+# "full" (default) returns the text of the whole page, "main" only its primary content (article, documentation body)
+DOM_TEXT_CONTENT = os.getenv("AGENTIC_BROWSER_DOM_TEXT_CONTENT", "full").lower()
+
+# Main content shorter than this is more likely a misdetection than the page's content, the full text is returned instead
+MAIN_CONTENT_MIN_LENGTH = 250
+
+# Readability-style detection of the main content. Text blocks are scored by length and commas, their scores flow to
+# their parent and grandparent, and the best scored container, discounted by its link density, wins. Its siblings that
+# score close to it or read like paragraphs are kept as well. Navigation, sidebars, footers, banners and hidden elements
+# are skipped. Everything is decided from the DOM in a single evaluate; only the visibility checks read layout.
+MAIN_CONTENT_JS = """
+() => {
+    const body = document.body;
+    if (!body) return null;
+
+    const unlikely = /-ad-|ad-break|advert|agegate|banner|breadcrumb|combx|comment|community|consent|cookie|disqus|footer|gdpr|header|menu|modal|nav|newsletter|pager|pagination|popup|promo|related|remark|replies|rss|share|shoutbox|sidebar|skyscraper|social|sponsor|subscribe|toolbar/i;
+    const maybe = /and|article|body|column|content|main|shadow|post|entry|story/i;
+    const positive = /article|body|content|entry|hentry|h-entry|main|page|post|text|blog|story/i;
+    const negative = /-ad-|hidden|banner|combx|comment|com-|contact|foot|footer|footnote|gdpr|masthead|media|meta|outbrain|promo|related|scroll|share|shoutbox|sidebar|skyscraper|sponsor|shopping|tags|tool|widget/i;
+    const skippedTags = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'SVG', 'NAV', 'ASIDE', 'FOOTER', 'IFRAME', 'BUTTON', 'SELECT', 'INPUT', 'TEXTAREA', 'DIALOG']);
+    const skippedRoles = new Set(['navigation', 'banner', 'contentinfo', 'complementary', 'dialog', 'alertdialog', 'search', 'menu', 'menubar']);
+    const overlay = document.querySelector('#tawebagent-overlay');
+
+    const classAndId = (element) => `${element.id} ${typeof element.className === 'string' ? element.className : ''}`;
+    const normalize = (text) => text.replace(/\\s+/g, ' ').trim();
+    const isBoilerplate = (element) => {
+        if (element === overlay || skippedTags.has(element.tagName) || skippedRoles.has(element.getAttribute('role'))
+            || element.hidden || element.getAttribute('aria-hidden') === 'true') {
+            return true;
+        }
+        const matchString = classAndId(element);
+        return element !== body && element.tagName !== 'MAIN' && element.tagName !== 'ARTICLE'
+            && unlikely.test(matchString) && !maybe.test(matchString) && !element.querySelector('article, main');
+    };
+    const linkDensity = (element) => {
+        const textLength = normalize(element.textContent).length;
+        if (!textLength) return 0;
+        let linkLength = 0;
+        for (const link of element.querySelectorAll('a')) linkLength += normalize(link.textContent).length;
+        return linkLength / textLength;
+    };
+    const initialScore = (element) => {
+        let score = 0;
+        switch (element.tagName) {
+            case 'ARTICLE': case 'MAIN': score += 10; break;
+            case 'DIV': case 'SECTION': score += 5; break;
+            case 'PRE': case 'TD': case 'BLOCKQUOTE': score += 3; break;
+            case 'OL': case 'UL': case 'DL': case 'DD': case 'DT': case 'LI': case 'FORM': score -= 3; break;
+            case 'H1': case 'H2': case 'H3': case 'H4': case 'H5': case 'H6': case 'TH': score -= 5; break;
+        }
+        const matchString = classAndId(element);
+        if (negative.test(matchString)) score -= 25;
+        if (positive.test(matchString)) score += 25;
+        return score;
+    };
+
+    // Score the text blocks and let their scores flow up to the containers
+    const textBlockTags = new Set(['P', 'PRE', 'TD', 'BLOCKQUOTE', 'LI', 'DD']);
+    const containerTags = new Set(['DIV', 'SECTION', 'ARTICLE', 'MAIN']);
+    const hasOwnText = (element) => Array.from(element.childNodes).some(node => node.nodeType === Node.TEXT_NODE && node.textContent.trim().length);
+    const scores = new Map();
+    const walker = document.createTreeWalker(body, NodeFilter.SHOW_ELEMENT, {
+        acceptNode: (element) => isBoilerplate(element) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT,
+    });
+    while (walker.nextNode()) {
+        const element = walker.currentNode;
+        if (!textBlockTags.has(element.tagName) && !(containerTags.has(element.tagName) && hasOwnText(element))) continue;
+        const text = normalize(element.textContent);
+        if (text.length < 25) continue;
+        const commas = text.split(/[,，、]/).length - 1;
+        const score = 1 + commas + Math.min(Math.floor(text.length / 100), 3);
+        let ancestor = element.parentElement;
+        for (let level = 0; ancestor && level < 3; level++, ancestor = ancestor.parentElement) {
+            if (!scores.has(ancestor)) scores.set(ancestor, initialScore(ancestor));
+            scores.set(ancestor, scores.get(ancestor) + score / (level === 0 ? 1 : level * 2));
+        }
+    }
+
+    let top = null;
+    let topScore = 0;
+    for (const [element, score] of scores) {
+        const finalScore = score * (1 - linkDensity(element));
+        scores.set(element, finalScore);
+        if (finalScore > topScore) {
+            top = element;
+            topScore = finalScore;
+        }
+    }
+    if (!top || top === body || top === document.documentElement) {
+        top = document.querySelector('main, [role=main], article');
+        if (!top) return null;
+    }
+
+    // Keep the siblings that belong to the same content
+    const threshold = Math.max(10, topScore * 0.2);
+    const selected = [];
+    for (const sibling of (top.parentElement ? top.parentElement.children : [top])) {
+        let keep = sibling === top || (scores.get(sibling) || 0) >= threshold;
+        if (!keep && sibling.tagName === 'P' && !isBoilerplate(sibling)) {
+            const text = normalize(sibling.textContent);
+            const density = linkDensity(sibling);
+            keep = (text.length > 80 && density < 0.25) || (text.length > 0 && density === 0 && /\\.( |$)/.test(text));
+        }
+        if (keep) selected.push(sibling);
+    }
+
+    // Serialize with headings as Markdown headings and list items as bullets, one block per line
+    const blockTags = new Set(['P', 'DIV', 'SECTION', 'ARTICLE', 'MAIN', 'HEADER', 'LI', 'UL', 'OL', 'DL', 'DT', 'DD', 'BLOCKQUOTE',
+                               'TABLE', 'TR', 'TD', 'TH', 'FIGURE', 'FIGCAPTION', 'BR', 'HR']);
+    const lines = [];
+    const altTexts = [];
+    let line = '';
+    const flush = () => {
+        const text = normalize(line);
+        if (text) lines.push(text);
+        line = '';
+    };
+    const visit = (node) => {
+        if (node.nodeType === Node.TEXT_NODE) {
+            line += node.textContent;
+            return;
+        }
+        if (node.nodeType !== Node.ELEMENT_NODE || isBoilerplate(node) || (node.tagName !== 'BR' && !node.getClientRects().length)) return;
+        const tag = node.tagName;
+        if (/^H[1-6]$/.test(tag)) {
+            flush();
+            const text = normalize(node.textContent);
+            if (text) lines.push('#'.repeat(Number(tag[1])) + ' ' + text);
+            return;
+        }
+        if (tag === 'PRE') {
+            flush();
+            lines.push(node.textContent.replace(/\\s+$/, ''));
+            return;
+        }
+        if (tag === 'IMG' && node.alt) altTexts.push(node.alt);
+        const isBlock = blockTags.has(tag);
+        if (isBlock) flush();
+        if (tag === 'LI') line += '- ';
+        for (const child of node.childNodes) visit(child);
+        if (isBlock) flush();
+    };
+    selected.forEach(element => { visit(element); flush(); });
+
+    // The page title is often outside of the content container
+    const heading = document.querySelector('h1');
+    if (heading && !selected.some(element => element.contains(heading)) && normalize(heading.textContent)) {
+        lines.unshift('# ' + normalize(heading.textContent));
+    }
+
+    let text = lines.join('\\n');
+    if (altTexts.length) text += '\\nAlt texts in the main content: ' + altTexts.join(' ');
+    return {text: text, page_length: normalize(body.textContent).length};
+}
+"""
+
+
+async def get_main_content_text(page: Page) -> tuple[str, str] | None:
+    """
+    Returns the text of the page's main content, with headings kept as Markdown headings, and a note for the agent
+    telling that the rest of the page was left out.
+
+    Args:
+        page (Page): The page to read.
+
+    Returns:
+        tuple[str, str] | None: The main content text and the note, None when no main content could be told apart from
+        the rest of the page.
+    """
+    main_content = await page.evaluate(MAIN_CONTENT_JS)
+    if not main_content or len(main_content["text"]) < MAIN_CONTENT_MIN_LENGTH:
+        logger.info("No main content detected, returning the text of the whole page")
+        return None
+
+    text = main_content["text"]
+    logger.info(f"Main content is {len(text)} of about {main_content['page_length']} characters of page text")
+    note = (f"# Showing the main content only ({len(text)} of about {main_content['page_length']} characters of the page)."
+            f" Call get_dom_text with content='full' for navigation, sidebars and the rest of the page.")
+    return text, note
@@ -85,4 +85,87 @@ async def dom_mutation_change_detected(changes_detected: str):
                 await callback(changes_detected)
             # If the callback is a regular function
             else:
-                callback(changes_detected)
\ No newline at end of file
+                callback(changes_detected)
+
+# Attributes written by the agent itself. Changes to them never make an element dirty.
+AGENT_ATTRIBUTES = ['mmid', 'aria-keyshortcuts', 'orig-aria-keyshortcuts']
+
+# Installs (once per document) a mutation observer that records which mmid-tagged elements changed since the last
+# accessibility capture, and defines window.__agentCollectDirtyMmids() to drain that set.
+# An element is dirty when its attributes, children or text change, and its ancestors are dirty too because their
+# enrichment (inner text, SVG children, select options) depends on their descendants. Since whole ancestor chains are always
+# marked, the walk up can stop at the first element that is already dirty.
+# Meant to be embedded at the start of an evaluated function body.
+DIRTY_MMID_TRACKER_JS = """
+    if (typeof window.__agentCollectDirtyMmids !== 'function') {
+        const agentAttributes = new Set(%s);
+        const dirtyElements = new Set();
+        const markDirty = (node) => {
+            let element = node && node.nodeType === Node.ELEMENT_NODE ? node : node && node.parentElement;
+            while (element && !dirtyElements.has(element)) {
+                dirtyElements.add(element);
+                element = element.parentElement || (element.parentNode && element.parentNode.host) || null;
+            }
+        };
+        const handleMutations = (mutationsList) => {
+            for (const mutation of mutationsList) {
+                if (mutation.type === 'attributes' && agentAttributes.has(mutation.attributeName)) continue;
+                markDirty(mutation.target);
+            }
+        };
+        const dirtyObserver = new MutationObserver(handleMutations);
+        dirtyObserver.observe(document, {subtree: true, childList: true, characterData: true, attributes: true});
+        // Observers on the document do not see into shadow roots, they are registered one by one as they are found
+        const dirtyObservedRoots = new WeakSet();
+        window.__agentObserveDirtyRoot = (root) => {
+            if (dirtyObservedRoots.has(root)) return;
+            dirtyObservedRoots.add(root);
+            dirtyObserver.observe(root, {subtree: true, childList: true, characterData: true, attributes: true});
+        };
+        window.__agentCollectDirtyMmids = () => {
+            handleMutations(dirtyObserver.takeRecords());
+            const dirtyMmids = [];
+            dirtyElements.forEach(element => {
+                const mmid = element.getAttribute && element.getAttribute('mmid');
+                if (mmid) dirtyMmids.push(mmid);
+            });
+            dirtyElements.clear();
+            return dirtyMmids;
+        };
+    }
+""" % json.dumps(AGENT_ATTRIBUTES)
+
+
+# Counts the changes a page went through (DOM mutations other than the agent's own attributes, and user input, which
+# changes form values without mutating the DOM). Embedded into the body of a function evaluated in the page.
+PAGE_VERSION_TRACKER_JS = """
+    if (typeof window.__agentGetPageVersion !== 'function') {
+        const versionAgentAttributes = new Set(%s);
+        const documentId = Date.now().toString(36) + Math.random().toString(36).slice(2);
+        let pageVersion = 0;
+        const isPageChange = (mutation) => {
+            if (mutation.type === 'attributes' && versionAgentAttributes.has(mutation.attributeName)) return false;
+            // The agent's own overlay is hidden and restored while the page text is read
+            const element = mutation.target.nodeType === Node.ELEMENT_NODE ? mutation.target : mutation.target.parentElement;
+            return !(element && element.closest('#tawebagent-overlay'));
+        };
+        const bumpVersion = () => { pageVersion += 1; };
+        const versionObserver = new MutationObserver((mutationsList) => {
+            if (mutationsList.some(isPageChange)) bumpVersion();
+        });
+        versionObserver.observe(document, {subtree: true, childList: true, characterData: true, attributes: true});
+        const versionObservedRoots = new WeakSet();
+        window.__agentObserveVersionRoot = (root) => {
+            if (versionObservedRoots.has(root)) return;
+            versionObservedRoots.add(root);
+            versionObserver.observe(root, {subtree: true, childList: true, characterData: true, attributes: true});
+        };
+        window.addEventListener('input', bumpVersion, true);
+        window.addEventListener('change', bumpVersion, true);
+        window.__agentGetPageVersion = () => {
+            // Mutations of the current task are not delivered to the observer yet
+            if (versionObserver.takeRecords().some(isPageChange)) bumpVersion();
+            return {document_id: documentId, version: pageVersion};
+        };
+    }
+""" % json.dumps(AGENT_ATTRIBUTES)
@@ -0,0 +1,114 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Any
+
+from core.utils.dom_tree_filter import copy_with_ancestors
+from core.utils.dom_tree_filter import document_order
+from core.utils.logger import logger
+
+# Number of best matching fields returned for the current step, 0 disables relevance ranking
+DOM_RELEVANCE_TOP_K = int(os.getenv("AGENTIC_BROWSER_DOM_RELEVANCE_TOP_K", "50"))
+
+# Node keys whose text describes what a field is for
+RELEVANCE_TEXT_KEYS = ["name", "aria-label", "placeholder", "text", "description", "title", "data-testid", "href", "tag", "role", "type"]
+
+# BM25 parameters, the usual defaults
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words that occur in almost every step description and say nothing about the target field
+RELEVANCE_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it", "of", "on", "or", "that",
+    "the", "then", "this", "to", "with", "click", "enter", "type", "select", "page", "button", "field", "find", "go",
+    "open", "use", "using", "navigate", "current", "step",
+}
+
+word_pattern = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cases `text` and splits it into words, camelCase and snake_case identifiers are split as well."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [word for word in word_pattern.findall(text.lower()) if word not in RELEVANCE_STOPWORDS]
+
+
+class BM25Index:
+    """
+    A minimal Okapi BM25 index over a list of documents, each given as a list of words.
+    """
+
+    def __init__(self, documents: list[list[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.term_frequencies = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if documents else 0.0
+
+        document_frequencies = Counter(term for frequencies in self.term_frequencies for term in frequencies)
+        document_count = len(documents)
+        self.idf = {term: math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+                    for term, frequency in document_frequencies.items()}
+
+    def score(self, query: list[str], index: int) -> float:
+        frequencies = self.term_frequencies[index]
+        length_norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / self.average_length) if self.average_length else self.k1
+        score = 0.0
+        for term in set(query):
+            frequency = frequencies.get(term)
+            if frequency:
+                score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + length_norm)
+        return score
+
+
+def __node_text(node: dict[str, Any]) -> str:
+    parts = []
+    for key in RELEVANCE_TEXT_KEYS:
+        value = node.get(key)
+        if isinstance(value, str):
+            parts.append(value)
+    for option in node.get("options", ()):
+        if isinstance(option, dict):
+            parts.extend(str(value) for value in option.values())
+    return " ".join(parts)
+
+
+def rank_fields_by_relevance(tree: dict[str, Any] | None, query: str, top_k: int = DOM_RELEVANCE_TOP_K) -> tuple[dict[str, Any] | None, str | None]:
+    """
+    Scores every field (node with an mmid) of the tree against `query` with BM25 and keeps the `top_k` best matches,
+    together with their ancestors so the agent still sees the context (form, dialog, list) each field is in.
+
+    The tree is returned unchanged when it has no more than `top_k` fields or when no field matches the query at all.
+
+    Args:
+        tree (dict[str, Any] | None): The enriched and pruned accessibility tree.
+        query (str): The text to rank against, usually the current step of the plan.
+        top_k (int): The number of fields to keep, 0 or less disables ranking.
+
+    Returns:
+        tuple[dict[str, Any] | None, str | None]: The reduced tree (a copy, the input is not modified) and a note
+        for the agent describing what was left out, or the input tree and None when nothing was left out.
+    """
+    if not tree or top_k <= 0 or not query:
+        return tree, None
+
+    order = document_order(tree)
+    field_indexes = [index for index, (node, _) in enumerate(order) if node.get("mmid") is not None]
+    if len(field_indexes) <= top_k:
+        return tree, None
+
+    query_terms = tokenize(query)
+    bm25 = BM25Index([tokenize(__node_text(order[index][0])) for index in field_indexes])
+    scores = [(bm25.score(query_terms, position), index) for position, index in enumerate(field_indexes)]
+    matches = sorted((entry for entry in scores if entry[0] > 0), reverse=True)[:top_k]
+    if not matches:
+        logger.info(f"No field matches the current step, returning all {len(field_indexes)} fields")
+        return tree, None
+
+    reduced_tree = copy_with_ancestors(order, (index for _, index in matches))
+
+    logger.info(f"Kept the {len(matches)} of {len(field_indexes)} fields most relevant to the current step, best score {matches[0][0]:.2f}")
+    note = (f"# Showing the {len(matches)} of {len(field_indexes)} fields most relevant to the current step, with their parent elements."
+            f" Call get_dom_fields with all_fields=True if the field you need is not listed.")
+    return reduced_tree, note
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import time
+from typing import Any
+
+from core.utils.logger import logger
+from core.utils.token_utils import count_tokens
+
+# "compact" (one line per node) or "repr" (the Python repr of the enriched tree, as returned before)
+DOM_OUTPUT_FORMAT = os.getenv("AGENTIC_BROWSER_DOM_OUTPUT_FORMAT", "compact")
+
+COMPACT_FORMAT_HEADER = ("# One element per line, children indented below their parent: [mmid] tag role \"name\" attribute=value."
+                         " Select an element with [mmid='<mmid>'].")
+
+# Keys that are rendered in the fixed leading part of a compact line, or not at all
+COMPACT_LEADING_KEYS = {"mmid", "tag", "role", "name", "children"}
+
+
+def serialize_dom_tree(tree: dict[str, Any] | None, output_format: str = DOM_OUTPUT_FORMAT) -> str:
+    """
+    Serializes an enriched accessibility tree into the text handed to the browser agent.
+
+    Args:
+        tree (dict[str, Any] | None): The enriched and pruned accessibility tree.
+        output_format (str): "compact" for one indented line per node, "repr" for the Python repr of the tree.
+
+    Returns:
+        str: The serialized tree.
+    """
+    if output_format == "repr":
+        return str(tree)
+    if output_format == "compact":
+        return __serialize_compact(tree)
+    raise ValueError(f"Unknown DOM output format: {output_format}")
+
+
+def __serialize_compact(tree: dict[str, Any] | None) -> str:
+    """
+    Renders the tree as `[mmid] tag role "name" attribute=value` lines, indented by one space per level.
+    Keys such as 'role', 'name' and 'children' are implied by their position instead of being repeated on every node.
+    """
+    if not tree:
+        return ""
+
+    lines = [COMPACT_FORMAT_HEADER]
+    stack: list[tuple[dict[str, Any], int]] = [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        lines.append(" " * depth + __format_compact_node(node))
+        stack.extend((child, depth + 1) for child in reversed(node.get("children", ())))
+    return "\n".join(lines)
+
+
+def __format_compact_node(node: dict[str, Any]) -> str:
+    parts = []
+    if node.get("mmid") is not None:
+        parts.append(f"[{node['mmid']}]")
+    for key in ("tag", "role"):
+        if node.get(key):
+            parts.append(str(node[key]))
+    if node.get("name"):
+        parts.append(__format_value(node["name"], always_quote=True))
+
+    for key, value in node.items():
+        if key in COMPACT_LEADING_KEYS or value is None or value == "":
+            continue
+        if value is True:
+            parts.append(key)
+        else:
+            parts.append(f"{key}={__format_value(value)}")
+    return " ".join(parts)
+
+
+def __format_value(value: Any, always_quote: bool = False) -> str:
+    if isinstance(value, str):
+        if always_quote or not value.isidentifier():
+            return json.dumps(value, ensure_ascii=False)
+        return value
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def count_repr_tokens(tree: dict[str, Any] | None, output_format: str) -> int | None:
+    """
+    Returns the token count of the tree in the repr format, for log_serialization_stats to compare against, only with
+    debug logging: counting the repr costs as much as the serialization saves. Call it before the tree is trimmed to
+    a token budget, which modifies it.
+    """
+    if output_format == "repr" or not logger.isEnabledFor(logging.DEBUG):
+        return None
+    return count_tokens(str(tree))
+
+
+def log_serialization_stats(serialized: str, output_format: str, started_at: float, repr_tokens: int | None = None):
+    """
+    Logs the token count of the serialized tree and, when given, the token count of the repr format for comparison.
+
+    Args:
+        serialized (str): The output of serialize_dom_tree.
+        output_format (str): The format the tree was serialized with.
+        started_at (float): time.time() before serialization started.
+        repr_tokens (int | None): The output of count_repr_tokens for the tree before it was serialized.
+    """
+    elapsed_time = time.time() - started_at
+    tokens = count_tokens(serialized)
+    logger.info(f"DOM serialized as {output_format}: {tokens} tokens, {len(serialized)} chars in {elapsed_time:.3f}s")
+    if repr_tokens is None:
+        return
+
+    saved = (1 - tokens / repr_tokens) * 100 if repr_tokens else 0.0
+    logger.debug(f"DOM as repr, before any token budget trimming, would be {repr_tokens} tokens, {output_format} has {saved:.1f}% fewer")
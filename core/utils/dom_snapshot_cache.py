@@ -0,0 +1,101 @@
+import asyncio
+import os
+import weakref
+from typing import Any, Awaitable, Callable
+
+from playwright.async_api import Frame
+from playwright.async_api import Page
+
+from core.utils.dom_mutation_observer import PAGE_VERSION_TRACKER_JS
+from core.utils.logger import logger
+
+# Serve repeated DOM reads of an unchanged page from memory
+DOM_SNAPSHOT_CACHE = os.getenv("AGENTIC_BROWSER_DOM_SNAPSHOT_CACHE", "true").lower() == "true"
+
+PAGE_FINGERPRINT_JS = "() => {" + PAGE_VERSION_TRACKER_JS + """
+    const pageVersion = window.__agentGetPageVersion();
+    return {url: window.location.href, document_id: pageVersion.document_id, version: pageVersion.version};
+}"""
+
+snapshot_cache_stats = {"hits": 0, "misses": 0}
+
+
+class PageSnapshots:
+    """
+    The serialized DOM reads of one page, valid as long as the page's fingerprint does not change.
+    """
+
+    def __init__(self, fingerprint: tuple):
+        self.fingerprint = fingerprint
+        self.results: dict[tuple, str] = {}
+
+
+_page_snapshots: "weakref.WeakKeyDictionary[Page, PageSnapshots]" = weakref.WeakKeyDictionary()
+
+
+async def get_page_fingerprint(page: Page) -> tuple:
+    """
+    Returns a cheap fingerprint of the page's current state: its URL, the identity of its document and the number
+    of DOM mutations and input events it went through, for the main frame and each child frame, whose fields are part
+    of the extraction. The first call in a document installs the in-page counter.
+    """
+    child_frames = [frame for frame in page.frames if frame != page.main_frame and not frame.is_detached()]
+    fingerprints = await asyncio.gather(page.evaluate(PAGE_FINGERPRINT_JS), *(get_frame_fingerprint(frame) for frame in child_frames))
+    main_fingerprint = fingerprints[0]
+    return (main_fingerprint["url"], main_fingerprint["document_id"], main_fingerprint["version"], tuple(fingerprints[1:]))
+
+
+async def get_frame_fingerprint(frame: Frame) -> tuple:
+    """
+    Returns the fingerprint of a child frame. A frame that cannot be evaluated (e.g. while it navigates) gets a value
+    equal to no other, so the page's cached reads are not served.
+    """
+    try:
+        fingerprint = await frame.evaluate(PAGE_FINGERPRINT_JS)
+    except Exception:
+        return frame.url, object(), None
+    return fingerprint["url"], fingerprint["document_id"], fingerprint["version"]
+
+
+async def get_or_create_snapshot(page: Page, key: tuple, create: Callable[[], Awaitable[str | None]],
+                                 enabled: bool = DOM_SNAPSHOT_CACHE) -> str | None:
+    """
+    Returns the result of a previous DOM read with the same key when the page has not changed since, otherwise
+    runs `create` and remembers its result.
+
+    Args:
+        page (Page): The page that is read.
+        key (tuple): Identifies the kind of read and all the parameters that influence its result.
+        create (Callable[[], Awaitable[str | None]]): Performs the read. None results are not cached.
+        enabled (bool): When False, `create` is always run. Defaults to AGENTIC_BROWSER_DOM_SNAPSHOT_CACHE.
+
+    Returns:
+        str | None: The result of the read.
+    """
+    if not enabled:
+        return await create()
+
+    # Taken before the read, so that changes made while reading invalidate the result
+    fingerprint = await get_page_fingerprint(page)
+    snapshots = _page_snapshots.get(page)
+    if snapshots is None or snapshots.fingerprint != fingerprint:
+        snapshots = PageSnapshots(fingerprint)
+        _page_snapshots[page] = snapshots
+
+    result = snapshots.results.get(key)
+    if result is not None:
+        snapshot_cache_stats["hits"] += 1
+        logger.info(f"DOM snapshot cache hit for {key[0]} (hits: {snapshot_cache_stats['hits']}, misses: {snapshot_cache_stats['misses']})")
+        return result
+
+    snapshot_cache_stats["misses"] += 1
+    result = await create()
+    if result is not None:
+        snapshots.results[key] = result
+    return result
+
+
+def get_snapshot_cache_stats() -> dict[str, Any]:
+    """Returns the hit and miss counters of the DOM snapshot cache and its hit ratio."""
+    lookups = snapshot_cache_stats["hits"] + snapshot_cache_stats["misses"]
+    return {**snapshot_cache_stats, "hit_ratio": snapshot_cache_stats["hits"] / lookups if lookups else 0.0}
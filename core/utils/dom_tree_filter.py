@@ -0,0 +1,50 @@
+from typing import Any, Iterable
+
+
+def document_order(tree: dict[str, Any]) -> list[tuple[dict[str, Any], int]]:
+    """
+    Lists the nodes of the tree in document order (pre-order), without recursion.
+
+    Args:
+        tree (dict[str, Any]): The accessibility tree.
+
+    Returns:
+        list[tuple[dict[str, Any], int]]: (node, index of its parent in the list) pairs, the root's parent index is -1.
+        Parents always come before their children.
+    """
+    order: list[tuple[dict[str, Any], int]] = []
+    stack: list[tuple[dict[str, Any], int]] = [(tree, -1)]
+    while stack:
+        node, parent_index = stack.pop()
+        index = len(order)
+        order.append((node, parent_index))
+        stack.extend((child, index) for child in reversed(node.get("children", ())))
+    return order
+
+
+def copy_with_ancestors(order: list[tuple[dict[str, Any], int]], indexes: Iterable[int]) -> dict[str, Any]:
+    """
+    Builds a copy of the tree that holds only the given nodes and their ancestors, in document order.
+    Nodes are shallow copies, the input tree is not modified.
+
+    Args:
+        order (list[tuple[dict[str, Any], int]]): The output of document_order.
+        indexes (Iterable[int]): Indexes into `order` of the nodes to keep.
+
+    Returns:
+        dict[str, Any]: The copy of the root with the kept descendants.
+    """
+    kept = set()
+    for index in indexes:
+        while index >= 0 and index not in kept:
+            kept.add(index)
+            index = order[index][1]
+    kept.add(0)
+
+    copies: dict[int, dict[str, Any]] = {}
+    for index in sorted(kept):
+        node, parent_index = order[index]
+        copies[index] = {key: value for key, value in node.items() if key != "children"}
+        if parent_index >= 0:
+            copies[parent_index].setdefault("children", []).append(copies[index])
+    return copies[0]
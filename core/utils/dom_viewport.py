@@ -0,0 +1,229 @@
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from playwright.async_api import Page
+
+from core.utils.cdp_accessibility_tree import DOMSnapshotIndex
+from core.utils.dom_tree_filter import copy_with_ancestors
+from core.utils.dom_tree_filter import document_order
+from core.utils.logger import logger
+
+# "page" (default) to extract the whole page, "viewport" to extract one screenful at a time
+DOM_SCOPE = os.getenv("AGENTIC_BROWSER_DOM_SCOPE", "page").lower()
+
+# Pixels above and below the screen that are included in a viewport scoped extraction
+DOM_VIEWPORT_MARGIN = int(os.getenv("AGENTIC_BROWSER_DOM_VIEWPORT_MARGIN", "200"))
+
+
+@dataclass(frozen=True)
+class ViewportBand:
+    """
+    A horizontal band of the document, in CSS pixels from the top of the document: one screen plus a margin on both sides.
+    """
+    screen_top: float
+    viewport_height: float
+    document_height: float
+    margin: float
+
+    @property
+    def screen_bottom(self) -> float:
+        return self.screen_top + self.viewport_height
+
+    @property
+    def top(self) -> float:
+        return max(self.screen_top - self.margin, 0)
+
+    @property
+    def bottom(self) -> float:
+        return self.screen_bottom + self.margin
+
+    @property
+    def next_page_token(self) -> str | None:
+        """The page token of the next screen, None when this screen reaches the end of the document."""
+        if self.screen_bottom >= self.document_height:
+            return None
+        return str(int(self.screen_bottom))
+
+    def describe(self, tool_name: str) -> str:
+        """A note for the agent telling which part of the page was returned and how to get the next one."""
+        screens = max(int(-(-self.document_height // self.viewport_height)), 1) if self.viewport_height else 1
+        screen = min(int(self.screen_top // self.viewport_height) + 1, screens) if self.viewport_height else 1
+        note = (f"# Showing screen {screen} of {screens}: pixels {int(self.screen_top)}-{int(self.screen_bottom)}"
+                f" of {int(self.document_height)} (plus {int(self.margin)} px above and below).")
+        if self.next_page_token is None:
+            return note + " This is the end of the content loaded so far."
+        return note + f" Call {tool_name} with page_token='{self.next_page_token}' for the next screen."
+
+
+async def get_viewport_band(page: Page, page_token: str | None = None, margin: int = DOM_VIEWPORT_MARGIN) -> ViewportBand:
+    """
+    Builds the band to extract: the current screen, or the screen starting at `page_token` when given.
+
+    Args:
+        page (Page): The page to extract from.
+        page_token (str | None): A token returned in a previous viewport scoped extraction.
+        margin (int): Pixels above and below the screen to include.
+
+    Returns:
+        ViewportBand: The band to extract.
+
+    Raises:
+        ValueError: If the page token is not valid.
+    """
+    metrics = await page.evaluate("""
+        () => ({
+            scroll_y: window.scrollY,
+            viewport_height: window.innerHeight,
+            document_height: Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0),
+        })
+    """)
+    screen_top = metrics["scroll_y"]
+    if page_token:
+        try:
+            screen_top = float(page_token)
+        except ValueError:
+            raise ValueError(f"Invalid page_token '{page_token}', use a page_token returned by a previous call or none for the current screen.")
+    return ViewportBand(screen_top, metrics["viewport_height"], metrics["document_height"], margin)
+
+
+VIEWPORT_TEXT_JS = """
+(band) => {
+    const ignoredTags = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE']);
+    const overlay = document.querySelector('#tawebagent-overlay');
+    const scrollY = window.scrollY;
+    const inBand = (rect) => (rect.width || rect.height) && rect.bottom + scrollY >= band.top && rect.top + scrollY <= band.bottom;
+
+    const parts = [];
+    let lastParent = null;
+    const range = document.createRange();
+    const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        const node = walker.currentNode;
+        const text = node.textContent.trim();
+        const parent = node.parentElement;
+        if (!text || !parent || ignoredTags.has(parent.tagName) || (overlay && overlay.contains(parent))) {
+            continue;
+        }
+        range.selectNodeContents(node);
+        if (!inBand(range.getBoundingClientRect())) {
+            continue;
+        }
+        // Text of the same element stays on one line, a new element starts a new line
+        if (parts.length && parent === lastParent) {
+            parts[parts.length - 1] += ' ' + text;
+        } else {
+            parts.push(text);
+        }
+        lastParent = parent;
+    }
+
+    const altTexts = Array.from(document.querySelectorAll('img[alt]'))
+        .filter(img => img.alt && inBand(img.getBoundingClientRect()))
+        .map(img => img.alt);
+    return parts.join('\\n') + " Other Alt Texts in the page: " + altTexts.join(' ');
+}
+"""
+
+
+async def get_text_in_band(page: Page, band: ViewportBand) -> str:
+    """
+    Returns the text of the page (and the alt texts of its images) that is rendered within the band.
+    Every text node of the page is still visited and measured in one evaluate; only the returned text, and so the
+    agent's tokens, is bounded by the size of the band.
+    """
+    return await page.evaluate(VIEWPORT_TEXT_JS, {"top": band.top, "bottom": band.bottom})
+
+
+VIEWPORT_MMIDS_JS = """
+(band) => {
+    const scrollY = window.scrollY;
+    const mmids = [];
+    const elements = window.__agentMmidIndex
+        ? Array.from(window.__agentMmidIndex.values(), ref => ref.deref())
+        : Array.from(document.querySelectorAll('[mmid]'));
+    for (const element of elements) {
+        if (!element || !element.isConnected) {
+            continue;
+        }
+        const rect = element.getBoundingClientRect();
+        if ((rect.width || rect.height) && rect.bottom + scrollY >= band.top && rect.top + scrollY <= band.bottom) {
+            mmids.push(element.getAttribute('mmid'));
+        }
+    }
+    return mmids;
+}
+"""
+
+
+async def get_mmids_in_band(page: Page, band: ViewportBand, tree: dict[str, Any], cdp_session=None,
+                            layout_index: DOMSnapshotIndex | None = None) -> set[str]:
+    """
+    Returns the mmids of the tree's elements that are rendered within the band.
+
+    Args:
+        page (Page): The page the tree was extracted from.
+        band (ViewportBand): The band to test against.
+        tree (dict[str, Any]): The accessibility tree, used to know which mmids to test with the CDP engine.
+        cdp_session: The CDP session of the page when the tree was extracted over CDP. Its mmids are backend node ids,
+            which are not known to the page, so the layout boxes of all nodes are read with one DOMSnapshot.captureSnapshot.
+        layout_index (DOMSnapshotIndex | None): The snapshot the tree was extracted from with the DOMSnapshot engine.
+            Its layout boxes are used as they are, without any round trip.
+
+    Returns:
+        set[str]: The mmids within the band.
+    """
+    if layout_index is None and cdp_session is None:
+        return set(await page.evaluate(VIEWPORT_MMIDS_JS, {"top": band.top, "bottom": band.bottom}))
+
+    if layout_index is None:
+        layout_index = DOMSnapshotIndex(await cdp_session.send("DOMSnapshot.captureSnapshot", {"computedStyles": []}))
+
+    mmids_in_band = set()
+    for mmid in (__node_mmid(node) for node, _ in document_order(tree)):
+        bounds = layout_index.get_bounds(int(mmid)) if mmid is not None else None
+        if bounds and (bounds[2] or bounds[3]) and bounds[1] + bounds[3] >= band.top and bounds[1] <= band.bottom:
+            mmids_in_band.add(mmid)
+    return mmids_in_band
+
+
+def __node_mmid(node: dict[str, Any]) -> str | None:
+    """The mmid of an enriched node, or of a raw accessibility node (from its injected 'keyshortcuts')."""
+    if node.get("mmid") is not None:
+        return str(node["mmid"])
+    keyshortcuts = node.get("keyshortcuts")
+    if isinstance(keyshortcuts, str) and keyshortcuts:
+        mmid = keyshortcuts.split(" ")[-1]
+        if mmid.isdigit():
+            return mmid
+    return None
+
+
+def scope_tree_to_band(tree: dict[str, Any] | None, mmids_in_band: set[str]) -> dict[str, Any] | None:
+    """
+    Keeps the elements whose mmid is within the band, the nodes without mmid inside them (text) and their ancestors.
+    Works on the raw accessibility tree as well as on the enriched one.
+
+    Args:
+        tree (dict[str, Any] | None): The accessibility tree.
+        mmids_in_band (set[str]): The output of get_mmids_in_band.
+
+    Returns:
+        dict[str, Any] | None: The reduced tree, a copy; the input is not modified.
+    """
+    if not tree:
+        return tree
+
+    order = document_order(tree)
+    # Nodes without mmid are in the band when their parent is, parents are always listed before their children
+    in_band = [False] * len(order)
+    for index, (node, parent_index) in enumerate(order):
+        mmid = __node_mmid(node)
+        if mmid is not None:
+            in_band[index] = mmid in mmids_in_band
+        elif parent_index >= 0:
+            in_band[index] = in_band[parent_index]
+
+    kept = [index for index, is_kept in enumerate(in_band) if is_kept]
+    logger.info(f"Viewport scope kept {len(kept)} of {len(order)} nodes")
+    return copy_with_ancestors(order, kept)
@@ -1,14 +1,37 @@
+import asyncio
 import json
 import os
 import re
 import traceback
+import weakref
 from typing import Annotated
 from typing import Any
 from config import SOURCE_LOG_FOLDER_PATH
+from playwright.async_api import Frame
 from playwright.async_api import Page
 import aiofiles
 import time  # Add this for timestamp tracking
 from core.browser_manager import PlaywrightManager
+from core.utils.cdp_accessibility_tree import CDPDomIndex
+from core.utils.cdp_accessibility_tree import DOMSnapshotIndex
+from core.utils.cdp_accessibility_tree import get_cdp_accessibility_snapshot
+from core.utils.cdp_accessibility_tree import get_cdp_session
+from core.utils.cdp_accessibility_tree import get_dom_snapshot_accessibility_snapshot
+from core.utils.dom_frames import frame_mmid_prefix
+from core.utils.dom_frames import get_frame_registry
+from core.utils.dom_helper import DEEP_ELEMENTS_JS
+from core.utils.dom_helper import RESOLVE_ELEMENT_JS
+from core.utils.dom_mutation_observer import DIRTY_MMID_TRACKER_JS
+from core.utils.dom_relevance import DOM_RELEVANCE_TOP_K
+from core.utils.dom_relevance import rank_fields_by_relevance
+from core.utils.dom_budget import DOM_TOKEN_BUDGET
+from core.utils.dom_budget import fit_tree_to_budget
+from core.utils.dom_serializer import DOM_OUTPUT_FORMAT
+from core.utils.dom_serializer import count_repr_tokens
+from core.utils.dom_serializer import log_serialization_stats
+from core.utils.dom_viewport import ViewportBand
+from core.utils.dom_viewport import get_mmids_in_band
+from core.utils.dom_viewport import scope_tree_to_band
 from core.utils.logger import logger
 
 
@@ -29,33 +52,501 @@ def is_space_delimited_mmid(s: str) -> bool:
     return bool(space_delimited_mmid.fullmatch(s))
 
 
-async def __inject_attributes(page: Page):
+# In-page mmid injection, see __inject_attributes. 'prefix' qualifies the mmids of child frames (e.g. "f2-"), and
+# 'keyshortcuts' mirrors the mmid into aria-keyshortcuts so that it shows up in the accessibility snapshot.
+__INJECT_ATTRIBUTES_JS = """(params) => {
+    const incremental = params.incremental;
+    const prefix = params.prefix;
+    const deepElements = __DEEP_ELEMENTS__;
+    """ + DIRTY_MMID_TRACKER_JS + """
+    if (!window.__agentDomEpoch || !incremental) {
+        window.__agentDomEpoch = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        window.__agentLastMmid = 0;
+    }
+    const dirty = window.__agentCollectDirtyMmids();
+    const reassigned = [];
+    const seenMmids = new Set();
+    const mmidIndex = new Map();
+    const isOwnMmid = (mmid) => mmid.startsWith(prefix) && /^[0-9]+$/.test(mmid.slice(prefix.length));
+    const observeShadowRoot = (root) => {
+        window.__agentObserveDirtyRoot(root);
+        if (window.__agentObserveVersionRoot) window.__agentObserveVersionRoot(root);
+    };
+    const allElements = deepElements(document, observeShadowRoot);
+    allElements.forEach(element => {
+        const origAriaAttribute = element.getAttribute('aria-keyshortcuts');
+        let mmid = incremental ? element.getAttribute('mmid') : null;
+        if (!mmid || !isOwnMmid(mmid) || seenMmids.has(mmid)) {
+            if (mmid) reassigned.push(mmid);
+            mmid = `${prefix}${++window.__agentLastMmid}`;
+            element.setAttribute('mmid', mmid);
+        }
+        seenMmids.add(mmid);
+        mmidIndex.set(mmid, new WeakRef(element));
+        if (params.keyshortcuts) {
+            element.setAttribute('aria-keyshortcuts', mmid);
+            //console.log(`Injected 'mmid'into element with tag: ${element.tagName} and mmid: ${mmid}`);
+            if (origAriaAttribute) {
+                element.setAttribute('orig-aria-keyshortcuts', origAriaAttribute);
+            }
+        }
+    });
+    window.__agentMmidIndex = mmidIndex;
+    return {epoch: window.__agentDomEpoch, last_mmid: window.__agentLastMmid, dirty: dirty.concat(reassigned)};
+}""".replace("__DEEP_ELEMENTS__", DEEP_ELEMENTS_JS)
+
+
+async def __inject_attributes(page: Page, incremental: bool = True) -> dict[str, Any]:
     """
     Injects 'mmid' and 'aria-keyshortcuts' into all DOM elements. If an element already has an 'aria-keyshortcuts',
     it renames it to 'orig-aria-keyshortcuts' before injecting the new 'aria-keyshortcuts'
     This will be captured in the accessibility tree and thus make it easier to reconcile the tree with the DOM.
     'aria-keyshortcuts' is choosen because it is not widely used aria attribute.
+    Elements inside open shadow roots are included, the accessibility tree contains them as well.
+
+    In incremental mode elements keep the mmid they got on a previous call and only new elements (or copies carrying a
+    duplicated mmid) are numbered, so cached enrichment stays valid. The returned 'epoch' identifies the document: it
+    changes on every navigation. 'dirty' lists the mmids that changed since the previous call.
+
+    The same pass rebuilds window.__agentMmidIndex (mmid -> WeakRef(element)), which RESOLVE_ELEMENT_JS uses to turn
+    mmid selectors into constant-time lookups instead of attribute-selector scans of the whole document.
     """
 
-    last_mmid = await page.evaluate("""() => {
-        const allElements = document.querySelectorAll('*');
-        let id = 0;
-        allElements.forEach(element => {
-            const origAriaAttribute = element.getAttribute('aria-keyshortcuts');
-            const mmid = `${++id}`;
-            element.setAttribute('mmid', mmid);
-            element.setAttribute('aria-keyshortcuts', mmid);
-            //console.log(`Injected 'mmid'into element with tag: ${element.tagName} and mmid: ${mmid}`);
-            if (origAriaAttribute) {
-                element.setAttribute('orig-aria-keyshortcuts', origAriaAttribute);
-            }
-        });
-        return id;
-    }""")
-    logger.debug(f"Added MMID into {last_mmid} elements")
+    injection = await page.evaluate(__INJECT_ATTRIBUTES_JS, {"incremental": incremental, "prefix": "", "keyshortcuts": True})
+    logger.debug(f"Added MMID into elements, last mmid is {injection['last_mmid']}, {len(injection['dirty'])} dirty since last capture")
+    return injection
+
+
+class EnrichmentCache:
+    """
+    Per-page cache of enrichment results for the injection engine.
+
+    Entries are keyed by (mmid, should_fetch_inner_text) and stay valid for as long as the document lives ('epoch') and the
+    element is not reported dirty by the in-page tracker. After a navigation the epoch changes and the cache starts over.
+    Style changes inherited from an ancestor (e.g. a class toggling the cursor) do not dirty the descendants.
+    """
+
+    def __init__(self, epoch: str):
+        self.epoch = epoch
+        self.attributes: dict[tuple[int, bool], dict[str, Any] | None] = {}
+
+    def invalidate(self, mmids: list[str]):
+        for mmid in filter(str.isdigit, mmids):
+            self.attributes.pop((int(mmid), True), None)
+            self.attributes.pop((int(mmid), False), None)
+
+
+_enrichment_caches: "weakref.WeakKeyDictionary[Page, EnrichmentCache]" = weakref.WeakKeyDictionary()
+
+
+def __get_enrichment_cache(page: Page, injection: dict[str, Any]) -> EnrichmentCache:
+    """
+    Returns the page's enrichment cache brought up to date with the latest injection result.
+    """
+    cache = _enrichment_caches.get(page)
+    if cache is None or cache.epoch != injection["epoch"]:
+        logger.debug("New document detected, rebuilding the accessibility enrichment cache")
+        cache = EnrichmentCache(injection["epoch"])
+        _enrichment_caches[page] = cache
+    else:
+        cache.invalidate(injection["dirty"])
+    return cache
+
+
+# Attributes read from every enriched element, and what to skip or drop afterwards.
+ENRICHMENT_ATTRIBUTES = ['name', 'aria-label', 'placeholder', 'mmid', "id", "for", "data-testid", "role", "class", "tabindex","href", "target" ]
+ENRICHMENT_BACKUP_ATTRIBUTES = [] #if the attributes are not found, then try to get these attributes
+ENRICHMENT_TAGS_TO_IGNORE = ['head','style', 'script', 'link', 'meta', 'noscript', 'template', 'iframe', 'g', 'main', 'c-wiz', 'path']
+ENRICHMENT_ATTRIBUTES_TO_DELETE = ["level", "multiline", "haspopup", "id", "for"]
+ENRICHMENT_IDS_TO_IGNORE = ['agentDriveAutoOverlay']
+
+# "batched" resolves and enriches every node in a single page.evaluate, "per_node" keeps the old one-evaluate-per-node path.
+ENRICHMENT_MODE = os.getenv("AGENTIC_BROWSER_DOM_ENRICHMENT_MODE", "batched").lower()
+
+# "inject" tags every element with mmid/aria-keyshortcuts before the snapshot, "cdp" reads the tree over a CDP session
+# without writing to the page (mmids are then backendNodeIds), "domsnapshot" does the same with DOMSnapshot.captureSnapshot
+# as DOM source, which adds clickability, computed styles and layout boxes to a single round trip.
+DOM_ENGINE = os.getenv("AGENTIC_BROWSER_DOM_ENGINE", "inject").lower()
+
+# Reuse enrichment results between captures of the same document and only re-enrich what changed.
+INCREMENTAL_ENRICHMENT = os.getenv("AGENTIC_BROWSER_DOM_INCREMENTAL", "true").lower() == "true"
+
+# In-page function reading everything the enrichment needs from style and layout (computed cursor, rendered text,
+# visibility) for a batch of elements, back to back and before any other work of the batch, so the browser resolves
+# style and layout once per batch rather than once per element. Clickability is decided from the markup and the
+# accessibility role first; the computed style is only read for the elements that are still undecided.
+__READ_LAYOUT_JS = """
+(elements, entries, input_params) => {
+    const clickableRoles = ['button', 'link', 'tab'];
+    const clickableTags = ['button', 'a'];
+
+    return elements.map((element, index) => {
+        if (!element) return null;
+        const entry = entries[index];
+        const tag = element.tagName.toLowerCase();
+        if (input_params.tags_to_ignore.includes(tag) || tag === 'option') return null;
+
+        const hasSvg = element.querySelector('svg') !== null;
+        const className = (element.getAttribute('class') || '').toLowerCase();
+        const isClickable = (
+            element.onclick != null ||
+            clickableRoles.includes(entry.ax_role) ||
+            clickableRoles.includes(element.getAttribute('role')) ||
+            element.hasAttribute('tabindex') ||
+            className.includes('trigger') ||
+            className.includes('clickable') ||
+            hasSvg ||
+            clickableTags.includes(tag) ||
+            window.getComputedStyle(element).cursor === 'pointer'
+        );
+        return {
+            is_clickable: isClickable,
+            has_svg: hasSvg,
+            is_visible: element.getClientRects().length > 0,
+            inner_text: entry.should_fetch_inner_text && tag !== 'select' ? element.innerText : null,
+        };
+    });
+}
+"""
+
+# In-page function shared by both enrichment modes. Given a resolved element and its layout data from
+# __READ_LAYOUT_JS it returns the attributes to merge into the accessibility node, or null when the element should be
+# ignored. It only reads the DOM, never style or layout.
+__ENRICH_ELEMENT_JS = """
+(element, layout, input_params) => {
+    const attributes = input_params.attributes;
+    const tags_to_ignore = input_params.tags_to_ignore;
+    const ids_to_ignore = input_params.ids_to_ignore;
+
+    if (ids_to_ignore.includes(element.id)) {
+        console.log(`Ignoring element with id: ${element.id}`, element);
+        return null;
+    }
+
+    if (!layout || tags_to_ignore.includes(element.tagName.toLowerCase()) || element.tagName.toLowerCase() === "option") return null;
+
+    let attributes_to_values = {
+        'tag': element.tagName.toLowerCase()
+    };
+
+    // Add clickability check
+    if (layout.is_clickable) {
+        attributes_to_values['is_clickable'] = true;
+        attributes_to_values['class'] = element.getAttribute('class') || '';
+
+        // If element has SVG child
+        if (layout.has_svg) {
+            attributes_to_values['has_svg'] = true;
+            attributes_to_values['role'] = attributes_to_values['role'] || 'button';
+        }
+    }
+
+    if (element.tagName.toLowerCase() === 'input') {
+        attributes_to_values['tag_type'] = element.type;
+    }
+    else if (element.tagName.toLowerCase() === 'select') {
+        attributes_to_values["mmid"] = element.getAttribute('mmid');
+        attributes_to_values["role"] = "combobox";
+        attributes_to_values["options"] = [];
+
+        for (const option of element.options) {
+            let option_attributes_to_values = {
+                "mmid": option.getAttribute('mmid'),
+                "text": option.text,
+                "value": option.value,
+                "selected": option.selected
+            };
+            attributes_to_values["options"].push(option_attributes_to_values);
+        }
+        return attributes_to_values;
+    }
+
+    for (const attribute of attributes) {
+        let value = element.getAttribute(attribute);
+        if(value){
+            attributes_to_values[attribute] = value;
+        }
+    }
+
+    if (!attributes_to_values['role']) {
+        const elementRole = element.getAttribute('role') || element.role;
+        if (elementRole) {
+            attributes_to_values['role'] = elementRole;
+        }
+    }
+
+    if (layout.inner_text) {
+        attributes_to_values['description'] = layout.inner_text;
+    }
+
+    return attributes_to_values;
+}
+"""
+
+__ENRICH_SINGLE_NODE_JS = """
+(input_params) => {
+    const readLayout = __READ_LAYOUT__;
+    const enrichElement = __ENRICH_ELEMENT__;
+    const resolveElement = __RESOLVE_ELEMENT__;
+    const mmid = input_params.mmid;
+
+    const element = resolveElement(`[mmid="${mmid}"]`);
+
+    if (!element) {
+        console.log(`No element found with mmid: ${mmid}`);
+        return null;
+    }
+
+    const [layout] = readLayout([element], [input_params], input_params);
+    return enrichElement(element, layout, input_params);
+}
+""".replace("__READ_LAYOUT__", __READ_LAYOUT_JS).replace("__ENRICH_ELEMENT__", __ENRICH_ELEMENT_JS).replace("__RESOLVE_ELEMENT__", RESOLVE_ELEMENT_JS)
+
+__ENRICH_BATCH_JS = """
+(input_params) => {
+    const readLayout = __READ_LAYOUT__;
+    const enrichElement = __ENRICH_ELEMENT__;
+    const resolveElement = __RESOLVE_ELEMENT__;
+
+    const entries = input_params.entries;
+    const elements = entries.map(entry => {
+        const element = resolveElement(`[mmid="${entry.mmid}"]`);
+        if (!element) {
+            console.log(`No element found with mmid: ${entry.mmid}`);
+        }
+        return element;
+    });
+    // Read phase over the whole batch first, then the DOM-only enrichment
+    const layouts = readLayout(elements, entries, input_params);
+    return elements.map((element, index) => element ? enrichElement(element, layouts[index], input_params) : null);
+}
+""".replace("__READ_LAYOUT__", __READ_LAYOUT_JS).replace("__ENRICH_ELEMENT__", __ENRICH_ELEMENT_JS).replace("__RESOLVE_ELEMENT__", RESOLVE_ELEMENT_JS)
+
+# Walk child frames (iframes) as well. Their accessibility trees are not part of the page's snapshot.
+EXTRACT_FRAMES = os.getenv("AGENTIC_BROWSER_DOM_FRAMES", "true").lower() == "true"
+
+# Elements of a child frame that are returned as fields
+FRAME_FIELD_SELECTOR = ", ".join([
+    "a[href]", "button", "input:not([type=hidden])", "select", "textarea", "summary", "[contenteditable='']", "[contenteditable='true']",
+    "[onclick]", "[tabindex]:not([tabindex='-1'])",
+    *(f"[role='{role}']" for role in ["button", "link", "checkbox", "radio", "switch", "tab", "menuitem", "menuitemcheckbox", "menuitemradio",
+                                      "option", "combobox", "textbox", "searchbox", "slider", "spinbutton", "listbox", "treeitem"]),
+])
+
+# Injects frame-qualified mmids into a child frame, then lists its visible fields (open shadow roots included) with an
+# accessible role and name and their enrichment, all in one evaluate. The frame's accessibility tree is not available
+# through the page's snapshot, so the field nodes are built from the DOM.
+__FRAME_FIELDS_JS = """
+(input_params) => {
+    const injectAttributes = __INJECT_ATTRIBUTES__;
+    const deepElements = __DEEP_ELEMENTS__;
+    const readLayout = __READ_LAYOUT__;
+    const enrichElement = __ENRICH_ELEMENT__;
+    injectAttributes(input_params);
+
+    const implicitRoles = {a: 'link', button: 'button', select: 'combobox', textarea: 'textbox', summary: 'button'};
+    const inputRoles = {checkbox: 'checkbox', radio: 'radio', button: 'button', submit: 'button', reset: 'button', image: 'button',
+                        range: 'slider', number: 'spinbutton', search: 'searchbox'};
+    const getRole = (element) => {
+        const tag = element.tagName.toLowerCase();
+        if (element.getAttribute('role')) return element.getAttribute('role');
+        if (tag === 'input') return inputRoles[(element.getAttribute('type') || 'text').toLowerCase()] || 'textbox';
+        return implicitRoles[tag] || (element.isContentEditable ? 'textbox' : 'generic');
+    };
+    const textOf = (ids) => ids.split(/\\s+/).map(id => document.getElementById(id)).filter(Boolean)
+        .map(element => element.innerText || element.textContent || '').join(' ');
+    const getName = (element) => {
+        const name = element.getAttribute('aria-label')
+            || (element.getAttribute('aria-labelledby') && textOf(element.getAttribute('aria-labelledby')))
+            || (element.labels && element.labels.length ? Array.from(element.labels, label => label.innerText).join(' ') : '')
+            || element.getAttribute('placeholder') || element.getAttribute('title') || element.getAttribute('alt')
+            || (['button', 'submit', 'reset'].includes(element.type) ? element.value : '')
+            || (['input', 'select', 'textarea'].includes(element.tagName.toLowerCase()) ? '' : element.innerText) || '';
+        return name.trim().slice(0, 200);
+    };
+
+    const candidates = deepElements(document).filter(element => element.matches(input_params.field_selector));
+    const roles = candidates.map(getRole);
+    const layouts = readLayout(candidates, roles.map(role => ({ax_role: role, should_fetch_inner_text: true})), input_params);
+    const fields = [];
+    candidates.forEach((element, index) => {
+        if (!layouts[index] || !layouts[index].is_visible) return;
+        const attributes = enrichElement(element, layouts[index], input_params);
+        if (!attributes) return;
+        fields.push({mmid: element.getAttribute('mmid'), role: roles[index], name: getName(element), attributes: attributes});
+    });
+    return fields;
+}
+""".replace("__INJECT_ATTRIBUTES__", __INJECT_ATTRIBUTES_JS).replace("__DEEP_ELEMENTS__", DEEP_ELEMENTS_JS).replace(
+    "__READ_LAYOUT__", __READ_LAYOUT_JS).replace("__ENRICH_ELEMENT__", __ENRICH_ELEMENT_JS)
+
+
+async def __extract_frame_fields(page: Page, frame: Frame, incremental: bool) -> list[dict[str, Any]]:
+    """
+    Extracts the fields of a child frame as accessibility nodes with frame-qualified mmids (e.g. "f2-57"), ready to be
+    grafted into the page's tree. Skills resolve those mmids to the frame through the page's frame registry.
+
+    Args:
+        page (Page): The page the frame belongs to.
+        frame (Frame): The child frame.
+        incremental (bool): Keep the mmids of elements that were numbered by a previous extraction.
+
+    Returns:
+        list[dict[str, Any]]: The enriched field nodes of the frame, empty if the frame could not be read.
+    """
+    frame_index = get_frame_registry(page).index_of(frame)
+    input_params = {"attributes": ENRICHMENT_ATTRIBUTES, "backup_attributes": ENRICHMENT_BACKUP_ATTRIBUTES,
+                    "tags_to_ignore": ENRICHMENT_TAGS_TO_IGNORE, "ids_to_ignore": ENRICHMENT_IDS_TO_IGNORE,
+                    "incremental": incremental, "prefix": frame_mmid_prefix(frame_index), "keyshortcuts": False,
+                    "field_selector": FRAME_FIELD_SELECTOR}
+    try:
+        fields = await frame.evaluate(__FRAME_FIELDS_JS, input_params)
+    except Exception as e:
+        # Frames can navigate or detach at any time
+        logger.debug(f"Unable to extract the fields of frame {frame_index} ({frame.url}): {e}")
+        return []
+
+    nodes = []
+    for field in fields:
+        node = {"role": field["role"], "name": field["name"]}
+        __merge_element_attributes(node, field["mmid"], field["attributes"])
+        nodes.append(node)
+    logger.debug(f"Extracted {len(nodes)} fields from frame {frame_index} ({frame.url})")
+    return nodes
+
+
+async def __extract_child_frames(page: Page, incremental: bool) -> list[dict[str, Any]]:
+    """
+    Extracts the fields of all child frames of the page concurrently.
+
+    Returns:
+        list[dict[str, Any]]: The field nodes of all child frames, in frame order.
+    """
+    child_frames = [frame for frame in page.frames if frame != page.main_frame and not frame.is_detached()]
+    if not child_frames:
+        return []
+    frame_nodes = await asyncio.gather(*(__extract_frame_fields(page, frame, incremental) for frame in child_frames))
+    return [node for nodes in frame_nodes for node in nodes]
+
+
+def __collect_nodes_to_enrich(node: dict[str, Any], nodes_to_enrich: list[tuple[dict[str, Any], int, bool]]):
+    """
+    Walks the accessibility tree (children first) and collects every node that has to be reconciled with the DOM.
+    Nodes that need no DOM information (menu items, calendar days) are finalised in place here.
+    The walk uses an explicit stack so deeply nested pages cannot exhaust the recursion limit.
+
+    Args:
+        node (dict[str, Any]): The accessibility node to start from.
+        nodes_to_enrich (list[tuple[dict[str, Any], int, bool]]): Collected (node, mmid, should_fetch_inner_text) entries.
+    """
+    # Pre-order walk that visits the last child first; reversed it is the children-first order
+    walk_order: list[dict[str, Any]] = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        walk_order.append(current)
+        stack.extend(current.get('children', ()))
+
+    for current in reversed(walk_order):
+        __collect_node_to_enrich(current, nodes_to_enrich)
+
+
+def __collect_node_to_enrich(node: dict[str, Any], nodes_to_enrich: list[tuple[dict[str, Any], int, bool]]):
+    """
+    Finalises a single accessibility node in place or queues it for DOM enrichment.
 
+    Args:
+        node (dict[str, Any]): The accessibility node to look at. Its children are not visited.
+        nodes_to_enrich (list[tuple[dict[str, Any], int, bool]]): Collected (node, mmid, should_fetch_inner_text) entries.
+    """
+    mmid_temp: str = node.get('keyshortcuts')
+
+    if(mmid_temp and is_space_delimited_mmid(mmid_temp)):
+        mmid_temp = mmid_temp.split(' ')[-1]
 
-async def __fetch_dom_info(page: Page, accessibility_tree: dict[str, Any], only_input_fields: bool):
+    try:
+        mmid = int(mmid_temp)
+    except (ValueError, TypeError):
+        return
+
+    if node['role'] == 'menuitem':
+        return
+
+    if node.get('role') == 'dialog' and node.get('modal') == True:
+        node["important information"] = "This is a modal dialog. Please interact with this dialog and close it to be able to interact with the full page (e.g. by pressing the close button or selecting an option)."
+
+    # Special handling for calendar items
+    if node.get('role') == 'checkbox' and 'name' in node and any(month in node['name'] for month in ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']):
+        node.update({
+            'mmid': mmid,
+            'tag': 'button',  # Calendar days are typically buttons
+            'is_clickable': True,
+            'role': 'checkbox',
+            'name': node.get('name', ''),
+            'checked': node.get('checked', False)
+        })
+        return
+
+    if mmid:
+        nodes_to_enrich.append((node, mmid, 'children' not in node))
+    else:
+        logger.debug(f"No element found with mmid: {mmid}, deleting node: {node}")
+        node["marked_for_deletion_by_mm"] = True
+
+
+def __merge_element_attributes(node: dict[str, Any], mmid: int, element_attributes: dict[str, Any] | None):
+    """
+    Merges the attributes fetched from the DOM into the accessibility node and drops redundant information.
+
+    Args:
+        node (dict[str, Any]): The accessibility node to update in place.
+        mmid (int): The mmid of the DOM element backing the node.
+        element_attributes (dict[str, Any] | None): The attributes returned by the enrichment script, None if the element was not found or ignored.
+    """
+    if 'keyshortcuts' in node:
+        del node['keyshortcuts']
+
+    node["mmid"] = mmid
+
+    if element_attributes:
+        node.update(element_attributes)
+
+        if node.get('name') == node.get('mmid') and node.get('role') != "textbox":
+            del node['name']
+
+        if 'name' in node and 'description' in node and (node['name'] == node['description'] or node['name'] == node['description'].replace('\n', ' ') or node['description'].replace('\n', '') in node['name']):
+            del node['description']
+
+        if 'name' in node and 'aria-label' in node and node['aria-label'] in node['name']:
+            del node['aria-label']
+
+        if 'name' in node and 'text' in node and node['name'] == node['text']:
+            del node['text']
+
+        if node.get('tag') == "select":
+            node.pop("children", None)
+            node.pop("role", None)
+            node.pop("description", None)
+
+        if node.get('role') == node.get('tag'):
+            del node['role']
+
+        if node.get("aria-label") and node.get("placeholder") and node.get("aria-label") == node.get("placeholder"):
+            del node["aria-label"]
+
+        if node.get("role") == "link":
+            del node["role"]
+            if node.get("description"):
+                node["text"] = node["description"]
+                del node["description"]
+
+    for attribute_to_delete in ENRICHMENT_ATTRIBUTES_TO_DELETE:
+        if attribute_to_delete in node:
+            node.pop(attribute_to_delete, None)
+
+
+async def __fetch_dom_info(page: Page, accessibility_tree: dict[str, Any], only_input_fields: bool, enrichment_mode: str = ENRICHMENT_MODE,
+                           dom_index: CDPDomIndex | None = None, enrichment_cache: EnrichmentCache | None = None):
     """
     Iterates over the accessibility tree, fetching additional information from the DOM based on 'mmid',
     and constructs a new JSON structure with detailed information.
@@ -64,229 +555,47 @@ async def __fetch_dom_info(page: Page, accessibility_tree: dict[str, Any], only_
         page (Page): The page object representing the web page.
         accessibility_tree (dict[str, Any]): The accessibility tree JSON structure.
         only_input_fields (bool): Flag indicating whether to include only input fields in the new JSON structure.
+        enrichment_mode (str): "batched" to enrich all nodes with a single page.evaluate call, "per_node" to issue one call per node.
+        dom_index (CDPDomIndex | None): When given (CDP and DOMSnapshot engines), nodes are enriched from this index instead of the page.
+        enrichment_cache (EnrichmentCache | None): When given, only nodes missing from the cache are fetched from the page.
 
     Returns:
         dict[str, Any]: The pruned tree with detailed information from the DOM.
     """
 
     logger.debug("Reconciling the Accessibility Tree with the DOM")
-    # Define the attributes to fetch for each element
-    attributes = ['name', 'aria-label', 'placeholder', 'mmid', "id", "for", "data-testid", "role", "class", "tabindex","href", "target" ]
-    backup_attributes = [] #if the attributes are not found, then try to get these attributes
-    tags_to_ignore = ['head','style', 'script', 'link', 'meta', 'noscript', 'template', 'iframe', 'g', 'main', 'c-wiz', 'path']
-    attributes_to_delete = ["level", "multiline", "haspopup", "id", "for"]
-    ids_to_ignore = ['agentDriveAutoOverlay']
-
-    async def process_node(node: dict[str, Any]):
-        # Process children first
-        if 'children' in node:
-            for child in node['children']:
-                await process_node(child)
-
-        mmid_temp: str = node.get('keyshortcuts')
-
-        if(mmid_temp and is_space_delimited_mmid(mmid_temp)):
-            mmid_temp = mmid_temp.split(' ')[-1]
-
-        try:
-            mmid = int(mmid_temp)
-        except (ValueError, TypeError):
-            return node.get('name')
-
-        if node['role'] == 'menuitem':
-            return node.get('name')
-
-        if node.get('role') == 'dialog' and node.get('modal') == True:
-            node["important information"] = "This is a modal dialog. Please interact with this dialog and close it to be able to interact with the full page (e.g. by pressing the close button or selecting an option)."
-
-        # Special handling for calendar items
-        if node.get('role') == 'checkbox' and 'name' in node and any(month in node['name'] for month in ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']):
-            node.update({
-                'mmid': mmid,
-                'tag': 'button',  # Calendar days are typically buttons
-                'is_clickable': True,
-                'role': 'checkbox',
-                'name': node.get('name', ''),
-                'checked': node.get('checked', False)
-            })
-            return node
-
-        if mmid:
-            should_fetch_inner_text = 'children' not in node
-
-            js_code = """
-            (input_params) => {
-                const should_fetch_inner_text = input_params.should_fetch_inner_text;
-                const mmid = input_params.mmid;
-                const attributes = input_params.attributes;
-                const tags_to_ignore = input_params.tags_to_ignore;
-                const ids_to_ignore = input_params.ids_to_ignore;
-
-                const element = document.querySelector(`[mmid="${mmid}"]`);
-
-                if (!element) {
-                    console.log(`No element found with mmid: ${mmid}`);
-                    return null;
-                }
-
-                if (ids_to_ignore.includes(element.id)) {
-                    console.log(`Ignoring element with id: ${element.id}`, element);
-                    return null;
-                }
-
-                if (tags_to_ignore.includes(element.tagName.toLowerCase()) || element.tagName.toLowerCase() === "option") return null;
-
-                let attributes_to_values = {
-                    'tag': element.tagName.toLowerCase()
-                };
-
-                const isClickable = (el) => {
-                    if (!el) return false;
-                    try {
-                        const style = window.getComputedStyle(el);
-                        const className = (el.className || '').toLowerCase();
-                        
-                        return (
-                            el.onclick != null ||
-                            style.cursor === 'pointer' ||
-                            el.getAttribute('role') === 'button' ||
-                            el.hasAttribute('tabindex') ||
-                            className.includes('trigger') ||
-                            className.includes('clickable') ||
-                            el.querySelector('svg') !== null ||
-                            el.tagName.toLowerCase() === 'button' ||
-                            el.tagName.toLowerCase() === 'a' ||
-                            el.getAttribute('role') === 'link' ||
-                            el.getAttribute('role') === 'tab'
-                        );
-                    } catch (e) {
-                        console.error('Error checking clickability:', e);
-                        return false;
-                    }
-                };
-
-                // Add clickability check
-                if (isClickable(element)) {
-                    attributes_to_values['is_clickable'] = true;
-                    attributes_to_values['class'] = element.className;
-                    
-                    // If element has SVG child
-                    const svgElement = element.querySelector('svg');
-                    if (svgElement) {
-                        attributes_to_values['has_svg'] = true;
-                        attributes_to_values['role'] = attributes_to_values['role'] || 'button';
-                    }
-                }
-
-                if (element.tagName.toLowerCase() === 'input') {
-                    attributes_to_values['tag_type'] = element.type;
-                }
-                else if (element.tagName.toLowerCase() === 'select') {
-                    attributes_to_values["mmid"] = element.getAttribute('mmid');
-                    attributes_to_values["role"] = "combobox";
-                    attributes_to_values["options"] = [];
-
-                    for (const option of element.options) {
-                        let option_attributes_to_values = {
-                            "mmid": option.getAttribute('mmid'),
-                            "text": option.text,
-                            "value": option.value,
-                            "selected": option.selected
-                        };
-                        attributes_to_values["options"].push(option_attributes_to_values);
-                    }
-                    return attributes_to_values;
-                }
-
-                for (const attribute of attributes) {
-                    let value = element.getAttribute(attribute);
-                    if(value){
-                        attributes_to_values[attribute] = value;
-                    }
-                }
-
-                if (!attributes_to_values['role']) {
-                    const elementRole = element.getAttribute('role') || element.role;
-                    if (elementRole) {
-                        attributes_to_values['role'] = elementRole;
-                    }
-                }
-
-                if (should_fetch_inner_text && element.innerText) {
-                    attributes_to_values['description'] = element.innerText;
-                }
-
-                return attributes_to_values;
-            }
-            """
-
-            element_attributes = await page.evaluate(js_code,
-                                                {"mmid": mmid, "attributes": attributes, "backup_attributes": backup_attributes,
-                                                "should_fetch_inner_text": should_fetch_inner_text,
-                                                "tags_to_ignore": tags_to_ignore,
-                                                "ids_to_ignore": ids_to_ignore})
-
-            if 'keyshortcuts' in node:
-                del node['keyshortcuts']
-
-            node["mmid"] = mmid
-
-            if element_attributes:
-                node.update(element_attributes)
-
-                if node.get('name') == node.get('mmid') and node.get('role') != "textbox":
-                    del node['name']
-
-                if 'name' in node and 'description' in node and (node['name'] == node['description'] or node['name'] == node['description'].replace('\n', ' ') or node['description'].replace('\n', '') in node['name']):
-                    del node['description']
-
-                if 'name' in node and 'aria-label' in node and node['aria-label'] in node['name']:
-                    del node['aria-label']
-
-                if 'name' in node and 'text' in node and node['name'] == node['text']:
-                    del node['text']
-
-                if node.get('tag') == "select":
-                    node.pop("children", None)
-                    node.pop("role", None)
-                    node.pop("description", None)
-
-                if node.get('role') == node.get('tag'):
-                    del node['role']
-
-                if node.get("aria-label") and node.get("placeholder") and node.get("aria-label") == node.get("placeholder"):
-                    del node["aria-label"]
-
-                if node.get("role") == "link":
-                    del node["role"]
-                    if node.get("description"):
-                        node["text"] = node["description"]
-                        del node["description"]
-
-                if node.get('role') == "textbox":
-                    if "id" in element_attributes and element_attributes["id"]:
-                        js_code = """
-                        (inputParams) => {
-                            let referencingElements = [];
-                            const referencedElement = document.querySelector(`[aria-labelledby="${inputParams.aria_labelled_by_query_value}"]`);
-                            if(referencedElement) {
-                                const mmid = referencedElement.getAttribute('mmid');
-                                if (mmid) {
-                                    return {"mmid": mmid, "tag": referencedElement.tagName.toLowerCase()};
-                                }
-                            }
-                            return null;
-                        }
-                        """
-
-            for attribute_to_delete in attributes_to_delete:
-                if attribute_to_delete in node:
-                    node.pop(attribute_to_delete, None)
-        else:
-            logger.debug(f"No element found with mmid: {mmid}, deleting node: {node}")
-            node["marked_for_deletion_by_mm"] = True
+    input_params = {"attributes": ENRICHMENT_ATTRIBUTES, "backup_attributes": ENRICHMENT_BACKUP_ATTRIBUTES,
+                    "tags_to_ignore": ENRICHMENT_TAGS_TO_IGNORE, "ids_to_ignore": ENRICHMENT_IDS_TO_IGNORE}
+
+    nodes_to_enrich: list[tuple[dict[str, Any], int, bool]] = []
+    __collect_nodes_to_enrich(accessibility_tree, nodes_to_enrich)
+
+    if dom_index is not None:
+        for node, mmid, should_fetch_inner_text in nodes_to_enrich:
+            __merge_element_attributes(node, mmid, dom_index.describe_element(mmid, should_fetch_inner_text, input_params))
+    else:
+        fetched: dict[tuple[int, bool], dict[str, Any] | None] = enrichment_cache.attributes if enrichment_cache is not None else {}
+        pending = list(dict.fromkeys((mmid, should_fetch_inner_text) for _, mmid, should_fetch_inner_text in nodes_to_enrich
+                                     if (mmid, should_fetch_inner_text) not in fetched))
+
+        # The role the accessibility tree already computed settles clickability without reading the computed style
+        ax_roles = {mmid: node.get('role') for node, mmid, _ in nodes_to_enrich}
+
+        if enrichment_mode == "per_node":
+            for mmid, should_fetch_inner_text in pending:
+                fetched[(mmid, should_fetch_inner_text)] = await page.evaluate(__ENRICH_SINGLE_NODE_JS,
+                                                         {**input_params, "mmid": mmid, "should_fetch_inner_text": should_fetch_inner_text,
+                                                          "ax_role": ax_roles[mmid]})
+        elif pending:
+            entries = [{"mmid": mmid, "should_fetch_inner_text": should_fetch_inner_text, "ax_role": ax_roles[mmid]}
+                       for mmid, should_fetch_inner_text in pending]
+            results: list[dict[str, Any] | None] = await page.evaluate(__ENRICH_BATCH_JS, {**input_params, "entries": entries})
+            fetched.update(zip(pending, results))
+
+        for node, mmid, should_fetch_inner_text in nodes_to_enrich:
+            __merge_element_attributes(node, mmid, fetched[(mmid, should_fetch_inner_text)])
+        logger.debug(f"Enriched {len(nodes_to_enrich)} nodes, {len(pending)} fetched from the page and {len(nodes_to_enrich) - len(pending)} from cache")
 
-    await process_node(accessibility_tree)
     pruned_tree = __prune_tree(accessibility_tree, only_input_fields)
     logger.debug("Reconciliation complete")
     return pruned_tree
@@ -299,7 +608,8 @@ async def __cleanup_dom(page: Page):
     """
     logger.debug("Cleaning up the DOM's previous injections")
     await page.evaluate("""() => {
-        const allElements = document.querySelectorAll('*[mmid]');
+        const deepElements = __DEEP_ELEMENTS__;
+        const allElements = deepElements(document).filter(element => element.hasAttribute('mmid'));
         allElements.forEach(element => {
             element.removeAttribute('aria-keyshortcuts');
             const origAriaLabel = element.getAttribute('orig-aria-keyshortcuts');
@@ -308,73 +618,76 @@ async def __cleanup_dom(page: Page):
                 element.removeAttribute('orig-aria-keyshortcuts');
             }
         });
-    }""")
+    }""".replace("__DEEP_ELEMENTS__", DEEP_ELEMENTS_JS))
     logger.debug("DOM cleanup complete")
 
 
 def __prune_tree(node: dict[str, Any], only_input_fields: bool) -> dict[str, Any] | None:
     """
-    Recursively prunes a tree starting from `node`, based on pruning conditions and handling of 'unraveling'.
+    Prunes a tree starting from `node`, based on pruning conditions and handling of 'unraveling'.
 
     The function has two main jobs:
     1. Pruning: Remove nodes that don't meet certain conditions, like being marked for deletion.
     2. Unraveling: For nodes marked with 'marked_for_unravel_children', we replace them with their children,
        effectively removing the node and lifting its children up a level in the tree.
 
-    This happens in place, meaning we modify the tree as we go, which is efficient but means you should
-    be cautious about modifying the tree outside this function during a prune operation.
+    The tree is walked once, depth first, with an explicit stack instead of recursion, so very deep trees
+    cannot hit the recursion limit. Every node's surviving children are collected into a fresh list which
+    replaces the old one once the node is finished, so the cost is linear in the size of the tree.
 
     Args:
-    - node (Dict[str, Any]): The node we're currently looking at. We'll check this node, its children,
-      and so on, recursively down the tree.
+    - node (Dict[str, Any]): The root of the (sub)tree to prune.
     - only_input_fields (bool): If True, we're only interested in pruning input-related nodes (like form fields).
       This lets you narrow the focus if, for example, you're only interested in cleaning up form-related parts
       of a larger tree.
 
     Returns:
-    - dict[str, Any] | None: The pruned version of `node`, or None if `node` was pruned away. When we 'unravel'
-      a node, we directly replace it with its children in the parent's list of children, so the return value
-      will be the parent, updated in place.
+    - dict[str, Any] | None: The pruned version of `node`, or None if `node` was pruned away. Nodes are updated
+      in place, only their 'children' lists are replaced.
 
     Notes:
     - 'marked_for_deletion_by_mm' is our flag for nodes that should definitely be removed.
     - Unraveling is neat for flattening the tree when a node is just a wrapper without semantic meaning.
-    - We use a while loop with manual index management to safely modify the list of children as we iterate over it.
+      The lifted children are kept as they are, they are not pruned or unraveled again.
     """
     if "marked_for_deletion_by_mm" in node:
         return None
 
-    if 'children' in node:
-        i = 0
-        while i < len(node['children']):
-            child = node['children'][i]
+    # Each frame holds a node, the iterator over its original children and the children kept so far
+    stack = [(node, iter(node.get('children', ())), [])]
+    while stack:
+        current, children, kept_children = stack[-1]
+        for child in children:
             if 'marked_for_unravel_children' in child:
-                # Replace the current child with its children
-                if 'children' in child:
-                    node['children'] = node['children'][:i] + child['children'] + node['children'][i+1:]
-                    i += len(child['children']) - 1  # Adjust the index for the new children
-                else:
-                    # If the node marked for unraveling has no children, remove it
-                    node['children'].pop(i)
-                    i -= 1  # Adjust the index since we removed an element
+                # Replace the child with its children
+                kept_children.extend(child.get('children', ()))
+            elif "marked_for_deletion_by_mm" in child:
+                continue
+            elif 'children' not in child:
+                # Leaves are decided right away, without a frame of their own
+                if not __should_prune_node(child, only_input_fields):
+                    kept_children.append(child)
             else:
-                # Recursively prune the child if it's not marked for unraveling
-                pruned_child = __prune_tree(child, only_input_fields)
-                if pruned_child is None:
-                    # If the child is pruned, remove it from the children list
-                    node['children'].pop(i)
-                    i -= 1  # Adjust the index since we removed an element
+                # Descend into the child, this frame resumes from the same iterator afterwards
+                stack.append((child, iter(child['children']), []))
+                break
+        else:
+            # All children processed, an empty children array is removed
+            stack.pop()
+            if 'children' in current:
+                if kept_children:
+                    current['children'] = kept_children
                 else:
-                    # Update the child with the pruned version
-                    node['children'][i] = pruned_child
-            i += 1  # Move to the next child
+                    del current['children']
 
-        # After processing all children, if the children array is empty, remove it
-        if not node['children']:
-            del node['children']
+            # Apply existing conditions to decide if the current node should be pruned
+            should_prune = __should_prune_node(current, only_input_fields)
+            if not stack:
+                return None if should_prune else current
+            if not should_prune:
+                stack[-1][2].append(current)
 
-    # Apply existing conditions to decide if the current node should be pruned
-    return None if __should_prune_node(node, only_input_fields) else node
+    return None
 
 
 def __should_prune_node(node: dict[str, Any], only_input_fields: bool):
@@ -437,9 +750,10 @@ def __should_prune_node(node: dict[str, Any], only_input_fields: bool):
 async def get_node_dom_element(page: Page, mmid: str):
     return await page.evaluate("""
         (mmid) => {
-            return document.querySelector(`[mmid="${mmid}"]`);
+            const resolveElement = __RESOLVE_ELEMENT__;
+            return resolveElement(`[mmid="${mmid}"]`);
         }
-    """, mmid)
+    """.replace("__RESOLVE_ELEMENT__", RESOLVE_ELEMENT_JS), mmid)
 
 
 async def get_element_attributes(page: Page, mmid: str, attributes: list[str]):
@@ -447,7 +761,8 @@ async def get_element_attributes(page: Page, mmid: str, attributes: list[str]):
         (inputParams) => {
             const mmid = inputParams.mmid;
             const attributes = inputParams.attributes;
-            const element = document.querySelector(`[mmid="${mmid}"]`);
+            const resolveElement = __RESOLVE_ELEMENT__;
+            const element = resolveElement(`[mmid="${mmid}"]`);
             if (!element) return null;  // Return null if element is not found
 
             let attrs = {};
@@ -456,7 +771,7 @@ async def get_element_attributes(page: Page, mmid: str, attributes: list[str]):
             }
             return attrs;
         }
-    """, {"mmid": mmid, "attributes": attributes})
+    """.replace("__RESOLVE_ELEMENT__", RESOLVE_ELEMENT_JS), {"mmid": mmid, "attributes": attributes})
 
 
 async def get_dom_with_accessibility_info() -> Annotated[dict[str, Any] | None, "A minified representation of the HTML DOM for the current webpage"]:
@@ -479,14 +794,59 @@ async def get_dom_with_accessibility_info() -> Annotated[dict[str, Any] | None,
 
 
 
-async def do_get_accessibility_info(page: Page, only_input_fields: bool = False):
+async def do_get_accessibility_info(page: Page, only_input_fields: bool = False, enrichment_mode: str = ENRICHMENT_MODE, engine: str = DOM_ENGINE,
+                                    incremental: bool = INCREMENTAL_ENRICHMENT, output_format: str = DOM_OUTPUT_FORMAT,
+                                    token_budget: int = DOM_TOKEN_BUDGET, relevance_query: str | None = None,
+                                    relevance_top_k: int = DOM_RELEVANCE_TOP_K, viewport_band: ViewportBand | None = None):
     """
-    Retrieves the accessibility information of a web page and saves it as JSON files.
+    Retrieves the accessibility information of a web page, saves it as JSON files and returns it serialized for the agent.
+
+    Args:
+        page (Page): The page to capture.
+        only_input_fields (bool): Keep only interactive nodes in the returned tree.
+        enrichment_mode (str): "batched" (default, one round trip for all nodes) or "per_node". Defaults to AGENTIC_BROWSER_DOM_ENRICHMENT_MODE.
+        engine (str): "inject" (default), or "cdp" / "domsnapshot" to extract without modifying the page. Defaults to AGENTIC_BROWSER_DOM_ENGINE.
+        incremental (bool): Reuse the enrichment of unchanged elements from the previous capture of the same document.
+        output_format (str): "compact" (one line per node) or "repr". Defaults to AGENTIC_BROWSER_DOM_OUTPUT_FORMAT.
+        token_budget (int): Maximum number of tokens returned, larger trees are reduced to fit (0 disables). Defaults to AGENTIC_BROWSER_DOM_TOKEN_BUDGET.
+        relevance_query (str | None): When given, only the fields most relevant to this text (and their ancestors) are returned.
+        relevance_top_k (int): The number of fields kept for the relevance query. Defaults to AGENTIC_BROWSER_DOM_RELEVANCE_TOP_K.
+        viewport_band (ViewportBand | None): When given, only the elements rendered within this band of the page are enriched and returned.
+            Fields of child frames are not scoped.
+
+    Elements inside open shadow roots are part of the tree. The fields of child frames (AGENTIC_BROWSER_DOM_FRAMES) are
+    appended to the root with mmids qualified by the frame's number, e.g. "f2-57".
     """
     print(f"[{time.strftime('%H:%M:%S')}] Starting new DOM accessibility info capture")
     
-    await __inject_attributes(page)
-    accessibility_tree: dict[str, Any] = await page.accessibility.snapshot(interesting_only=True)  # type: ignore
+    # Child frames are read concurrently with the main frame and grafted under the root with frame-qualified mmids
+    frames_task = asyncio.ensure_future(__extract_child_frames(page, incremental)) if EXTRACT_FRAMES else None
+
+    dom_index: CDPDomIndex | None = None
+    enrichment_cache: EnrichmentCache | None = None
+    if engine == "cdp":
+        accessibility_tree, dom_index = await get_cdp_accessibility_snapshot(page)
+    elif engine == "domsnapshot":
+        accessibility_tree, dom_index = await get_dom_snapshot_accessibility_snapshot(page)
+    else:
+        injection = await __inject_attributes(page, incremental)
+        if incremental:
+            enrichment_cache = __get_enrichment_cache(page, injection)
+        accessibility_tree: dict[str, Any] = await page.accessibility.snapshot(interesting_only=True)  # type: ignore
+
+    if viewport_band is not None:
+        # Scoped before enrichment so that only the elements within the band are read from the page
+        if isinstance(dom_index, DOMSnapshotIndex):
+            mmids_in_band = await get_mmids_in_band(page, viewport_band, accessibility_tree, layout_index=dom_index)
+        else:
+            cdp_session = await get_cdp_session(page) if dom_index is not None else None
+            mmids_in_band = await get_mmids_in_band(page, viewport_band, accessibility_tree, cdp_session)
+        accessibility_tree = scope_tree_to_band(accessibility_tree, mmids_in_band)
+
+    if frames_task is not None:
+        frame_nodes = await frames_task
+        if frame_nodes and accessibility_tree is not None:
+            accessibility_tree.setdefault("children", []).extend(frame_nodes)
 
     print(f"[{time.strftime('%H:%M:%S')}] Got fresh accessibility snapshot, starting file writes")
 
@@ -495,10 +855,11 @@ async def do_get_accessibility_info(page: Page, only_input_fields: bool = False)
         await f.write(json.dumps(accessibility_tree, indent=2))
         print(f"[{time.strftime('%H:%M:%S')}] Completed writing json_accessibility_dom.json")
 
-    await __cleanup_dom(page)
+    if dom_index is None:
+        await __cleanup_dom(page)
     
     try:
-        enhanced_tree = await __fetch_dom_info(page, accessibility_tree, only_input_fields)
+        enhanced_tree = await __fetch_dom_info(page, accessibility_tree, only_input_fields, enrichment_mode, dom_index, enrichment_cache)
         print(f"[{time.strftime('%H:%M:%S')}] Enhanced tree processing complete")
 
         # Second file write with aiofiles
@@ -507,7 +868,17 @@ async def do_get_accessibility_info(page: Page, only_input_fields: bool = False)
             print(f"[{time.strftime('%H:%M:%S')}] Completed writing json_accessibility_dom_enriched.json")
 
         print(f"[{time.strftime('%H:%M:%S')}] All DOM processing and file writes complete")
-        return str(enhanced_tree)
+        serialization_start = time.time()
+        agent_tree, relevance_note = rank_fields_by_relevance(enhanced_tree, relevance_query, relevance_top_k)
+        # Counted before fit_tree_to_budget trims the tree in place
+        repr_tokens = count_repr_tokens(agent_tree, output_format)
+        serialized_tree = fit_tree_to_budget(agent_tree, token_budget, output_format)
+        log_serialization_stats(serialized_tree, output_format, serialization_start, repr_tokens)
+        if relevance_note:
+            serialized_tree = f"{serialized_tree}\n{relevance_note}"
+        if viewport_band is not None:
+            serialized_tree = f"{serialized_tree}\n{viewport_band.describe('get_dom_fields')}"
+        return serialized_tree
     
     except Exception as e:
         print(f"[{time.strftime('%H:%M:%S')}] Error during DOM processing: {str(e)}")
@@ -0,0 +1,138 @@
+import re
+from dataclasses import dataclass
+from dataclasses import field
+from html.parser import HTMLParser
+
+# Elements whose content is not rendered as text
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "canvas", "select"}
+
+# Elements that start a new line of text
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "details", "dialog", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+    "summary", "table", "td", "th", "tr", "ul",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+# Pages whose text is shorter than this are assumed to be rendered by JavaScript
+MIN_STATIC_TEXT_LENGTH = 200
+
+# <noscript> messages of pages that do not work without JavaScript
+noscript_marker = re.compile(r"enable javascript|javascript (?:is )?(?:required|disabled|not enabled)|turn on javascript|requires javascript|"
+                             r"javascript to (?:run|use|view)", re.IGNORECASE)
+
+
+@dataclass
+class HTMLText:
+    """
+    The text of an HTML document as a browser would render it, without running its scripts.
+    """
+    title: str = ""
+    text: str = ""
+    alt_texts: list[str] = field(default_factory=list)
+    noscript_text: str = ""
+
+    def needs_javascript(self) -> str | None:
+        """Tells why the document most likely needs JavaScript to show its content, None when the static text is usable."""
+        if len(self.text) < MIN_STATIC_TEXT_LENGTH:
+            return f"the page has only {len(self.text)} characters of static text"
+        if noscript_marker.search(self.noscript_text) and len(self.text) < 10 * MIN_STATIC_TEXT_LENGTH:
+            return "the page asks for JavaScript to be enabled"
+        return None
+
+
+class _TextExtractor(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.result = HTMLText()
+        self.lines: list[str] = []
+        self.line: list[str] = []
+        self.skipped_depth = 0
+        self.noscript_depth = 0
+        self.in_title = False
+        self.in_pre = False
+
+    def flush(self):
+        text = "".join(self.line)
+        text = text.rstrip() if self.in_pre else " ".join(text.split())
+        if text and text not in ("-", "#"):
+            self.lines.append(text)
+        self.line = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipped_depth += 1
+            self.noscript_depth += tag == "noscript"
+            return
+        if self.skipped_depth:
+            return
+        if tag == "title":
+            self.in_title = True
+        elif tag == "img":
+            alt = dict(attrs).get("alt")
+            if alt:
+                self.result.alt_texts.append(alt.strip())
+        elif tag in HEADING_TAGS:
+            self.flush()
+            self.line.append("#" * int(tag[1]) + " ")
+        elif tag in BLOCK_TAGS:
+            self.flush()
+            if tag == "li":
+                self.line.append("- ")
+            elif tag == "pre":
+                self.in_pre = True
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags (<br/>, <img/>) have no content, skipped ones must not change the depth
+        if tag not in SKIPPED_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipped_depth = max(self.skipped_depth - 1, 0)
+            if tag == "noscript":
+                self.noscript_depth = max(self.noscript_depth - 1, 0)
+            return
+        if self.skipped_depth:
+            return
+        if tag == "title":
+            self.in_title = False
+        elif tag in HEADING_TAGS or tag in BLOCK_TAGS:
+            self.flush()
+            if tag == "pre":
+                self.in_pre = False
+
+    def handle_data(self, data):
+        if self.noscript_depth:
+            self.result.noscript_text += data
+        if self.skipped_depth:
+            return
+        if self.in_title:
+            self.result.title += data
+        else:
+            self.line.append(data)
+
+    def close(self):
+        super().close()
+        self.flush()
+        self.result.title = " ".join(self.result.title.split())
+        self.result.text = "\n".join(self.lines)
+
+
+def html_to_text(html: str) -> HTMLText:
+    """
+    Converts an HTML document to text without a browser: scripts, styles and other non rendered elements are dropped,
+    block elements start new lines, headings are kept as Markdown headings and list items as bullets.
+    CPU bound, run it in a worker thread from async code.
+
+    Args:
+        html (str): The HTML document.
+
+    Returns:
+        HTMLText: The title, text and image alt texts of the document.
+    """
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result
@@ -0,0 +1,121 @@
+import os
+from dataclasses import dataclass
+from dataclasses import field
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext
+from playwright.async_api import Request
+from playwright.async_api import Response
+from playwright.async_api import Route
+
+from core.utils.logger import logger
+
+# Requests the API mode browser does not download, one profile or several separated by commas, e.g. "no-media,no-third-party":
+# "none" (default) blocks nothing, "no-media" blocks images, video, audio and fonts, "text-only" also blocks stylesheets
+# (for read-only tasks, the page layout and element visibility are lost), "no-third-party" blocks the sub-resources of
+# sites other than the one of the page.
+RESOURCE_BLOCK_PROFILE = os.getenv("AGENTIC_BROWSER_BLOCK_PROFILE", "none").lower()
+
+# Resource types (Request.resource_type) blocked by each profile
+BLOCKED_RESOURCE_TYPES = {
+    "none": set(),
+    "no-media": {"image", "media", "font"},
+    "text-only": {"image", "media", "font", "stylesheet", "texttrack", "manifest"},
+    "no-third-party": set(),
+}
+
+# Second level labels under which sites are registered, e.g. example.co.uk is one site and not all of co.uk
+_SHARED_SECOND_LEVEL_LABELS = {"ac", "co", "com", "edu", "gov", "ltd", "net", "org", "plc", "sch"}
+
+
+@dataclass
+class ResourceBlockingStats:
+    """Counters of the requests of one browser context, blocked and allowed."""
+    profile: str
+    blocked_requests: int = 0
+    blocked_by_type: dict[str, int] = field(default_factory=dict)
+    allowed_requests: int = 0
+    # Sum of the Content-Length of the allowed responses, responses without one are not counted
+    allowed_bytes: int = 0
+
+    def summary(self) -> str:
+        by_type = ", ".join(f"{count} {resource_type}" for resource_type, count in sorted(self.blocked_by_type.items()))
+        return (f"profile {self.profile}: blocked {self.blocked_requests} requests" + (f" ({by_type})" if by_type else "")
+                + f", allowed {self.allowed_requests} requests, {self.allowed_bytes / 1024:.0f} KB")
+
+
+def get_site(url: str) -> str:
+    """Returns the registrable part of the URL's host, e.g. 'example.com' for https://cdn.example.com/a.js"""
+    labels = (urlparse(url).hostname or "").split(".")
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _SHARED_SECOND_LEVEL_LABELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def parse_block_profile(profile: str) -> list[str]:
+    """
+    Splits a comma separated profile string into known profile names.
+
+    Raises:
+        ValueError: If a profile is not known.
+    """
+    profiles = [name.strip() for name in profile.split(",") if name.strip() and name.strip() != "none"]
+    unknown = [name for name in profiles if name not in BLOCKED_RESOURCE_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown resource blocking profile {', '.join(unknown)}, use {', '.join(BLOCKED_RESOURCE_TYPES)}")
+    return profiles
+
+
+async def apply_resource_blocking(context: BrowserContext, profile: str = RESOURCE_BLOCK_PROFILE) -> ResourceBlockingStats | None:
+    """
+    Routes the requests of every page of the context through the blocking profile. Navigations are never blocked.
+
+    Args:
+        context (BrowserContext): The browser context of the task.
+        profile (str): One profile or several separated by commas, see RESOURCE_BLOCK_PROFILE.
+
+    Returns:
+        ResourceBlockingStats | None: The counters of the context's requests, None when the profile blocks nothing.
+    """
+    profiles = parse_block_profile(profile)
+    if not profiles:
+        return None
+
+    blocked_types = set().union(*(BLOCKED_RESOURCE_TYPES[name] for name in profiles))
+    block_third_party = "no-third-party" in profiles
+    stats = ResourceBlockingStats(profile=",".join(profiles))
+
+    def block_reason(request: Request) -> str | None:
+        if request.is_navigation_request():
+            return None
+        if request.resource_type in blocked_types:
+            return request.resource_type
+        if block_third_party and request.url.startswith(("http://", "https://")):
+            try:
+                page_url = request.frame.page.url
+            except Exception:
+                # Service worker requests have no frame
+                return None
+            if page_url.startswith(("http://", "https://")) and get_site(request.url) != get_site(page_url):
+                return f"third-party {request.resource_type}"
+        return None
+
+    async def handle_route(route: Route):
+        reason = block_reason(route.request)
+        if reason is None:
+            await route.continue_()
+            return
+        stats.blocked_requests += 1
+        stats.blocked_by_type[reason] = stats.blocked_by_type.get(reason, 0) + 1
+        await route.abort("blockedbyclient")
+
+    def count_response(response: Response):
+        stats.allowed_requests += 1
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            stats.allowed_bytes += int(content_length)
+
+    await context.route("**/*", handle_route)
+    context.on("response", count_response)
+    logger.info(f"Resource blocking profile {stats.profile} applied to the browser context")
+    return stats
@@ -0,0 +1,172 @@
+import io
+import os
+from dataclasses import dataclass
+from dataclasses import field
+
+import numpy as np
+from PIL import Image
+
+from core.utils.logger import logger
+from core.utils.screenshots import SCREENSHOT_QUALITY
+from core.utils.screenshots import Screenshot
+
+# "true" (default) to compare the screenshots locally before the screenshot analysis, "false" to always send both
+# screenshots whole
+SS_DIFF_ENABLED = os.getenv("AGENTIC_BROWSER_SS_DIFF_ENABLED", "true").lower() == "true"
+
+# When the changed regions cover more than this share of the screenshot (e.g. after a navigation), both screenshots are
+# sent whole, the crops would not be smaller
+SS_DIFF_CROP_MAX_AREA = 0.5
+
+# Grey level difference below which a pixel counts as unchanged, absorbs JPEG noise and anti-aliasing
+SS_DIFF_PIXEL_TOLERANCE = 24
+
+# Changes are located on a grid of square cells of this size in pixels; cells with fewer changed pixels are noise. The
+# page counts as unchanged, and the screenshot analysis is skipped, only when no cell changed: a typed word or a ticked
+# checkbox changes a few hundred pixels, far less than any share of the page that could tell noise from an action
+SS_DIFF_CELL_SIZE = 32
+SS_DIFF_MIN_CELL_PIXELS = 4
+
+# Pixels of context kept around each changed region, and the most regions sent (closest ones are merged beyond it)
+SS_DIFF_REGION_MARGIN = 24
+SS_DIFF_MAX_REGIONS = 4
+
+# Width of the thumbnail of the whole page sent along with the crops
+SS_DIFF_THUMBNAIL_WIDTH = 640
+
+
+@dataclass
+class ScreenshotDiff:
+    """The pixel difference between the screenshots before and after an action."""
+    change_ratio: float
+    # Changed regions as (left, top, right, bottom) pixel boxes, margins included
+    regions: list[tuple[int, int, int, int]] = field(default_factory=list)
+    size: tuple[int, int] = (0, 0)
+
+    @property
+    def region_area_ratio(self) -> float:
+        area = sum((right - left) * (bottom - top) for left, top, right, bottom in self.regions)
+        return area / (self.size[0] * self.size[1]) if self.size[0] and self.size[1] else 1.0
+
+
+def diff_screenshots(before: Screenshot, after: Screenshot) -> ScreenshotDiff | None:
+    """
+    Compares two screenshots pixel by pixel and locates the regions that changed.
+
+    Args:
+        before (Screenshot): The screenshot before the action.
+        after (Screenshot): The screenshot after the action.
+
+    Returns:
+        ScreenshotDiff | None: The share of changed pixels and the changed regions, None if an image cannot be decoded.
+        Screenshots of different sizes count as entirely changed.
+    """
+    try:
+        before_image = decode_image(before)
+        after_image = decode_image(after)
+    except Exception as e:
+        logger.warning(f"Could not decode the screenshots to compare them: {e}")
+        return None
+
+    width, height = after_image.size
+    if before_image.size != after_image.size:
+        return ScreenshotDiff(change_ratio=1.0, regions=[(0, 0, width, height)], size=(width, height))
+
+    before_pixels = np.asarray(before_image.convert("L"), dtype=np.int16)
+    after_pixels = np.asarray(after_image.convert("L"), dtype=np.int16)
+    changed = np.abs(after_pixels - before_pixels) > SS_DIFF_PIXEL_TOLERANCE
+    return ScreenshotDiff(change_ratio=float(changed.mean()), regions=find_changed_regions(changed), size=(width, height))
+
+
+def decode_image(screenshot: Screenshot) -> Image.Image:
+    image = Image.open(io.BytesIO(screenshot.data))
+    image.load()
+    return image
+
+
+def find_changed_regions(changed: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """
+    Groups the changed pixels into boxes: the mask is reduced to a grid of cells, neighbouring changed cells (diagonals
+    included) form one region, and regions are padded with a margin and merged until they no longer overlap and there
+    are at most SS_DIFF_MAX_REGIONS.
+
+    Args:
+        changed (np.ndarray): Boolean mask of the changed pixels, height x width.
+
+    Returns:
+        list[tuple[int, int, int, int]]: The (left, top, right, bottom) boxes of the changed regions.
+    """
+    height, width = changed.shape
+    cell = SS_DIFF_CELL_SIZE
+    rows, cols = -(-height // cell), -(-width // cell)
+    padded = np.zeros((rows * cell, cols * cell), dtype=bool)
+    padded[:height, :width] = changed
+    active = padded.reshape(rows, cell, cols, cell).sum(axis=(1, 3)) >= SS_DIFF_MIN_CELL_PIXELS
+
+    boxes = []
+    seen = np.zeros_like(active)
+    for row, col in zip(*np.nonzero(active)):
+        if seen[row, col]:
+            continue
+        seen[row, col] = True
+        stack = [(row, col)]
+        top, bottom, left, right = row, row, col, col
+        while stack:
+            r, c = stack.pop()
+            top, bottom, left, right = min(top, r), max(bottom, r), min(left, c), max(right, c)
+            for nr in range(max(r - 1, 0), min(r + 2, rows)):
+                for nc in range(max(c - 1, 0), min(c + 2, cols)):
+                    if active[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        stack.append((nr, nc))
+        margin = SS_DIFF_REGION_MARGIN
+        boxes.append((max(int(left) * cell - margin, 0), max(int(top) * cell - margin, 0),
+                      min((int(right) + 1) * cell + margin, width), min((int(bottom) + 1) * cell + margin, height)))
+    return merge_boxes(boxes)
+
+
+def merge_boxes(boxes: list[tuple[int, int, int, int]]) -> list[tuple[int, int, int, int]]:
+    """Merges overlapping boxes, then the pairs whose union grows the least, until at most SS_DIFF_MAX_REGIONS remain."""
+    def union(a, b):
+        return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+    def area(box):
+        return (box[2] - box[0]) * (box[3] - box[1])
+
+    def overlap(a, b):
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+    boxes = list(boxes)
+    while len(boxes) > 1:
+        pairs = [(i, j) for i in range(len(boxes)) for j in range(i + 1, len(boxes))]
+        overlapping = [(i, j) for i, j in pairs if overlap(boxes[i], boxes[j])]
+        if overlapping:
+            i, j = overlapping[0]
+        elif len(boxes) > SS_DIFF_MAX_REGIONS:
+            i, j = min(pairs, key=lambda pair: area(union(boxes[pair[0]], boxes[pair[1]])) - area(boxes[pair[0]]) - area(boxes[pair[1]]))
+        else:
+            break
+        merged = union(boxes[i], boxes[j])
+        boxes = [box for index, box in enumerate(boxes) if index not in (i, j)] + [merged]
+    return sorted(boxes, key=lambda box: (box[1], box[0]))
+
+
+def crop_regions(before: Screenshot, after: Screenshot, regions: list[tuple[int, int, int, int]]) -> list[tuple[Screenshot, Screenshot]]:
+    """Returns each region of the screenshots before and after the action, encoded as JPEG."""
+    before_image, after_image = decode_image(before), decode_image(after)
+    return [(encode_image(before_image.crop(box), f"region_{number}_before"), encode_image(after_image.crop(box), f"region_{number}_after"))
+            for number, box in enumerate(regions, start=1)]
+
+
+def thumbnail_screenshot(screenshot: Screenshot, width: int = SS_DIFF_THUMBNAIL_WIDTH) -> Screenshot:
+    """Returns the screenshot scaled down to the width, encoded as JPEG."""
+    image = decode_image(screenshot)
+    if image.width > width:
+        image = image.resize((width, max(round(image.height * width / image.width), 1)), Image.Resampling.LANCZOS)
+    return encode_image(image, f"{screenshot.name}_thumbnail")
+
+
+def encode_image(image: Image.Image, name: str) -> Screenshot:
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=SCREENSHOT_QUALITY)
+    return Screenshot(name=name, data=buffer.getvalue(), mime_type="image/jpeg")
@@ -0,0 +1,77 @@
+import asyncio
+import base64
+import os
+from dataclasses import dataclass
+
+from core.utils.logger import logger
+
+# "jpeg" (default) or "png", the encodings the browser produces itself
+SCREENSHOT_FORMAT = os.getenv("AGENTIC_BROWSER_SCREENSHOT_FORMAT", "jpeg").lower()
+
+# JPEG quality, 0 to 100
+SCREENSHOT_QUALITY = int(os.getenv("AGENTIC_BROWSER_SCREENSHOT_QUALITY", "80"))
+
+# "css" (default) captures one pixel per CSS pixel, "device" captures at the device pixel ratio (larger on HiDPI screens)
+SCREENSHOT_SCALE = os.getenv("AGENTIC_BROWSER_SCREENSHOT_SCALE", "css").lower()
+
+# Which screenshots are written to the screenshots directory: "none" (default) keeps them in memory only, "analysis"
+# saves the screenshots sent to screenshot analysis, "all" also takes and saves the before and after screenshots of
+# every action (click, text entry, navigation, key press), which are skipped otherwise.
+SCREENSHOT_ARTIFACTS = os.getenv("AGENTIC_BROWSER_SCREENSHOT_ARTIFACTS", "none").lower()
+
+
+@dataclass
+class Screenshot:
+    """An encoded screenshot held in memory, with the path it was saved to when the artifact policy saves it."""
+    name: str
+    data: bytes
+    mime_type: str
+    path: str | None = None
+
+    def to_data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+
+def should_persist(kind: str) -> bool:
+    """
+    Whether the artifact policy saves screenshots of this kind to disk.
+
+    Args:
+        kind (str): "action" for the before and after screenshots of skills, "analysis" for the screenshots of the
+        screenshot analysis.
+    """
+    if SCREENSHOT_ARTIFACTS == "all":
+        return True
+    return SCREENSHOT_ARTIFACTS == "analysis" and kind == "analysis"
+
+
+def get_screenshot_options() -> dict:
+    """Returns the page.screenshot options of the configured format, quality and scale."""
+    options = {"type": "png" if SCREENSHOT_FORMAT == "png" else "jpeg", "scale": "device" if SCREENSHOT_SCALE == "device" else "css"}
+    if options["type"] == "jpeg":
+        options["quality"] = max(0, min(SCREENSHOT_QUALITY, 100))
+    return options
+
+
+async def persist_screenshot(screenshot: Screenshot, screenshots_dir: str) -> str | None:
+    """
+    Writes the screenshot to the directory in a worker thread, the event loop keeps running during the write.
+
+    Returns:
+        str | None: The path of the file, None if it could not be written.
+    """
+    extension = "png" if screenshot.mime_type == "image/png" else "jpg"
+    path = os.path.join(screenshots_dir, f"{screenshot.name}.{extension}")
+    try:
+        await asyncio.to_thread(_write_file, path, screenshot.data)
+    except OSError as e:
+        logger.error(f"Failed to save screenshot to \"{path}\". Error: {e}")
+        return None
+    screenshot.path = path
+    logger.debug(f"Screenshot saved to: {path}")
+    return path
+
+
+def _write_file(path: str, data: bytes):
+    with open(path, "wb") as file:
+        file.write(data)
@@ -1,56 +1,81 @@
-import base64
-import os
 from typing import Dict
-from PIL import Image
 from core.utils.openai_client import get_ss_client, get_ss_model
+from core.utils.logger import logger
+from core.utils.screenshot_diff import SS_DIFF_CROP_MAX_AREA
+from core.utils.screenshot_diff import SS_DIFF_ENABLED
+from core.utils.screenshot_diff import ScreenshotDiff
+from core.utils.screenshot_diff import crop_regions
+from core.utils.screenshot_diff import diff_screenshots
+from core.utils.screenshot_diff import thumbnail_screenshot
+from core.utils.screenshots import Screenshot
 
 class ImageAnalyzer:
 
-    ss_analysis_history = []
-
-    def __init__(self, image1_path: str, image2_path: str, next_step: str):
-        self.image1_path = image1_path
-        self.image2_path = image2_path
+    def __init__(self, image1: Screenshot | None, image2: Screenshot | None, next_step: str, history: list[str] | None = None):
+        self.image1 = image1
+        self.image2 = image2
         self.next_step = next_step
+        # The previous SS analysis responses of the task, owned by its orchestrator and appended to in place
+        self.ss_analysis_history = history if history is not None else []
         self.client = None
 
-    @classmethod
-    def get_formatted_history(cls) -> str:
+    def get_formatted_history(self) -> str:
         """Format the SS analysis history into a numbered string"""
-        if not cls.ss_analysis_history:
+        if not self.ss_analysis_history:
             return "No previous SS analysis responses."
         
         formatted_history = "Previous SS Analysis Responses:\n"
-        for idx, response in enumerate(cls.ss_analysis_history, 1):
+        for idx, response in enumerate(self.ss_analysis_history, 1):
             formatted_history += f"{idx}. {response}\n\n"
         return formatted_history
 
-    @classmethod
-    def clear_history(cls):
-        """Clear the SS analysis history"""
-        cls.ss_analysis_history.clear()
-    
+    def _validate_images(self):
+        # The screenshots come encoded from the browser, they only need to exist
+        for label, image in (("Pre-action", self.image1), ("Post-action", self.image2)):
+            if image is None or not image.data:
+                raise ValueError(f"{label} screenshot is missing")
 
-    def _encode_image_to_base64(self, image_path: str) -> str:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+    @staticmethod
+    def _image_content(screenshot: Screenshot, detail: str = "high") -> dict:
+        return {"type": "image_url", "image_url": {"url": screenshot.to_data_url(), "detail": detail}}
 
-    def _validate_images(self):
-        for path in [self.image1_path, self.image2_path]:
-            if not os.path.exists(path):
-                raise FileNotFoundError(f"Image file not found: {path}")
-            try:
-                Image.open(path)
-            except Exception as e:
-                raise ValueError(f"Invalid image file {path}: {str(e)}")
+    def _build_image_contents(self, diff: ScreenshotDiff | None) -> tuple[str, list[dict]]:
+        """
+        Returns the rule describing the images and the images to send: the changed regions before and after the action
+        with a thumbnail of the page when the change is local, else both screenshots whole.
+        """
+        if diff is not None and diff.regions and diff.region_area_ratio <= SS_DIFF_CROP_MAX_AREA:
+            contents = [self._image_content(thumbnail_screenshot(self.image2), detail="low")]
+            for region_before, region_after in crop_regions(self.image1, self.image2, diff.regions):
+                contents.extend([self._image_content(region_before), self._image_content(region_after)])
+            logger.info(f"SS analysis sends {len(diff.regions)} changed regions covering {diff.region_area_ratio:.1%} of the screenshot")
+            rule = (f"You have been provided a small thumbnail of the whole webpage after the action was performed, followed by the "
+                    f"{len(diff.regions)} region(s) of the webpage that changed, each as a pair of images: the region before the action "
+                    f"and the same region after the action. Regions are listed from the top of the page to the bottom. "
+                    f"The rest of the webpage is unchanged.")
+            return rule, contents
+        rule = ("You have been provided 2 screenshots, one is the state of the webpage before the action was performed and the "
+                "other is the state of the webpage after the action was performed.")
+        return rule, [self._image_content(self.image1), self._image_content(self.image2)]
 
     def analyze_images(self) -> Dict[str, str]:
         self._validate_images()
+
+        # Compare the screenshots locally first, an unchanged page needs no vision call and a local change only its regions
+        diff = diff_screenshots(self.image1, self.image2) if SS_DIFF_ENABLED else None
+        if diff is not None and not diff.regions:
+            response_content = (f"No visual change: no region of the webpage differs between the screenshots before and after the "
+                                f"action ({diff.change_ratio:.2%} of the pixels differ, below the noise level). The action may have "
+                                f"had no visible effect; confirm its outcome from the Browser Agent's response or the DOM rather "
+                                f"than from the screenshots. For searches through the search API an unchanged webpage is expected.")
+            logger.info(f"SS analysis skipped, no changed region ({diff.change_ratio:.2%} of the pixels changed)")
+            self.ss_analysis_history.append(response_content)
+            return response_content
+
         self.client = get_ss_client()
         model = get_ss_model()
 
-        base64_image1 = self._encode_image_to_base64(self.image1_path)
-        base64_image2 = self._encode_image_to_base64(self.image2_path)
+        images_rule, image_contents = self._build_image_contents(diff)
 
         history_str = self.get_formatted_history()
 
@@ -60,7 +85,7 @@ class ImageAnalyzer:
         Previous SS Analysis Responses: {history_str}
 
         <rules>
-        1. You have been provided 2 screenshots, one is the state of the webpage before the action was performed and the other is the state of the webpage after the action was performed.
+        1. {images_rule}
         2. If the action was successfully performed, you should be able to see the expected changes in the webpage.
         3. We do not need generic description of what you see in the screenshots that has changed, we need the information and inference on whether the action was successfully performed or not.
         4. If the action was successfully performed, then you need to convey that information and along with that information, you also need to provide information on what changes you see in the screenshots that might have resulted from the action.
@@ -97,20 +122,7 @@ class ImageAnalyzer:
                         "role": "user",
                         "content": [
                             {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image1}",
-                                    "detail": "high"
-                                }
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image2}",
-                                    "detail": "high"
-                                }
-                            }
+                            *image_contents,
                         ]
                     }
                 ],
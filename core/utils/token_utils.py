@@ -0,0 +1,19 @@
+import tiktoken
+
+TOKENIZER_MODEL = "gpt-4o"
+
+tokenizer = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the prompt tokens `text` costs with the tokenizer of the agents' model.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The number of tokens.
+    """
+    # Page content can contain anything, including special token markers, so encode them as plain text
+    return len(tokenizer.encode(text, disallowed_special=()))